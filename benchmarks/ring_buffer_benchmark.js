@@ -0,0 +1,56 @@
+/*
+Channel buffer append cost and memory: array of objects + shift() vs ChannelRingBuffer,
+then range min/max/mean by full scan vs the ring buffer block summaries
+
+usage: node --expose-gc benchmarks/ring_buffer_benchmark.js [CAPACITY]
+*/
+
+const { ChannelRingBuffer } = require('../ring_buffer');
+
+const capacity = parseInt(process.argv[2]) || 100000;
+const samples = capacity * 2;  // Half the pushes evict
+
+function heapUsed() {
+  if (global.gc) global.gc();
+  return process.memoryUsage().heapUsed + process.memoryUsage().arrayBuffers;
+}
+
+function run(label, make, push) {
+  const before = heapUsed();
+  const buffer = make();
+  const start = process.hrtime.bigint();
+  for (let i = 0; i < samples; i++) push(buffer, i);
+  const perSample = Number(process.hrtime.bigint() - start) / samples;
+  const bytes = heapUsed() - before;
+  console.log(label.padEnd(22) + `${perSample.toFixed(1)} ns/sample`.padEnd(20) + `${(bytes / 1e6).toFixed(1)} MB`);
+  return buffer;
+}
+
+console.log(`capacity ${capacity}, ${samples} samples`);
+const arrays = run('Array + shift()', () => [], (buf, i) => {
+  buf.push({ channel: 1, time_ms: i, voltage_V: 3.7, current_A: 0.001 });
+  if (buf.length > capacity) buf.shift();
+});
+const ring = run('ChannelRingBuffer', () => new ChannelRingBuffer(1, capacity), (buf, i) => {
+  buf.push(i, 3.7, 0.001);
+});
+console.log(`retained: ${arrays.length} / ${ring.length}`);
+
+// Range statistics over the whole buffer: full scan vs block summaries
+function timeQuery(label, query) {
+  const reps = 200;
+  const start = process.hrtime.bigint();
+  for (let r = 0; r < reps; r++) query();
+  console.log(label.padEnd(22) + `${(Number(process.hrtime.bigint() - start) / reps / 1e3).toFixed(1)} us/query`);
+}
+timeQuery('scan min/max/mean', () => {
+  let min = Infinity, max = -Infinity, sum = 0;
+  for (let i = 0; i < ring.length; i++) {
+    const v = ring.value('voltage_V', i);
+    if (v < min) min = v;
+    if (v > max) max = v;
+    sum += v;
+  }
+  return sum / ring.length;
+});
+timeQuery('rangeStats()', () => ring.rangeStats('voltage_V', 1, ring.length - 1));
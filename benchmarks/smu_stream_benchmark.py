@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Per-sample cost of parsing the SMU serial stream
+
+Compares the original readline().decode().strip().split(',') parse with the
+reusable receive buffer in smu.SMU (read_streaming_data, read_streaming_into an
+array('d') and read_streaming_block). A fake serial port serves a
+recorded-style stream in chunks, as a USB CDC port does, so only the Python
+side is measured. tracemalloc reports the peak transient allocation per sample
+(a block read's peak is shared by the samples it returns), the worst single
+read, and the memory still held after the run. It exits with status 1 when a
+buffered parser's peak exceeds the allocation budget below.
+
+usage: python benchmarks/smu_stream_benchmark.py [SAMPLES] [CHUNK BYTES]
+"""
+
+import io
+import os
+import sys
+import time
+import tracemalloc
+from array import array
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from smu import SMU, ConnectionType  # noqa: E402
+
+samples = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+chunk = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+
+# Allocation budget of the buffered parsers: peak bytes per sample may not exceed
+# SAMPLE_BUDGET plus READ_BUDGET for each port read (a read and the batch decoded
+# from it hold a few buffer-position ints and one field's bytes at a time)
+SAMPLE_BUDGET = 32
+READ_BUDGET = 320
+
+
+def stream(count):
+    lines = (f"{1 + i % 2},{1700000000000 + i * 10},{3.7 + 1e-4 * (i % 97):.6f},{1e-3 + 1e-7 * (i % 13):.7f}\r\n"
+             for i in range(count))
+    return ''.join(lines).encode()
+
+
+class FakeSerial(io.RawIOBase):
+    """
+    Serves a byte string in chunk-sized reads, like a serial port's input buffer
+
+    read() returns a new bytes object, as pyserial does; readinto() copies from
+    read() and the inherited readline() calls read(1) per byte. Those bytes are
+    the port's allocation, not the parser's, so the pieces read in a previous
+    run over the same data (its .reads) can be passed in as prebuilt, and the
+    allocation run only counts what the parser itself creates.
+    """
+
+    def __init__(self, data, chunk, prebuilt=()):
+        super().__init__()
+        self._data = data
+        self._pos = 0
+        self._chunk = chunk
+        self._prebuilt = {(pos, size): data[pos:pos + size] for pos, size in prebuilt}
+        self.reads = []
+        self.read_count = 0
+
+    @property
+    def in_waiting(self):
+        # Data arrives chunk by chunk: what is left of the current chunk
+        return min(self._chunk - self._pos % self._chunk, len(self._data) - self._pos)
+
+    def readable(self):
+        return True
+
+    def read(self, size=1):
+        size = min(size, len(self._data) - self._pos)
+        self.read_count += 1
+        data = self._prebuilt.get((self._pos, size))
+        if data is None:
+            data = self._data[self._pos:self._pos + size]
+            if size > 1:
+                self.reads.append((self._pos, size))
+        self._pos += size
+        return data
+
+    def readinto(self, b):
+        data = self.read(len(b))
+        n = len(data)
+        b[:n] = data
+        return n
+
+
+def legacy_read(port):
+    data = port.readline().decode().strip()
+    channel, timestamp, voltage, current = data.split(',')
+    return int(channel), float(timestamp), float(voltage), float(current)
+
+
+def smu_for(port):
+    smu = SMU.__new__(SMU)
+    smu.connection_type = ConnectionType.USB
+    smu._connection = port
+    smu._init_buffers()
+    return smu
+
+
+def measure(name, read, data, budget=False):
+    """Print one row; returns False when budget is set and the peak per sample exceeds it"""
+    # Timing run without tracing; read() returns the number of samples it read
+    port = FakeSerial(data, chunk)
+    read_some = read(port)
+    done = 0
+    start = time.perf_counter()
+    while done < samples:
+        done += read_some()
+    per_sample_us = (time.perf_counter() - start) / done * 1e6
+
+    # Allocation run: peak transient bytes per sample, and what is left afterwards
+    port = FakeSerial(data, chunk, port.reads)
+    read_some = read(port)
+    traced = min(samples, 20000)
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    worst = total = done = 0
+    while done < traced:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        count = read_some()
+        peak = tracemalloc.get_traced_memory()[1] - before
+        done += count
+        worst = max(worst, peak)
+        total += peak
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    limit = SAMPLE_BUDGET + READ_BUDGET * port.read_count / done
+    within = not budget or total / done <= limit
+    note = f"  (budget {limit:.0f}{'' if within else ', EXCEEDED'})" if budget else ''
+    print(f"{name:<28}{per_sample_us:>10.2f}{total / done:>14.0f}{worst:>12}{retained:>14}{note}")
+    return within
+
+
+def legacy(port):
+    def read():
+        legacy_read(port)
+        return 1
+    return read
+
+
+def buffered(port):
+    smu = smu_for(port)
+
+    def read():
+        smu.read_streaming_data()
+        return 1
+    return read
+
+
+def buffered_into(port):
+    smu = smu_for(port)
+    out = array('d', bytes(8 * 4 * 64))  # Offsets stay small ints, so the reader allocates nothing
+    position = [0]
+
+    def read():
+        smu.read_streaming_into(out, position[0])
+        position[0] = (position[0] + 4) % len(out)
+        return 1
+    return read
+
+
+def buffered_block(port):
+    smu = smu_for(port)
+    out = array('d', bytes(8 * 4 * 1024))
+    return lambda: smu.read_streaming_block(out)
+
+
+data = stream(samples)
+print(f"{samples} samples, {chunk}-byte reads ({len(data) / samples:.0f} bytes/line)")
+print(f"{'parser':<28}{'µs/sample':>10}{'peak B/sample':>14}{'worst B':>12}{'retained B':>14}")
+measure('readline + split (original)', legacy, data)
+within = [measure('read_streaming_data', buffered, data, budget=True),
+          measure('read_streaming_into array', buffered_into, data, budget=True),
+          measure('read_streaming_block', buffered_block, data, budget=True)]
+if not all(within):
+    sys.exit(f"peak allocation over budget ({SAMPLE_BUDGET} B/sample + {READ_BUDGET} B/read)")
@@ -0,0 +1,67 @@
+/*
+Per-sample cost of step statistics vs buffer size
+
+Compares the original full-scan analysis (filter + reduce over the buffer on
+every sample) with the O(1) RunningStats update used by the cycler.
+
+usage: node benchmarks/step_stats_benchmark.js [FULL SCAN SAMPLES PER SIZE]
+*/
+
+const { RunningStats, performArrayAnalysis } = require('../step_stats');
+
+const scanSamples = parseInt(process.argv[2]) || 1000;
+const runningSamples = 200000;
+const sizes = [1000, 10000, 100000];
+
+function point(i) {
+  return { channel: 1, time_ms: i * 100, voltage_V: 3.7 + 0.0001 * Math.sin(i / 50), current_A: 0.001 + 1e-6 * (i % 7) };
+}
+
+function timePerSample(samples, fn) {
+  const start = process.hrtime.bigint();
+  for (let i = 0; i < samples; i++) fn(i);
+  return Number(process.hrtime.bigint() - start) / samples / 1000; // µs
+}
+
+// Warm up the JIT so the first buffer size isn't penalised
+const warm = new RunningStats();
+for (let i = 0; i < 100000; i++) {
+  warm.add(i, 3.7, 0.001);
+  if (i > 10) warm.remove(3.7, 0.001);
+  warm.analysis();
+}
+
+console.log(`${scanSamples} full-scan / ${runningSamples} running samples per buffer size`);
+console.log('buffer'.padEnd(10) + 'full scan (µs/sample)'.padEnd(26) + 'running (µs/sample)');
+
+for (const blen of sizes) {
+  // Full scan: buffer already full, whole buffer belongs to the current step
+  const buffer = [];
+  for (let i = 0; i < blen; i++) buffer.push(point(i));
+  const scan = timePerSample(scanSamples, i => {
+    buffer.push(point(blen + i));
+    buffer.shift();
+    performArrayAnalysis(buffer, 0);
+  });
+
+  // Running: statistics maintained incrementally over the same sliding window
+  const points = [];
+  for (let i = 0; i < blen + runningSamples; i++) points.push(point(i));
+  const stats = new RunningStats();
+  for (let i = 0; i < blen; i++) stats.add(points[i].time_ms, points[i].voltage_V, points[i].current_A);
+  const running = timePerSample(runningSamples, i => {
+    const p = points[blen + i];
+    stats.add(p.time_ms, p.voltage_V, p.current_A);
+    stats.remove(points[i].voltage_V, points[i].current_A);
+    stats.analysis();
+  });
+  const ring = points.slice(runningSamples);
+
+  // Sanity check: both agree on the final buffer
+  const a = performArrayAnalysis(ring, 0);
+  const b = stats.analysis();
+  const agree = ['voltageTrend', 'currentStability', 'stepAvgVoltage', 'stepAvgCurrent']
+    .every(k => Math.abs(a[k] - b[k]) <= 1e-9 * Math.max(1, Math.abs(a[k]))) && a.dataPointsInStep === b.dataPointsInStep;
+
+  console.log(String(blen).padEnd(10) + scan.toFixed(3).padEnd(26) + running.toFixed(3) + (agree ? '' : '  (MISMATCH)'));
+}
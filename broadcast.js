@@ -0,0 +1,196 @@
+/*
+Coalesced, rate-limited Socket.IO broadcast
+
+Instead of one JSON message per sample per client, a timer runs every
+intervalMs and sends each subscribed client one 'frame' per channel holding
+every sample it has not yet seen, read straight from the channel ring buffers
+by sequence number. Frame payload:
+
+  {
+    channel: 1,
+    first_seq: 12345,            // seq of the first sample in the frame
+    count: 42,
+    fields: ['time_ms', 'voltage_V', 'current_A'],
+    layout: 'columnar-f64le',    // count time values, then count V, then count I
+    data: <Buffer>               // packed little-endian Float64Array
+  }
+
+A jump in first_seq versus the previous frame's first_seq + count means samples
+were overwritten in the ring before the client could be sent them.
+
+Clients opt in with socket.emit('subscribe', {...}):
+  channels  - array of channels to receive frames for (default [])
+  maxRate   - maximum frames per second per channel (default: every tick)
+  cycler    - receive batched 'cycler_frame' events ({first_seq, points: [...]})
+  raw       - receive the raw serial text as coalesced 'data' events
+'unsubscribe' drops all subscriptions.
+*/
+
+const { float64LE } = require('./ring_buffer');
+
+const FRAME_FIELDS = ['time_ms', 'voltage_V', 'current_A'];
+const CYCLER_HISTORY = 10000;
+
+class BroadcastScheduler {
+  constructor(io, buffers, { intervalMs = 100 } = {}) {
+    this.io = io;
+    this.buffers = buffers;     // { 1: ChannelRingBuffer, 2: ChannelRingBuffer }
+    this.intervalMs = intervalMs;
+    this.clients = new Map();
+
+    this.rawPending = '';
+    this.cyclerPoints = [];     // Recent cycler points; cyclerPoints[0] has seq cyclerFirstSeq
+    this.cyclerFirstSeq = 0;
+
+    this.framesSent = 0;
+    this.bytesSent = 0;
+
+    this.timer = setInterval(() => this.tick(), intervalMs);
+    if (this.timer.unref) this.timer.unref();
+  }
+
+  attach(socket) {
+    const client = {
+      socket: socket,
+      channels: new Set(),
+      minIntervalMs: 0,
+      lastSent: {},
+      nextSeq: {},
+      cycler: false,
+      cyclerSeq: 0,
+      raw: false
+    };
+    this.clients.set(socket.id, client);
+
+    socket.on('subscribe', (options) => {
+      options = options || {};
+      client.channels = new Set((options.channels || []).map(Number).filter(ch => this.buffers[ch]));
+      client.minIntervalMs = options.maxRate > 0 ? 1000 / options.maxRate : 0;
+      for (const ch of client.channels) {
+        if (client.nextSeq[ch] === undefined) client.nextSeq[ch] = this.buffers[ch].nextSeq;
+      }
+      if (options.cycler && !client.cycler) client.cyclerSeq = this.cyclerNextSeq();
+      client.cycler = !!options.cycler;
+      client.raw = !!options.raw;
+      socket.emit('subscribed', {
+        channels: [...client.channels],
+        maxRate: options.maxRate || null,
+        cycler: client.cycler,
+        raw: client.raw,
+        intervalMs: this.intervalMs,
+        fields: FRAME_FIELDS
+      });
+    });
+
+    socket.on('unsubscribe', () => {
+      client.channels.clear();
+      client.nextSeq = {};
+      client.cycler = false;
+      client.raw = false;
+    });
+
+    socket.on('disconnect', () => this.clients.delete(socket.id));
+  }
+
+  raw(text) {
+    this.rawPending += text;
+  }
+
+  cyclerNextSeq() {
+    return this.cyclerFirstSeq + this.cyclerPoints.length;
+  }
+
+  // Retained cycler points with seq >= since (at most limit); first_seq is the seq of points[0]
+  cyclerRange(since, limit = Infinity) {
+    const from = Math.min(this.cyclerNextSeq(), Math.max(since, this.cyclerFirstSeq));
+    const start = from - this.cyclerFirstSeq;
+    return {
+      first_seq: from,
+      next_seq: this.cyclerNextSeq(),
+      points: this.cyclerPoints.slice(start, start + Math.min(limit, this.cyclerPoints.length))
+    };
+  }
+
+  queueCycler(point) {
+    this.cyclerPoints.push(point);
+    if (this.cyclerPoints.length > 2 * CYCLER_HISTORY) {
+      const drop = this.cyclerPoints.length - CYCLER_HISTORY;
+      this.cyclerPoints.splice(0, drop);
+      this.cyclerFirstSeq += drop;
+    }
+  }
+
+  // Pack samples [fromSeq, toSeq) of a channel into a frame
+  buildFrame(channel, fromSeq, toSeq) {
+    const ring = this.buffers[channel];
+    const start = ring.indexOfSeq(fromSeq);
+    const count = toSeq - fromSeq;
+    const packed = ring.packColumns(start, start + count, FRAME_FIELDS);
+    return {
+      channel: channel,
+      first_seq: fromSeq,
+      count: count,
+      fields: FRAME_FIELDS,
+      layout: 'columnar-f64le',
+      data: float64LE(packed)
+    };
+  }
+
+  tick() {
+    const now = Date.now();
+    const frames = new Map();   // Share identical frames between clients this tick
+    const raw = this.rawPending;
+    this.rawPending = '';
+
+    for (const client of this.clients.values()) {
+      for (const ch of client.channels) {
+        const ring = this.buffers[ch];
+        if (now - (client.lastSent[ch] || 0) < client.minIntervalMs) continue;
+        const fromSeq = Math.max(client.nextSeq[ch], ring.firstSeq);
+        const toSeq = ring.nextSeq;
+        if (toSeq <= fromSeq) continue;
+
+        const key = `${ch}:${fromSeq}`;
+        if (!frames.has(key)) frames.set(key, this.buildFrame(ch, fromSeq, toSeq));
+        const frame = frames.get(key);
+        client.socket.emit('frame', frame);
+        client.nextSeq[ch] = toSeq;
+        client.lastSent[ch] = now;
+        this.framesSent++;
+        this.bytesSent += frame.data.length;
+      }
+
+      if (client.cycler) {
+        const fromSeq = Math.max(client.cyclerSeq, this.cyclerFirstSeq);
+        const toSeq = this.cyclerNextSeq();
+        if (toSeq > fromSeq) {
+          const points = this.cyclerPoints.slice(fromSeq - this.cyclerFirstSeq);
+          client.socket.emit('cycler_frame', { first_seq: fromSeq, points: points });
+          client.cyclerSeq = toSeq;
+          this.framesSent++;
+        }
+      }
+
+      if (client.raw && raw) {
+        client.socket.emit('data', raw);
+        this.bytesSent += raw.length;
+      }
+    }
+  }
+
+  stats() {
+    let subscribed = 0;
+    for (const client of this.clients.values()) {
+      if (client.channels.size || client.cycler || client.raw) subscribed++;
+    }
+    return {
+      clients: this.clients.size,
+      subscribed: subscribed,
+      framesSent: this.framesSent,
+      bytesSent: this.bytesSent,
+      intervalMs: this.intervalMs
+    };
+  }
+}
+
+module.exports = { BroadcastScheduler, FRAME_FIELDS };
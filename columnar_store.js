@@ -0,0 +1,332 @@
+/*
+Columnar test store (layout shared with python_examples/columnar_archive.py)
+
+A battery_test_*.columns/ directory holds one raw little-endian file per column,
+an index.i64 of [cycle, step, start, end) rows per contiguous step and a
+metadata.json describing both. ColumnarWriter appends cycler rows to such a
+directory while a test runs, so it can be the cycler's only sink. Chunks are
+written asynchronously through a queue (one chunk at a time, so the columns stay
+in order) while the next chunk fills; the index and metadata.json are rewritten
+(atomically) every metadataIntervalMs and on close, so readers always see a
+consistent prefix of the test. With { append: true } a writer reopens an
+existing directory (cycler crash recovery): every column is cut back to the rows
+complete in all of them and the index is rebuilt from the cycle/step columns, so
+rows written after the last metadata.json are kept and a partial chunk is dropped.
+*/
+
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { promisify } = require('util');
+
+const writeAsync = promisify(fs.write);
+const closeAsync = promisify(fs.close);
+
+const ARCHIVE_STEP_TYPES = ['cc', 'cv', 'ocv', 'rest', 'unknown'];
+const ARCHIVE_COLUMNS = {
+  time_ms:   { file: 'time_ms.f64',   dtype: 'f8', type: Float64Array },
+  voltage_v: { file: 'voltage_v.f64', dtype: 'f8', type: Float64Array },
+  current_a: { file: 'current_a.f64', dtype: 'f8', type: Float64Array },
+  step_ah:   { file: 'step_ah.f64',   dtype: 'f8', type: Float64Array },
+  cycle:     { file: 'cycle.i32',     dtype: 'i4', type: Int32Array },
+  step:      { file: 'step.i32',      dtype: 'i4', type: Int32Array },
+  step_type: { file: 'step_type.u8',  dtype: 'u1', type: Uint8Array }
+};
+const INDEX_FILE = 'index.i64';
+
+function stepTypeCode(stepType) {
+  const code = ARCHIVE_STEP_TYPES.indexOf(stepType);
+  return code >= 0 ? code : ARCHIVE_STEP_TYPES.length - 1;
+}
+
+function archiveMetadata(rows, testMetadata) {
+  return {
+    format: 'minismush-columnar',
+    version: 1,
+    rows: rows,
+    byte_order: os.endianness() === 'LE' ? 'little' : 'big',
+    columns: Object.fromEntries(Object.entries(ARCHIVE_COLUMNS)
+      .map(([name, spec]) => [name, { file: spec.file, dtype: spec.dtype }])),
+    index: { file: INDEX_FILE, dtype: 'i8', fields: ['cycle', 'step', 'start', 'end'] },
+    step_types: ARCHIVE_STEP_TYPES,
+    test: testMetadata
+  };
+}
+
+// Write a file via a temporary name so readers never see a partial file
+function writeFileAtomic(file, data) {
+  const tmp = `${file}.tmp`;
+  fs.writeFileSync(tmp, data);
+  fs.renameSync(tmp, file);
+}
+
+async function writeFileAtomicAsync(file, data) {
+  const tmp = `${file}.tmp`;
+  await fs.promises.writeFile(tmp, data);
+  await fs.promises.rename(tmp, file);
+}
+
+// index: array of [cycle, step, start, end]
+function packIndex(index) {
+  const indexArray = new BigInt64Array(index.length * 4);
+  index.forEach((entry, n) => {
+    for (let k = 0; k < 4; k++) indexArray[n * 4 + k] = BigInt(entry[k]);
+  });
+  return Buffer.from(indexArray.buffer);
+}
+
+function writeIndex(dir, index) {
+  writeFileAtomic(path.join(dir, INDEX_FILE), packIndex(index));
+}
+
+function writeMetadata(dir, rows, testMetadata) {
+  writeFileAtomic(path.join(dir, 'metadata.json'), JSON.stringify(archiveMetadata(rows, testMetadata), null, 2));
+}
+
+// Write all of buffer at the file's current (append) position
+async function writeFully(fd, buffer) {
+  let offset = 0;
+  while (offset < buffer.length) {
+    const { bytesWritten } = await writeAsync(fd, buffer, offset, buffer.length - offset, null);
+    offset += bytesWritten;
+  }
+}
+
+// Rows present in every column file of an existing directory
+function completeRows(dir) {
+  let rows = Infinity;
+  for (const spec of Object.values(ARCHIVE_COLUMNS)) {
+    const file = path.join(dir, spec.file);
+    const size = fs.existsSync(file) ? fs.statSync(file).size : 0;
+    rows = Math.min(rows, Math.floor(size / spec.type.BYTES_PER_ELEMENT));
+  }
+  return rows;
+}
+
+// Index entries [cycle, step, start, end) rebuilt from the first `rows` cycle/step values
+function indexFromColumns(dir, rows) {
+  const read = (spec) => {
+    const bytes = fs.readFileSync(path.join(dir, spec.file)).subarray(0, rows * 4);
+    return new Int32Array(bytes.buffer.slice(bytes.byteOffset, bytes.byteOffset + bytes.length));
+  };
+  const cycle = read(ARCHIVE_COLUMNS.cycle);
+  const step = read(ARCHIVE_COLUMNS.step);
+  const index = [];
+  for (let n = 0; n < rows; n++) {
+    const last = index[index.length - 1];
+    if (last && last[0] === cycle[n] && last[1] === step[n]) {
+      last[3] = n + 1;
+    } else {
+      index.push([cycle[n], step[n], n, n + 1]);
+    }
+  }
+  return index;
+}
+
+// Appends cycler data rows (the SQLite data-table value order) to a columnar directory
+class ColumnarWriter {
+  constructor(dir, testMetadata, { chunkRows = 1000, intervalMs = 1000, metadataIntervalMs = 5000, append = false } = {}) {
+    this.dir = dir;
+    this.chunkRows = chunkRows;
+    this.intervalMs = intervalMs;
+    this.metadataIntervalMs = metadataIntervalMs;
+    this.closed = false;
+    this.pending = 0;   // Rows in the filling chunk
+    this.rows = 0;      // Rows handed to the write queue (numbering for the index)
+    this.index = [];
+
+    let existing = {};
+    if (append) {
+      const metadata = JSON.parse(fs.readFileSync(path.join(dir, 'metadata.json'), 'utf8'));
+      existing = metadata.test || {};
+      this.rows = completeRows(dir);
+    }
+    this.testMetadata = Object.assign({}, existing, testMetadata);
+
+    fs.mkdirSync(dir, { recursive: true });
+    this.fds = {};
+    for (const [name, spec] of Object.entries(ARCHIVE_COLUMNS)) {
+      const file = path.join(dir, spec.file);
+      if (append) {
+        // Drop bytes past the last row complete in every column
+        fs.truncateSync(file, this.rows * spec.type.BYTES_PER_ELEMENT);
+      }
+      this.fds[name] = fs.openSync(file, append ? 'a' : 'w');
+    }
+    if (append) this.index = indexFromColumns(dir, this.rows);
+    this.chunk = this._newChunk();
+    this.spareChunks = [];
+    this.writing = Promise.resolve();  // Write queue: chunks and metadata are written in order
+    this.inFlight = 0;
+
+    this.rowsWritten = this.rows;
+    this.metadataRows = this.rows;
+    this.lastMetadataMs = Date.now();
+    this.flushes = 0;
+    this.errors = 0;
+    this.lastFlushMs = 0;
+    this.maxFlushMs = 0;
+    this.totalFlushMs = 0;
+
+    writeIndex(dir, this.index);
+    writeMetadata(dir, this.rows, this.testMetadata);
+
+    this.timer = setInterval(() => this.flush(), intervalMs);
+    if (this.timer.unref) this.timer.unref();
+  }
+
+  _newChunk() {
+    const chunk = {};
+    for (const [name, spec] of Object.entries(ARCHIVE_COLUMNS)) chunk[name] = new spec.type(this.chunkRows);
+    return chunk;
+  }
+
+  // row: [timestamp, unix_timestamp, cycle, step, step_type, step_time_s, total_time_s,
+  //       voltage_v, current_a, step_ah, cycle_ah, total_ah, temperature_c, notes, ...step analysis]
+  push(row) {
+    if (this.closed) return;
+    const i = this.pending;
+    this.chunk.time_ms[i] = row[1];
+    this.chunk.cycle[i] = row[2];
+    this.chunk.step[i] = row[3];
+    this.chunk.step_type[i] = stepTypeCode(row[4]);
+    this.chunk.voltage_v[i] = row[7] === null ? NaN : row[7];
+    this.chunk.current_a[i] = row[8] === null ? NaN : row[8];
+    this.chunk.step_ah[i] = row[9];
+
+    const rowNumber = this.rows + i;
+    const last = this.index[this.index.length - 1];
+    if (last && last[0] === row[2] && last[1] === row[3]) {
+      last[3] = rowNumber + 1;
+    } else {
+      this.index.push([row[2], row[3], rowNumber, rowNumber + 1]);
+    }
+
+    this.pending++;
+    if (this.pending >= this.chunkRows) this.flush();
+  }
+
+  // Queue the filling chunk for writing (pushes continue into a spare chunk);
+  // callback(null) runs once everything queued so far is on disk
+  flush(callback) {
+    if (this.pending > 0) {
+      const chunk = this.chunk;
+      const count = this.pending;
+      this.chunk = this.spareChunks.pop() || this._newChunk();
+      this.pending = 0;
+      this.rows += count;
+      this.inFlight += count;
+      this._enqueue(() => this._writeChunk(chunk, count));
+    }
+    if (this.rows !== this.metadataRows && Date.now() - this.lastMetadataMs >= this.metadataIntervalMs) {
+      this.lastMetadataMs = Date.now();
+      this._enqueue(() => this._writeMetadata());
+    }
+    if (callback) this.writing.then(() => callback(null));
+  }
+
+  _enqueue(task) {
+    this.writing = this.writing.then(task).catch((err) => {
+      this.errors++;
+      console.error('Columnar write error:', err.message);
+    });
+  }
+
+  async _writeChunk(chunk, count) {
+    const started = process.hrtime.bigint();
+    try {
+      await Promise.all(Object.keys(ARCHIVE_COLUMNS).map((name) => {
+        const column = chunk[name].subarray(0, count);
+        return writeFully(this.fds[name], Buffer.from(column.buffer, column.byteOffset, column.byteLength));
+      }));
+      this.rowsWritten += count;
+    } finally {
+      this.inFlight -= count;
+      this.spareChunks.push(chunk);
+      const elapsedMs = Number(process.hrtime.bigint() - started) / 1e6;
+      this.flushes++;
+      this.lastFlushMs = elapsedMs;
+      this.totalFlushMs += elapsedMs;
+      if (elapsedMs > this.maxFlushMs) this.maxFlushMs = elapsedMs;
+    }
+  }
+
+  // index.i64 and metadata.json for the rows written so far
+  async _writeMetadata() {
+    const rows = this.rowsWritten;
+    const index = [];
+    for (const entry of this.index) {
+      if (entry[2] >= rows) break;
+      index.push([entry[0], entry[1], entry[2], Math.min(entry[3], rows)]);
+    }
+    await writeFileAtomicAsync(path.join(this.dir, INDEX_FILE), packIndex(index));
+    await writeFileAtomicAsync(path.join(this.dir, 'metadata.json'),
+      JSON.stringify(archiveMetadata(rows, this.testMetadata), null, 2));
+    this.metadataRows = rows;
+  }
+
+  // Write the last chunk, merge final metadata (end_time, test_status, ...) and close the column files
+  close(finalMetadata = {}, callback = () => {}) {
+    if (this.closed) return callback(null);
+    this.closed = true;
+    clearInterval(this.timer);
+    this.flush();
+    Object.assign(this.testMetadata, finalMetadata);
+    this.writing
+      .then(async () => {
+        await this._writeMetadata();
+        await Promise.all(Object.values(this.fds).map((fd) => closeAsync(fd)));
+      })
+      .then(() => callback(null), callback);
+  }
+
+  stats() {
+    return {
+      queueDepth: this.pending,
+      inFlight: this.inFlight,
+      rowsWritten: this.rowsWritten,
+      flushes: this.flushes,
+      errors: this.errors,
+      lastFlushMs: this.lastFlushMs,
+      maxFlushMs: this.maxFlushMs,
+      totalFlushMs: this.totalFlushMs,
+      maxRows: this.chunkRows,
+      intervalMs: this.intervalMs
+    };
+  }
+}
+
+// Read rows [start, end) of every column from a columnar directory
+function readColumns(dir, metadata, start, end) {
+  const out = {};
+  const littleEndian = (metadata.byte_order || 'little') === 'little';
+  if (littleEndian !== (os.endianness() === 'LE')) {
+    throw new Error('Columnar archive byte order does not match this machine');
+  }
+  for (const [name, spec] of Object.entries(ARCHIVE_COLUMNS)) {
+    const type = spec.type;
+    const bytes = (end - start) * type.BYTES_PER_ELEMENT;
+    const buffer = Buffer.alloc(bytes);
+    const fd = fs.openSync(path.join(dir, metadata.columns[name].file), 'r');
+    try {
+      fs.readSync(fd, buffer, 0, bytes, start * type.BYTES_PER_ELEMENT);
+    } finally {
+      fs.closeSync(fd);
+    }
+    out[name] = new type(buffer.buffer, buffer.byteOffset, end - start);
+  }
+  return out;
+}
+
+module.exports = {
+  ARCHIVE_STEP_TYPES,
+  ARCHIVE_COLUMNS,
+  INDEX_FILE,
+  ColumnarWriter,
+  archiveMetadata,
+  readColumns,
+  stepTypeCode,
+  writeFileAtomic,
+  writeIndex,
+  writeMetadata
+};
@@ -0,0 +1,766 @@
+"""
+Python-native battery cycler running directly on smu.SMU
+
+Runs the same step definitions as the nodeforwarder cycler (see
+BatteryCycler.create_cycle_steps in python_examples/minismush_client.py) without
+the HTTP/Node hop: samples are read from the SMU stream and checked against the
+step cutoffs as soon as they are parsed. Step statistics and Ah integration are
+updated incrementally in O(1) per sample, and rows are written to a
+battery_test_*.db with the server's schema by a background batching writer.
+
+Usage:
+    python cycler_engine.py /dev/ttyACM0 steps.json --channel 1 --cycles 3
+"""
+
+import json
+import math
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Union
+
+from smu import SMU, ConnectionType, SMUException
+
+STEP_MODES = ('cc', 'cv', 'ocv', 'rest')
+
+
+def _iso(ms: float) -> str:
+    """UTC timestamp in the same format as JavaScript's Date.toISOString()"""
+    return datetime.fromtimestamp(ms / 1000, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+class CyclerEngineError(Exception):
+    """Errors raised by the Python cycler engine"""
+    pass
+
+
+def validate_steps(steps: List[Dict]) -> bool:
+    """
+    Validate a step definition list (mirrors validateCyclerSteps in nodeforwarder.js)
+
+    Raises:
+        CyclerEngineError: If the definition is invalid
+    """
+    if not isinstance(steps, list):
+        raise CyclerEngineError('Steps must be a list')
+
+    cycle_start_found = False
+    cycle_end_found = False
+    for i, step in enumerate(steps):
+        if step.get('cycle') == 'start':
+            cycle_start_found = True
+            continue
+        if step.get('cycle') == 'end':
+            cycle_end_found = True
+            continue
+        if step.get('mode') not in STEP_MODES:
+            raise CyclerEngineError(f"Invalid step mode: {step.get('mode')} at step {i}")
+        if step['mode'] == 'cc' and 'current' not in step:
+            raise CyclerEngineError(f"CC step missing current at step {i}")
+        if step['mode'] == 'cv' and 'voltage' not in step:
+            raise CyclerEngineError(f"CV step missing voltage at step {i}")
+        rate = step.get('sample_rate')
+        if rate is not None and not (isinstance(rate, (int, float)) and rate > 0):
+            raise CyclerEngineError(f"sample_rate must be a positive number of Hz at step {i}")
+
+    if not cycle_start_found:
+        raise CyclerEngineError('Cycle definition must include {"cycle":"start"}')
+    if not cycle_end_found:
+        raise CyclerEngineError('Cycle definition must include {"cycle":"end"}')
+    return True
+
+
+class StepStatistics:
+    """
+    Running per-step statistics, O(1) per sample
+
+    Welford mean/variance for voltage and current, plus the voltage slope across
+    the last `trend_window` samples (same definition as the server's voltageTrend).
+    """
+
+    def __init__(self, trend_window: int = 10):
+        self._window = deque(maxlen=trend_window)
+        self.reset()
+
+    def reset(self):
+        """Start a new step"""
+        self.count = 0
+        self.mean_voltage = 0.0
+        self.mean_current = 0.0
+        self._m2_current = 0.0
+        self._window.clear()
+
+    def add(self, time_ms: float, voltage: float, current: float):
+        """Fold one sample into the statistics"""
+        self.count += 1
+        self.mean_voltage += (voltage - self.mean_voltage) / self.count
+        delta = current - self.mean_current
+        self.mean_current += delta / self.count
+        self._m2_current += delta * (current - self.mean_current)
+        self._window.append((time_ms, voltage))
+
+    @property
+    def voltage_trend(self) -> float:
+        """V/s across the trend window"""
+        if len(self._window) < 2:
+            return 0.0
+        (t0, v0), (t1, v1) = self._window[0], self._window[-1]
+        dt = (t1 - t0) / 1000
+        return (v1 - v0) / dt if dt > 0 else 0.0
+
+    @property
+    def current_stability(self) -> float:
+        """Coefficient of variation of current (0 = perfectly stable)"""
+        if self.count < 2 or abs(self.mean_current) <= 1e-9:
+            return 0.0
+        return math.sqrt(self._m2_current / self.count) / abs(self.mean_current)
+
+    def as_dict(self) -> Dict:
+        """Same keys as the server's performArrayAnalysis result"""
+        return {
+            'voltageTrend': self.voltage_trend,
+            'currentStability': self.current_stability,
+            'stepAvgVoltage': self.mean_voltage,
+            'stepAvgCurrent': self.mean_current,
+            'dataPointsInStep': self.count,
+        }
+
+
+class AdaptiveSampleRate:
+    """
+    Streaming rate chosen from the step state (mirrors sample_rate.js)
+
+    Each step mode has a base rate; the rate bursts for burstSeconds after a step
+    change and while the signed voltage trend would reach a voltage cutoff (cutoff_V
+    in cc/cv, cutoff_V_min/cutoff_V_max in any mode) within approachSeconds, and drops to flatRate once |voltageTrend| has stayed below flatTrend for
+    flatSeconds (flatModes only). A step's own sample_rate pins the rate.
+    """
+
+    DEFAULT_POLICY = {
+        'rates': {'cc': 10, 'cv': 10, 'rest': 2, 'ocv': 2},  # Hz
+        'burstRate': 100,
+        'burstSeconds': 10,
+        'approachSeconds': 30,
+        'flatRate': 1,
+        'flatTrend': 1e-5,  # V/s
+        'flatSeconds': 60,
+        'flatModes': ['cc', 'rest', 'ocv'],
+        'minChangeSeconds': 2,
+    }
+    # Voltage cutoffs that end a step, with the modes they apply in (None: every mode)
+    VOLTAGE_CUTOFFS = (('cutoff_V', ('cc', 'cv')), ('cutoff_V_min', None), ('cutoff_V_max', None))
+
+    def __init__(self, overrides: Optional[Dict] = None):
+        overrides = overrides or {}
+        self.policy = dict(self.DEFAULT_POLICY, **overrides)
+        self.policy['rates'] = dict(self.DEFAULT_POLICY['rates'], **overrides.get('rates', {}))
+        rates = list(self.policy['rates'].values()) + [self.policy['burstRate'], self.policy['flatRate']]
+        if not all(isinstance(r, (int, float)) and r > 0 for r in rates):
+            raise CyclerEngineError('Adaptive sample rates must be positive numbers of Hz')
+        self.rate = None
+        self.reason = None
+        self.changes = 0
+        self._last_change_ms = -math.inf
+        self._step_start_ms = None
+        self._flat_since_ms = None
+
+    def step_changed(self, now_ms: float, step: Dict) -> Optional[float]:
+        """A step started; returns the rate to apply"""
+        self._step_start_ms = now_ms
+        self._flat_since_ms = None
+        return self._apply(now_ms, self._target(now_ms, step, None, 0.0), force=True)
+
+    def update(self, now_ms: float, step: Dict, voltage: float, voltage_trend: float) -> Optional[float]:
+        """One sample; returns the new rate, or None when it stays the same"""
+        if self._step_start_ms is None:
+            self._step_start_ms = now_ms
+        return self._apply(now_ms, self._target(now_ms, step, voltage, voltage_trend))
+
+    def _target(self, now_ms, step, voltage, voltage_trend):
+        policy = self.policy
+        if step.get('sample_rate'):
+            return step['sample_rate'], 'step'
+        base = policy['rates'].get(step['mode'], policy['rates']['cc'])
+
+        if now_ms - self._step_start_ms < policy['burstSeconds'] * 1000:
+            return max(base, policy['burstRate']), 'step change'
+        if voltage is not None and self._approaching_cutoff(step, voltage, voltage_trend):
+            return max(base, policy['burstRate']), 'approaching cutoff'
+        if step['mode'] in policy['flatModes'] and abs(voltage_trend) < policy['flatTrend']:
+            if self._flat_since_ms is None:
+                self._flat_since_ms = now_ms
+            if now_ms - self._flat_since_ms >= policy['flatSeconds'] * 1000:
+                return min(base, policy['flatRate']), 'flat'
+        else:
+            self._flat_since_ms = None
+        return base, 'base'
+
+    def _approaching_cutoff(self, step, voltage, voltage_trend):
+        """True when the trend reaches a voltage cutoff within approachSeconds (not when moving away)"""
+        if not voltage_trend:
+            return False
+        for field, modes in self.VOLTAGE_CUTOFFS:
+            if field not in step or (modes and step['mode'] not in modes):
+                continue
+            seconds = (step[field] - voltage) / voltage_trend
+            if 0 < seconds <= self.policy['approachSeconds']:
+                return True
+        return False
+
+    def _apply(self, now_ms, target, force=False):
+        rate, reason = target
+        if rate == self.rate:
+            self.reason = reason
+            return None
+        if (not force and self.rate is not None and rate < self.rate and
+                now_ms - self._last_change_ms < self.policy['minChangeSeconds'] * 1000):
+            return None
+        self.rate, self.reason = rate, reason
+        self._last_change_ms = now_ms
+        self.changes += 1
+        return rate
+
+    def as_dict(self) -> Dict:
+        """Same keys as the server's cycler status sampleRate"""
+        return {'rate': self.rate, 'reason': self.reason, 'changes': self.changes, 'policy': self.policy}
+
+
+class AhIntegrator:
+    """Trapezoidal amp-hour integrator with step, cycle and total counters"""
+
+    def __init__(self):
+        self.total_ah = 0.0
+        self.cycle_ah = 0.0
+        self.step_ah = 0.0
+        self._last_time_ms = None
+        self._last_current = 0.0
+
+    def add(self, time_ms: float, current: float):
+        """Integrate up to this sample"""
+        if self._last_time_ms is not None:
+            delta_ah = (current + self._last_current) / 2 * (time_ms - self._last_time_ms) / 3.6e6
+            self.total_ah += delta_ah
+            self.cycle_ah += delta_ah
+            self.step_ah += delta_ah
+        self._last_time_ms = time_ms
+        self._last_current = current
+
+
+class BatchedSQLiteLogger:
+    """
+    Background writer for battery_test_*.db files
+
+    Rows are queued by the sampling loop and written by a worker thread in one
+    transaction per batch (every `batch_size` rows or `flush_interval` seconds).
+    The database uses WAL mode with synchronous=NORMAL.
+    """
+
+    DATA_COLUMNS = ('timestamp', 'unix_timestamp', 'cycle', 'step', 'step_type', 'step_time_s',
+                    'total_time_s', 'voltage_v', 'current_a', 'step_ah', 'cycle_ah', 'total_ah',
+                    'temperature_c', 'notes', 'voltage_trend', 'current_stability',
+                    'step_avg_voltage', 'step_avg_current', 'data_points_in_step')
+
+    def __init__(self, path: str, metadata: Dict[str, str], batch_size: int = 500,
+                 flush_interval: float = 1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rows_written = 0
+        self.last_flush_s = 0.0
+        self._queue = queue.Queue()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, args=(metadata,), daemon=True)
+        self._thread.start()
+
+    @property
+    def queue_depth(self) -> int:
+        """Rows waiting to be written"""
+        return self._queue.qsize()
+
+    def log(self, row: tuple):
+        """Queue a data row (values in DATA_COLUMNS order)"""
+        if self._error:
+            raise CyclerEngineError(f"SQLite logger failed: {self._error}")
+        self._queue.put(row)
+
+    def set_metadata(self, key: str, value: str):
+        """Queue a metadata upsert"""
+        self._queue.put(('__metadata__', key, value))
+
+    def close(self):
+        """Flush everything queued and close the database"""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self, metadata):
+        conn = sqlite3.connect(self.path)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS metadata (
+                  id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  key TEXT UNIQUE NOT NULL,
+                  value TEXT,
+                  created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                );
+                CREATE TABLE IF NOT EXISTS data (
+                  id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  timestamp DATETIME NOT NULL,
+                  unix_timestamp INTEGER NOT NULL,
+                  cycle INTEGER NOT NULL,
+                  step INTEGER NOT NULL,
+                  step_type TEXT NOT NULL,
+                  step_time_s REAL NOT NULL,
+                  total_time_s REAL NOT NULL,
+                  voltage_v REAL,
+                  current_a REAL,
+                  step_ah REAL NOT NULL,
+                  cycle_ah REAL NOT NULL,
+                  total_ah REAL NOT NULL,
+                  temperature_c REAL,
+                  notes TEXT,
+                  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                  voltage_trend REAL,
+                  current_stability REAL,
+                  step_avg_voltage REAL,
+                  step_avg_current REAL,
+                  data_points_in_step INTEGER
+                );
+            """)
+            with conn:
+                conn.executemany('INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)',
+                                 metadata.items())
+
+            insert = (f"INSERT INTO data ({', '.join(self.DATA_COLUMNS)}) "
+                      f"VALUES ({', '.join('?' * len(self.DATA_COLUMNS))})")
+            done = False
+            while not done:
+                batch, meta = [], []
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        done = True
+                        break
+                    if item[0] == '__metadata__':
+                        meta.append(item[1:])
+                    else:
+                        batch.append(item)
+
+                if batch or meta:
+                    started = time.perf_counter()
+                    with conn:
+                        conn.executemany(insert, batch)
+                        conn.executemany('INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)', meta)
+                    self.last_flush_s = time.perf_counter() - started
+                    self.rows_written += len(batch)
+        except sqlite3.Error as e:
+            self._error = e
+        finally:
+            conn.close()
+
+
+class CyclerEngine:
+    """
+    Battery cycler that drives an smu.SMU directly
+
+    Example:
+        with SMU(ConnectionType.USB, port="/dev/ttyACM0") as smu:
+            engine = CyclerEngine(smu, channel=1, steps=steps, cycles=3)
+            engine.run()
+    """
+
+    def __init__(self, smu: SMU, channel: int, steps: List[Dict], cycles: int = 0,
+                 enable_logging: bool = True, log_dir: str = './data/battery',
+                 metadata: Optional[Dict] = None, sample_rate: Optional[float] = None,
+                 batch_size: int = 500, flush_interval: float = 1.0,
+                 adaptive_rate: Union[bool, Dict, None] = None):
+        """
+        Args:
+            smu: Connected SMU (USB; streaming is USB-only)
+            channel: SMU channel to cycle
+            steps: Step definitions with {"cycle": "start"} / {"cycle": "end"} markers
+            cycles: Number of cycles (0 = repeat until stopped)
+            enable_logging: Write a battery_test_*.db
+            log_dir: Directory for the database
+            metadata: Test metadata (testName, batteryId, ... as for /cycler/start)
+            sample_rate: Optional streaming rate (Hz) to set before starting
+                         (with adaptive_rate: the rate restored when the test stops)
+            batch_size: Rows per SQLite transaction
+            flush_interval: Maximum seconds between SQLite flushes
+            adaptive_rate: True or AdaptiveSampleRate policy overrides to adapt the
+                           streaming rate to the step state
+        """
+        validate_steps(steps)
+        self.smu = smu
+        self.channel = channel
+        self.steps = steps
+        self.total_cycles = cycles
+        self.enable_logging = enable_logging
+        self.log_dir = log_dir
+        self.metadata = metadata or {}
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rate_controller = None
+        if adaptive_rate:
+            self.rate_controller = AdaptiveSampleRate(adaptive_rate if isinstance(adaptive_rate, dict) else None)
+
+        self.is_running = False
+        self.current_cycle = 0
+        self.current_step_index = 0
+        self.current_step = None
+        self.start_time_ms = None
+        self.step_start_time_ms = None
+        self.stats = StepStatistics()
+        self.ah = AhIntegrator()
+        self.log_file = None
+        self._logger = None
+        self._mode = None
+        self._step_first_current = None
+        self._step_seen_positive = False
+
+    # Step control
+    def _set_mode(self, mode: str):
+        if self._mode != mode:
+            self.smu.set_mode(self.channel, mode)
+            self._mode = mode
+
+    def _execute_current_step(self):
+        """Configure the SMU for the current step"""
+        step = self.current_step
+        if step['mode'] == 'cc':
+            self.smu.enable_channel(self.channel)
+            self._set_mode('FIMV')
+            self.smu.set_current(self.channel, step['current'])
+        elif step['mode'] == 'cv':
+            self.smu.enable_channel(self.channel)
+            self._set_mode('FVMI')
+            self.smu.set_voltage(self.channel, step['voltage'])
+        else:
+            # OCV/REST: zero current, channel stays enabled to measure voltage
+            self._set_mode('FIMV')
+            self.smu.set_current(self.channel, 0)
+            self.smu.enable_channel(self.channel)
+        if self.rate_controller:
+            self._apply_rate(self.rate_controller.step_changed(self.step_start_time_ms, step))
+
+    def _apply_rate(self, rate: Optional[float]):
+        if rate is not None:
+            self.smu.set_sample_rate(self.channel, rate)
+
+    def _reset_step(self, now_ms: float):
+        self.ah.step_ah = 0.0
+        self.step_start_time_ms = now_ms
+        self.stats.reset()
+        self._step_first_current = None
+        self._step_seen_positive = False
+
+    def _first_step_after_start(self, index: int) -> int:
+        while index < len(self.steps) and self.steps[index].get('cycle') == 'start':
+            index += 1
+        return index
+
+    def advance_to_next_step(self, now_ms: float):
+        """Move to the next step, wrapping cycles; stops when the sequence is done"""
+        self._reset_step(now_ms)
+        self.current_step_index += 1
+
+        while self.current_step_index < len(self.steps):
+            next_step = self.steps[self.current_step_index]
+
+            if next_step.get('cycle') == 'end':
+                self.current_cycle += 1
+                self.ah.cycle_ah = 0.0
+                if self.total_cycles == 0 or self.current_cycle < self.total_cycles:
+                    start = next(i for i, s in enumerate(self.steps) if s.get('cycle') == 'start')
+                    self.current_step_index = start + 1
+                    continue
+                self.stop()
+                return
+
+            if next_step.get('cycle') == 'start':
+                self.current_step_index += 1
+                continue
+
+            self.current_step = next_step
+            self._execute_current_step()
+            return
+
+        self.stop()
+
+    # Cutoff logic (mirrors checkStepCutoffs/checkStepCutoffsWithArrayAnalysis)
+    def _cv_direction(self, step_voltage: float, voltage: float) -> int:
+        if self._step_first_current:
+            return 1 if self._step_first_current > 0 else -1
+        if step_voltage > voltage:
+            return 1
+        if step_voltage < voltage:
+            return -1
+        return 0
+
+    def check_cutoffs(self, voltage: float, current: float, step_time_s: float) -> bool:
+        """True if the current step should end on this sample"""
+        step = self.current_step
+        mode = step['mode']
+        step_ah = self.ah.step_ah
+
+        if 'cutoff_V' in step:
+            cutoff_v = step['cutoff_V']
+            if mode == 'cc':
+                if (step['current'] > 0 and voltage >= cutoff_v) or \
+                   (step['current'] < 0 and voltage <= cutoff_v):
+                    return True
+            elif mode == 'cv':
+                charging = self._step_seen_positive if self.stats.count > 0 else step['voltage'] > 3.5
+                if (charging and voltage <= cutoff_v) or (not charging and voltage >= cutoff_v):
+                    return True
+
+        if 'cutoff_V_min' in step and voltage <= step['cutoff_V_min']:
+            return True
+        if 'cutoff_V_max' in step and voltage >= step['cutoff_V_max']:
+            return True
+
+        if 'cutoff_A' in step:
+            cutoff_a = step['cutoff_A']
+            if mode == 'cc':
+                if abs(current) <= abs(cutoff_a):
+                    return True
+            elif mode == 'cv':
+                direction = self._cv_direction(step['voltage'], voltage)
+                if direction > 0:
+                    if (cutoff_a > 0 and 0 <= current <= cutoff_a) or current < 0:
+                        return True
+                elif direction < 0:
+                    if (cutoff_a < 0 and cutoff_a <= current <= 0) or current > 0:
+                        return True
+                elif abs(current) <= abs(cutoff_a):
+                    return True
+
+        if 'cutoff_Ah' in step:
+            cutoff_ah = step['cutoff_Ah']
+            if mode == 'cc':
+                if abs(step_ah) >= abs(cutoff_ah):
+                    return True
+            elif mode == 'cv':
+                direction = self._cv_direction(step['voltage'], voltage)
+                if direction > 0:
+                    if cutoff_ah > 0 and step_ah >= cutoff_ah:
+                        return True
+                elif direction < 0:
+                    if cutoff_ah < 0 and step_ah <= cutoff_ah:
+                        return True
+                elif abs(step_ah) >= abs(cutoff_ah):
+                    return True
+
+        if 'cutoff_time_s' in step and step_time_s >= step['cutoff_time_s']:
+            return True
+
+        # Statistics-based cutoffs
+        if mode == 'cv' and 'cutoff_A' in step:
+            if abs(self.stats.voltage_trend) < 0.001 and abs(current) <= abs(step['cutoff_A']) * 1.1:
+                return True
+        if 'cutoff_Ah' in step and self.stats.count > 10 and abs(step_ah) >= abs(step['cutoff_Ah']):
+            return True
+
+        return False
+
+    # Sample processing
+    def process_sample(self, voltage: float, current: float, now_ms: Optional[float] = None) -> bool:
+        """
+        Integrate, log and cutoff-check one sample
+
+        Returns:
+            True if the sample ended the current step
+        """
+        if not self.is_running:
+            return False
+        now_ms = time.time() * 1000 if now_ms is None else now_ms
+        step_time_s = (now_ms - self.step_start_time_ms) / 1000
+
+        self.ah.add(now_ms, current)
+        self.stats.add(now_ms, voltage, current)
+        if self._step_first_current is None:
+            self._step_first_current = current
+        if current > 0:
+            self._step_seen_positive = True
+
+        if self._logger:
+            self._logger.log((
+                _iso(now_ms),
+                int(now_ms), self.current_cycle, self.current_step_index, self.current_step['mode'],
+                step_time_s, (now_ms - self.start_time_ms) / 1000, voltage, current,
+                self.ah.step_ah, self.ah.cycle_ah, self.ah.total_ah, None, None,
+                self.stats.voltage_trend, self.stats.current_stability,
+                self.stats.mean_voltage, self.stats.mean_current, self.stats.count,
+            ))
+
+        if self.rate_controller:
+            self._apply_rate(self.rate_controller.update(now_ms, self.current_step, voltage,
+                                                         self.stats.voltage_trend))
+
+        if self.check_cutoffs(voltage, current, step_time_s):
+            self.advance_to_next_step(now_ms)
+            return True
+        return False
+
+    # Lifecycle
+    def _open_log(self):
+        os.makedirs(self.log_dir, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H-%M-%S-%f')[:-3] + 'Z'
+        self.log_file = os.path.join(self.log_dir, f"battery_test_{stamp}.db")
+        metadata = {
+            'test_name': self.metadata.get('testName', 'Battery Cycling Test'),
+            'test_type': self.metadata.get('testType', 'cycling'),
+            'channel': str(self.channel),
+            'total_cycles': str(self.total_cycles),
+            'start_time': _iso(self.start_time_ms),
+            'operator': self.metadata.get('operator', 'system'),
+            'battery_id': self.metadata.get('batteryId', 'unknown'),
+            'battery_type': self.metadata.get('batteryType', 'unknown'),
+            'capacity_ah': str(self.metadata.get('capacityAh', 'unknown')),
+            'temperature_c': str(self.metadata.get('temperatureC', 'ambient')),
+            'notes': self.metadata.get('notes', ''),
+            'step_definition': json.dumps(self.steps),
+            'software_version': 'minismush-1.0-python',
+            'data_format_version': '1.1',
+        }
+        self._logger = BatchedSQLiteLogger(self.log_file, metadata, self.batch_size, self.flush_interval)
+
+    def start(self):
+        """Configure the first step, open the log and start streaming"""
+        if self.is_running:
+            raise CyclerEngineError('Cycler is already running')
+
+        self.current_step_index = self._first_step_after_start(0)
+        if self.current_step_index >= len(self.steps):
+            raise CyclerEngineError('No valid steps found in cycle definition')
+        self.current_step = self.steps[self.current_step_index]
+        self.current_cycle = 1
+        self.ah = AhIntegrator()
+        now_ms = time.time() * 1000
+        self.start_time_ms = now_ms
+        self._reset_step(now_ms)
+
+        if self.enable_logging:
+            self._open_log()
+
+        self.is_running = True
+        self._execute_current_step()
+        if self.sample_rate and not self.rate_controller:
+            self.smu.set_sample_rate(self.channel, self.sample_rate)
+        self.smu.start_streaming(self.channel)
+
+    def run(self, max_duration_s: Optional[float] = None, progress_callback=None):
+        """
+        Run until the sequence completes, stop() is called or max_duration_s elapses
+
+        Args:
+            max_duration_s: Optional wall-clock limit
+            progress_callback: Optional callable(engine) invoked after each step change
+        """
+        if not self.is_running:
+            self.start()
+        deadline = time.monotonic() + max_duration_s if max_duration_s else None
+
+        try:
+            while self.is_running:
+                if deadline and time.monotonic() >= deadline:
+                    break
+                try:
+                    channel, _, voltage, current = self.smu.read_streaming_data()
+                except SMUException:
+                    continue  # partial or non-data line
+                if channel != self.channel:
+                    continue
+                # The SMU reports sink current as positive; flip to the server's sign convention
+                if self.process_sample(voltage, -current) and progress_callback:
+                    progress_callback(self)
+        finally:
+            if self.is_running:
+                self.stop()
+
+    def stop(self):
+        """Stop streaming, disable the channel and close the log"""
+        was_running = self.is_running
+        self.is_running = False
+        if was_running:
+            try:
+                self.smu.stop_streaming(self.channel)
+                self.smu.disable_channel(self.channel)
+                if self.rate_controller and self.sample_rate:
+                    self.smu.set_sample_rate(self.channel, self.sample_rate)
+            except SMUException:
+                pass
+        if self._logger:
+            end_ms = time.time() * 1000
+            self._logger.set_metadata('end_time', _iso(end_ms))
+            self._logger.set_metadata('test_status', 'completed')
+            self._logger.set_metadata('final_cycle_count', str(self.current_cycle))
+            self._logger.set_metadata('total_test_time_s', str((end_ms - self.start_time_ms) / 1000))
+            self._logger.close()
+            self._logger = None
+
+    def get_status(self) -> Dict:
+        """Status dictionary with the same keys as GET /cycler/status"""
+        now_ms = time.time() * 1000
+        return {
+            'isRunning': self.is_running,
+            'isPaused': False,
+            'channel': self.channel,
+            'currentCycle': self.current_cycle,
+            'totalCycles': self.total_cycles,
+            'currentStepIndex': self.current_step_index,
+            'currentStep': self.current_step,
+            'stepTime': (now_ms - self.step_start_time_ms) / 1000 if self.step_start_time_ms else 0,
+            'totalTime': (now_ms - self.start_time_ms) / 1000 if self.start_time_ms else 0,
+            'totalAh': self.ah.total_ah,
+            'stepAh': self.ah.step_ah,
+            'cycleAh': self.ah.cycle_ah,
+            'logFile': self.log_file,
+            'totalSteps': len(self.steps),
+            'sampleRate': self.rate_controller.as_dict() if self.rate_controller else None,
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a battery cycling test directly on an SMU")
+    parser.add_argument('port', help="SMU serial port (e.g. /dev/ttyACM0)")
+    parser.add_argument('steps', help="JSON file with the step definition list")
+    parser.add_argument('--channel', type=int, default=1)
+    parser.add_argument('--cycles', type=int, default=1, help="Number of cycles (0 = until stopped)")
+    parser.add_argument('--sample-rate', type=float, default=None, help="Streaming rate in Hz")
+    parser.add_argument('--adaptive-rate', action='store_true',
+                        help="Adapt the streaming rate to the step state (burst on transitions, slow when flat)")
+    parser.add_argument('--log-dir', default='./data/battery')
+    parser.add_argument('--no-log', action='store_true')
+    args = parser.parse_args()
+
+    with open(args.steps) as f:
+        step_list = json.load(f)
+
+    def report(engine):
+        status = engine.get_status()
+        print(f"Cycle {status['currentCycle']} step {status['currentStepIndex']} "
+              f"({status['currentStep']['mode'] if status['currentStep'] else '-'}) "
+              f"total {status['totalAh']:.6f} Ah")
+
+    with SMU(ConnectionType.USB, port=args.port) as device:
+        cycler = CyclerEngine(device, args.channel, step_list, cycles=args.cycles,
+                              enable_logging=not args.no_log, log_dir=args.log_dir,
+                              sample_rate=args.sample_rate, adaptive_rate=args.adaptive_rate)
+        try:
+            cycler.run(progress_callback=report)
+        except KeyboardInterrupt:
+            cycler.stop()
+        print(f"Cycler stopped. Log: {cycler.log_file}")
@@ -0,0 +1,58 @@
+/*
+Incremental newline framing for the serial stream
+
+Each chunk is scanned once from the carried-over tail; every complete line is
+handed to onLine in arrival order and the unterminated remainder is kept for
+the next chunk. A tail longer than maxLineLength (no newline, e.g. line noise)
+is dropped and counted as an overflow.
+*/
+
+class LineDecoder {
+  constructor(onLine, { maxLineLength = 4096 } = {}) {
+    this.onLine = onLine;
+    this.maxLineLength = maxLineLength;
+    this.tail = '';
+    this.bytes = 0;
+    this.lines = 0;
+    this.malformed = 0;   // Incremented by the line handler for lines it cannot parse
+    this.overflows = 0;
+  }
+
+  push(chunk) {
+    const text = typeof chunk === 'string' ? chunk : chunk.toString('latin1');
+    this.bytes += text.length;
+
+    let start = 0;
+    const data = this.tail + text;
+    let newline = data.indexOf('\n', this.tail.length);
+    while (newline !== -1) {
+      const line = data.slice(start, newline).trim();
+      start = newline + 1;
+      this.lines++;
+      if (line) this.onLine(line);
+      newline = data.indexOf('\n', start);
+    }
+
+    this.tail = data.slice(start);
+    if (this.tail.length > this.maxLineLength) {
+      this.overflows++;
+      this.tail = '';
+    }
+  }
+
+  reset() {
+    this.tail = '';
+  }
+
+  stats() {
+    return {
+      bytes: this.bytes,
+      lines: this.lines,
+      malformed: this.malformed,
+      overflows: this.overflows,
+      pendingBytes: this.tail.length
+    };
+  }
+}
+
+module.exports = { LineDecoder };
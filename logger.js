@@ -0,0 +1,177 @@
+/*
+Leveled, rate-limited, buffered server log
+
+  const log = require('./logger').child('cycler');
+  log.info('Cycler started', { channel: 1, cycles: 10 });
+  if (log.enabled('debug')) log.debug('Sample', { v: voltage, i: current });
+
+Levels: error < warn < info < debug < trace. The default level comes from
+LOG_LEVEL (default 'info'); per-category levels override it and both can be
+changed at runtime (setLevel). Messages are constant strings with the variable
+parts in `fields`, so the message doubles as the rate-limit key: each message
+is emitted at most `rateLimit` times per second (errors are never limited) and
+the next emitted line reports how many were suppressed.
+
+Output is buffered and written to stdout (stderr for warn/error) in one write
+per flushMs, instead of a synchronous console.log per message. LOG_FORMAT=json
+writes one JSON object per line.
+*/
+
+const LEVELS = { error: 0, warn: 1, info: 2, debug: 3, trace: 4 };
+const DEFAULT_RATE_LIMIT = 10;   // Messages per second per message text
+const FLUSH_MS = 100;
+const MAX_BUFFER_BYTES = 64 * 1024;
+
+const state = {
+  level: LEVELS[process.env.LOG_LEVEL] !== undefined ? process.env.LOG_LEVEL : 'info',
+  categories: {},                // category -> level name
+  format: process.env.LOG_FORMAT === 'json' ? 'json' : 'text',
+  rateLimit: parseInt(process.env.LOG_RATE_LIMIT) || DEFAULT_RATE_LIMIT,
+  out: [],
+  err: [],
+  bufferedBytes: 0,
+  timer: null,
+  limits: new Map(),             // message key -> { windowStart, count, suppressed }
+  counts: { error: 0, warn: 0, info: 0, debug: 0, trace: 0 },
+  suppressed: 0
+};
+
+function levelFor(category) {
+  return state.categories[category] || state.level;
+}
+
+function enabled(category, level) {
+  return LEVELS[level] <= LEVELS[levelFor(category)];
+}
+
+// Returns the number of suppressed messages to report, or -1 to drop this one
+function admit(key, level) {
+  if (level === 'error' || state.rateLimit <= 0) return 0;
+  const now = Date.now();
+  let entry = state.limits.get(key);
+  if (!entry) {
+    entry = { windowStart: now, count: 0, suppressed: 0 };
+    state.limits.set(key, entry);
+  }
+  if (now - entry.windowStart >= 1000) {
+    entry.windowStart = now;
+    entry.count = 0;
+  }
+  if (entry.count >= state.rateLimit) {
+    entry.suppressed++;
+    state.suppressed++;
+    return -1;
+  }
+  entry.count++;
+  const suppressed = entry.suppressed;
+  entry.suppressed = 0;
+  return suppressed;
+}
+
+function formatValue(v) {
+  if (v instanceof Error) return JSON.stringify(v.message);
+  if (typeof v === 'string') return /\s|"/.test(v) ? JSON.stringify(v) : v;
+  if (typeof v === 'object' && v !== null) return JSON.stringify(v);
+  return String(v);
+}
+
+function format(category, level, msg, fields, suppressed) {
+  const time = new Date().toISOString();
+  if (state.format === 'json') {
+    const record = Object.assign({ time: time, level: level, category: category, msg: msg }, fields);
+    if (fields && fields.error instanceof Error) record.error = fields.error.message;
+    if (suppressed) record.suppressed = suppressed;
+    return JSON.stringify(record) + '\n';
+  }
+  let line = `${time} ${level.toUpperCase().padEnd(5)} [${category}] ${msg}`;
+  if (fields) {
+    for (const [k, v] of Object.entries(fields)) line += ` ${k}=${formatValue(v)}`;
+  }
+  if (suppressed) line += ` (suppressed ${suppressed} similar)`;
+  return line + '\n';
+}
+
+function write(level, line) {
+  (LEVELS[level] <= LEVELS.warn ? state.err : state.out).push(line);
+  state.bufferedBytes += line.length;
+  if (state.bufferedBytes >= MAX_BUFFER_BYTES) {
+    flush();
+  } else if (!state.timer) {
+    state.timer = setTimeout(flush, FLUSH_MS);
+    if (state.timer.unref) state.timer.unref();
+  }
+}
+
+// Write everything buffered (sync = true on the exit path)
+function flush(sync = false) {
+  if (state.timer) {
+    clearTimeout(state.timer);
+    state.timer = null;
+  }
+  const out = state.out.join('');
+  const err = state.err.join('');
+  state.out = [];
+  state.err = [];
+  state.bufferedBytes = 0;
+  if (sync) {
+    const fs = require('fs');
+    if (out) fs.writeSync(1, out);
+    if (err) fs.writeSync(2, err);
+  } else {
+    if (out) process.stdout.write(out);
+    if (err) process.stderr.write(err);
+  }
+}
+
+function log(category, level, msg, fields) {
+  if (!enabled(category, level)) return;
+  const suppressed = admit(`${category}:${msg}`, level);
+  if (suppressed < 0) return;
+  state.counts[level]++;
+  write(level, format(category, level, msg, fields, suppressed));
+}
+
+function child(category) {
+  return {
+    category: category,
+    enabled: (level) => enabled(category, level),
+    error: (msg, fields) => log(category, 'error', msg, fields),
+    warn: (msg, fields) => log(category, 'warn', msg, fields),
+    info: (msg, fields) => log(category, 'info', msg, fields),
+    debug: (msg, fields) => log(category, 'debug', msg, fields),
+    trace: (msg, fields) => log(category, 'trace', msg, fields)
+  };
+}
+
+// Set the default level, or one category's level (level null clears the override)
+function setLevel(level, category) {
+  if (level !== null && LEVELS[level] === undefined) {
+    throw new Error(`Unknown log level '${level}' (expected one of: ${Object.keys(LEVELS).join(', ')})`);
+  }
+  if (category) {
+    if (level === null) delete state.categories[category];
+    else state.categories[category] = level;
+  } else if (level !== null) {
+    state.level = level;
+  }
+}
+
+function setRateLimit(perSecond) {
+  state.rateLimit = perSecond;
+}
+
+function config() {
+  return {
+    level: state.level,
+    categories: Object.assign({}, state.categories),
+    levels: Object.keys(LEVELS),
+    rateLimit: state.rateLimit,
+    format: state.format,
+    counts: Object.assign({}, state.counts),
+    suppressed: state.suppressed
+  };
+}
+
+process.on('exit', () => flush(true));
+
+module.exports = { child, setLevel, setRateLimit, config, flush, LEVELS };
@@ -0,0 +1,95 @@
+/*
+Prometheus text exposition for GET /metrics
+
+The server's counters already live on the objects that own them (LineDecoder,
+ChannelRingBuffer, BroadcastScheduler, write queues), so nothing here is
+registered up front: the endpoint builds a list of metric families from their
+stats() at scrape time and render() formats them.
+
+  render([
+    { name: 'minismush_samples_total', type: 'counter', help: 'Samples parsed',
+      samples: [[{ channel: 1 }, ch1.nextSeq], [{ channel: 2 }, ch2.nextSeq]] },
+    { name: 'minismush_up', type: 'gauge', help: 'Server running', value: 1 }
+  ])
+
+EventLoopLag measures how late a short interval timer fires (the time the loop
+was blocked) and keeps the figures of the last complete window, so concurrent
+scrapers see the same numbers.
+*/
+
+function escapeLabel(value) {
+  return String(value).replace(/\\/g, '\\\\').replace(/\n/g, '\\n').replace(/"/g, '\\"');
+}
+
+function formatLabels(labels) {
+  if (!labels) return '';
+  const parts = Object.entries(labels)
+    .filter(([, v]) => v !== undefined && v !== null)
+    .map(([k, v]) => `${k}="${escapeLabel(v)}"`);
+  return parts.length ? `{${parts.join(',')}}` : '';
+}
+
+function formatValue(value) {
+  if (value === Infinity) return '+Inf';
+  if (value === -Infinity) return '-Inf';
+  if (typeof value !== 'number' || Number.isNaN(value)) return 'NaN';
+  return String(value);
+}
+
+// families: [{ name, type, help, value } | { name, type, help, samples: [[labels, value], ...] }]
+// A summary family's samples may use the suffixed names ('_sum', '_count') as a third element
+function render(families) {
+  let out = '';
+  for (const family of families) {
+    out += `# HELP ${family.name} ${family.help}\n`;
+    out += `# TYPE ${family.name} ${family.type}\n`;
+    const samples = family.samples || [[null, family.value]];
+    for (const [labels, value, suffix] of samples) {
+      out += `${family.name}${suffix || ''}${formatLabels(labels)} ${formatValue(value)}\n`;
+    }
+  }
+  return out;
+}
+
+class EventLoopLag {
+  constructor({ resolutionMs = 10, windowMs = 10000 } = {}) {
+    this.resolutionMs = resolutionMs;
+    this.windowMs = windowMs;
+    this.samples = [];
+    this.windowStart = Date.now();
+    this.last = { mean: 0, p50: 0, p99: 0, max: 0 };
+    this.expected = process.hrtime.bigint() + BigInt(resolutionMs * 1e6);
+    this.timer = setInterval(() => this.tick(), resolutionMs);
+    if (this.timer.unref) this.timer.unref();
+  }
+
+  // How late this timer fired is how long the loop was blocked
+  tick() {
+    const now = process.hrtime.bigint();
+    this.samples.push(Math.max(0, Number(now - this.expected) / 1e9));
+    this.expected = now + BigInt(this.resolutionMs * 1e6);
+    if (Date.now() - this.windowStart >= this.windowMs) this.roll();
+  }
+
+  roll() {
+    const sorted = this.samples.sort((a, b) => a - b);
+    const n = sorted.length;
+    if (n) {
+      this.last = {
+        mean: sorted.reduce((sum, v) => sum + v, 0) / n,
+        p50: sorted[Math.floor(0.5 * (n - 1))],
+        p99: sorted[Math.floor(0.99 * (n - 1))],
+        max: sorted[n - 1]
+      };
+    }
+    this.samples = [];
+    this.windowStart = Date.now();
+  }
+
+  // Seconds of delay over the last window
+  stats() {
+    return Object.assign({ windowMs: this.windowMs }, this.last);
+  }
+}
+
+module.exports = { render, formatLabels, EventLoopLag };
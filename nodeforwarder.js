@@ -54,6 +54,17 @@ var io = require('socket.io')(server,{cors:{methods: ["GET", "POST"]}});
 const SerialPort = require('serialport');
 const createCsvWriter = require('csv-writer').createObjectCsvWriter;
 const sqlite3 = require('sqlite3').verbose();
+const { RunningStats } = require('./step_stats');
+const { AdaptiveSampleRate } = require('./sample_rate');
+const { ChannelRingBuffer, TextRingBuffer, FIELDS: RING_FIELDS, float64LE } = require('./ring_buffer');
+const { LineDecoder } = require('./line_decoder');
+const { BroadcastScheduler } = require('./broadcast');
+const { SqliteWriteQueue, openDatabase, flushAll: flushAllWriteQueues } = require('./sqlite_write_queue');
+const logger = require('./logger');
+const cyclerLog = logger.child('cycler');
+const smuLog = logger.child('smu');
+const metrics = require('./metrics');
+const { ColumnarWriter, ARCHIVE_STEP_TYPES, ARCHIVE_COLUMNS, stepTypeCode, writeFileAtomic, writeIndex, writeMetadata, readColumns } = require('./columnar_store');
 
 server.listen(hp);
 
@@ -87,19 +98,66 @@ function msleep(n) {
 	  }
   }
   
+  // Returns null for lines that are not a complete channel,time,V,I sample
   function parseSMUStream(s)
   {
-    p = s.split(",");
-    out = {}
+    const p = s.split(",");
+    if (p.length < 4) return null
+    const out = {}
     out['channel']   = parseInt(p[0])
-    //out['time_ms']   = parseInt(p[1])
-    out['time_ms']   = Date.now()
+    // Host receive time by default; SAMPLE_CLOCK=device trusts the line's own time (replays)
+    out['time_ms']   = SAMPLE_CLOCK === 'device' ? parseFloat(p[1]) : Date.now()
     out['voltage_V'] = parseFloat(p[2])
     out['current_A'] = -parseFloat(p[3].replace("e-0","e-"))
+    if (isNaN(out['time_ms']) || isNaN(out['voltage_V']) || isNaN(out['current_A'])) return null
     return out
 
   }
 
+  // Dispatch one complete serial line to ch1/ch2/otm
+  function handleSerialLine(line)
+  {
+    // Measurement replies belong to a running sweep (they still reach otm)
+    if (activeSweep && activeSweep.accept(line)) {
+      otm.push(line);
+      return;
+    }
+
+    const channel = line.startsWith("1,") ? 1 : line.startsWith("2,") ? 2 : null;
+    if (channel === null) {
+      otm.push(line);
+      io.emit('otm', line);
+      return;
+    }
+    
+    const parsedData = parseSMUStream(line);
+    if (!parsedData) {
+      serialDecoder.malformed++;
+      return;
+    }
+    
+    const started = process.hrtime.bigint();
+    const buffer = channel === 1 ? ch1 : ch2;
+    // Clients receive samples in coalesced frames read from the ring buffer (broadcast.js)
+    parsedData.seq = buffer.push(parsedData.time_ms, parsedData.voltage_V, parsedData.current_A);
+    
+    // Log channel data if logging is active
+    if (loggingState.isLogging) {
+      handleChannelDataLogging(channel, parsedData);
+    }
+    
+    // Array-based cycler processing - every sample, to the cycler for this channel
+    const cycler = cyclers.get(channel);
+    if (cycler && cycler.isRunning && !cycler.isPaused) {
+      processArrayBasedCycling(cycler);
+    }
+    
+    const elapsedNs = Number(process.hrtime.bigint() - started);
+    sampleTiming.count++;
+    sampleTiming.totalNs += elapsedNs;
+    if (elapsedNs > sampleTiming.maxNs) sampleTiming.maxNs = elapsedNs;
+  }
+
   function createNewPort(path,baud) {
 	  console.log(`Initializing serial port with path: ${path}`);
 	  serialPort = new SerialPort(path, { baudRate: baud });
@@ -107,6 +165,8 @@ function msleep(n) {
 	  // Attach event listeners
 	  serialPort.on('open', () => {
 		  console.log('Serial port opened:', path);
+		  serialDecoder.reset(); // Drop any partial line from a previous port
+		  autoRecoverCyclers();
 	  });
   
 		//last heard
@@ -116,7 +176,7 @@ function msleep(n) {
 		buf += data.toString('binary') 
 		lh = new Date().getTime()
 		if (buf.length > blen) buf = buf.substr(buf.length-blen,buf.length) 
-		io.emit('data', data.toString('utf8'));
+		broadcaster.raw(data.toString('utf8'));
 		
 		// Handle logging if active (disabled - now using structured ch1/ch2 logging)
 		// if (loggingState.isLogging) {
@@ -126,52 +186,8 @@ function msleep(n) {
 		// 	}
 		// }
 		
-    //Parsing last line
-    const lines = buf.split('\n');
-    const lastLine = lines[lines.length - 2].trim();
-    //console.log(lastLine)
-    
-    let updatedChannel = null;
-    if (lastLine.search("1,") == 0) {
-      const parsedData = parseSMUStream(lastLine);
-      ch1.push(parsedData); 
-      io.emit('ch1', parsedData);
-      updatedChannel = 1;
-      
-      // Log ch1 data if logging is active
-      if (loggingState.isLogging) {
-        handleChannelDataLogging(1, parsedData);
-      }
-    }
-    else if (lastLine.search("2,") == 0) {
-      const parsedData = parseSMUStream(lastLine);
-      ch2.push(parsedData); 
-      io.emit('ch2', parsedData);
-      updatedChannel = 2;
-      
-      // Log ch2 data if logging is active
-      if (loggingState.isLogging) {
-        handleChannelDataLogging(2, parsedData);
-      }
-    }
-    else {
-      otm.push(lastLine);                
-      io.emit('otm',lastLine);
-    }
-
-    //FIFO on blen
-    if (ch1.length > blen) ch1.shift();
-    if (ch2.length > blen) ch2.shift();
-    if (otm.length > blen) otm.shift();
-
-    // Array-based cycler processing - triggered when ch1 or ch2 gets new data
-    if (cyclerState.isRunning && !cyclerState.isPaused && updatedChannel) {
-      // Only process if this is the channel we're cycling on
-      if (updatedChannel === cyclerState.channel) {
-        processArrayBasedCycling(updatedChannel);
-      }
-    }
-		
+    // Frame and dispatch every complete line in this chunk
+    serialDecoder.push(data);
 		});
   
 	  serialPort.on('error', (err) => {
@@ -197,9 +213,28 @@ if (sp != undefined) initializeSerialPort(sp,baud)
 
 //On Data fill a circular buf of the specified length
 buf = ""
-ch1 = []
-ch2 = []
-otm = []
+// Fixed-capacity ring buffers (oldest samples overwritten); CHANNEL_BUFFER_POINTS
+// raises channel retention independently of the serial text buffer
+const channelCapacity = parseInt(process.env.CHANNEL_BUFFER_POINTS) || blen || 10000;
+// Sample timestamps: 'host' (receive time, default) or 'device' (the time field of each line,
+// so replays at accelerated speed keep the recorded timing; see python_examples/replay_test.py)
+const SAMPLE_CLOCK = process.env.SAMPLE_CLOCK === 'device' ? 'device' : 'host';
+// Time spent ingesting each channel sample (buffer, logging, cycler), for /metrics
+const sampleTiming = { count: 0, totalNs: 0, maxNs: 0 };
+ch1 = new ChannelRingBuffer(1, channelCapacity)
+ch2 = new ChannelRingBuffer(2, channelCapacity)
+// Sequence numbers restart with the process; clients that track seq (python Recorder)
+// compare this id to tell a restarted server from a gap
+const SERVER_INSTANCE = `${Date.now().toString(36)}-${process.pid}`;
+otm = new TextRingBuffer(blen || 10000)
+// Coalesced Socket.IO frames for subscribed clients, every BROADCAST_INTERVAL_MS
+const broadcaster = new BroadcastScheduler(io, { 1: ch1, 2: ch2 }, {
+  intervalMs: parseInt(process.env.BROADCAST_INTERVAL_MS) || 100
+});
+// Incremental line framing for the serial stream (carries partial lines between chunks)
+const serialDecoder = new LineDecoder(line => handleSerialLine(line));
+// Event-loop delay over the last 10 s window, for /metrics
+const eventLoopLag = new metrics.EventLoopLag();
 
 // Logging state management
 let loggingState = {
@@ -211,12 +246,30 @@ let loggingState = {
   schemaDetected: false,
   csvWriter: null,
   db: null,
-  insertStmt: null,
+  writeQueue: null,   // Batched SQLite inserts (sqlite_write_queue.js)
   // Command logging
   cmdLogWriter: null,
   cmdLogFile: null
 };
 
+// csv-writer appends are asynchronous; count and time them for /metrics
+const csvWriteStats = { writes: 0, errors: 0, pending: 0, totalMs: 0, maxMs: 0 };
+
+function writeCsvRecords(writer, records, label) {
+  const started = process.hrtime.bigint();
+  csvWriteStats.pending++;
+  return writer.writeRecords(records).catch(err => {
+    csvWriteStats.errors++;
+    console.error(`${label} write error:`, err);
+  }).then(() => {
+    const elapsedMs = Number(process.hrtime.bigint() - started) / 1e6;
+    csvWriteStats.pending--;
+    csvWriteStats.writes++;
+    csvWriteStats.totalMs += elapsedMs;
+    if (elapsedMs > csvWriteStats.maxMs) csvWriteStats.maxMs = elapsedMs;
+  });
+}
+
 // Helper function to detect schema from first data row
 function detectSchema(dataString) {
   try {
@@ -272,7 +325,8 @@ function handleChannelDataLogging(channel, parsedData) {
     const channelState = smuState.channels[channel] || {};
     
     // Get cycling state if active for this channel
-    const isCycling = cyclerState.isRunning && cyclerState.channel === channel;
+    const cycler = cyclers.get(channel);
+    const isCycling = !!(cycler && cycler.isRunning);
     
     // Create structured log entry with channel info and settings
     const unixTime = Math.floor(parsedData.time_ms / 1000);
@@ -292,9 +346,9 @@ function handleChannelDataLogging(channel, parsedData) {
       sample_rate: channelState.sampleRate || 0,
       // Cycling state (if active)
       cycling: isCycling,
-      cycle_num: isCycling ? cyclerState.currentCycle : null,
-      step_num: isCycling ? cyclerState.currentStepIndex : null,
-      step_type: isCycling ? (cyclerState.currentStep?.mode || null) : null
+      cycle_num: isCycling ? cycler.currentCycle : null,
+      step_num: isCycling ? cycler.currentStepIndex : null,
+      step_type: isCycling ? (cycler.currentStep?.mode || null) : null
     };
     
     // Force structured schema for channel data (override auto-detection)
@@ -345,12 +399,10 @@ function handleChannelDataLogging(channel, parsedData) {
     
     // Log the structured data
     if (loggingState.type === 'csv' && loggingState.csvWriter) {
-      loggingState.csvWriter.writeRecords([logEntry]).catch(err => {
-        console.error('CSV write error:', err);
-      });
-    } else if (loggingState.type === 'sqlite' && loggingState.insertStmt) {
+      writeCsvRecords(loggingState.csvWriter, [logEntry], 'CSV');
+    } else if (loggingState.type === 'sqlite' && loggingState.writeQueue) {
       const values = loggingState.columns.map(col => logEntry[col] || null);
-      loggingState.insertStmt.run(...values);
+      loggingState.writeQueue.push(values);
     }
     
   } catch (error) {
@@ -385,14 +437,10 @@ function handleDataLogging(dataString) {
     const dataObj = parseDataToObject(cleanedData, loggingState.columns);
     
     if (loggingState.type === 'csv' && loggingState.csvWriter) {
-      loggingState.csvWriter.writeRecords([dataObj]).catch(err => {
-        console.error('CSV write error:', err);
-      });
-    } else if (loggingState.type === 'sqlite' && loggingState.insertStmt) {
+      writeCsvRecords(loggingState.csvWriter, [dataObj], 'CSV');
+    } else if (loggingState.type === 'sqlite' && loggingState.writeQueue) {
       const values = loggingState.columns.map(col => dataObj[col] || null);
-      loggingState.insertStmt.run(values, (err) => {
-        if (err) console.error('SQLite insert error:', err);
-      });
+      loggingState.writeQueue.push(values);
     }
   } catch (error) {
     console.error('Data logging error:', error);
@@ -441,9 +489,7 @@ function logCommand(command, source = 'unknown', channel = null) {
     channel: channel
   };
   
-  loggingState.cmdLogWriter.writeRecords([cmdEntry]).catch(err => {
-    console.error('Command log write error:', err);
-  });
+  writeCsvRecords(loggingState.cmdLogWriter, [cmdEntry], 'Command log');
 }
 
 // Initialize CSV logging
@@ -459,7 +505,7 @@ function initializeCsvLogging() {
 
 // Initialize SQLite logging
 function initializeSqliteLogging() {
-  loggingState.db = new sqlite3.Database(loggingState.filename);
+  loggingState.db = openDatabase(sqlite3, loggingState.filename);
   
   // Create table if it doesn't exist
   const columnDefs = loggingState.columns.map(col => `${col} TEXT`).join(', ');
@@ -475,7 +521,7 @@ function initializeSqliteLogging() {
     const placeholders = loggingState.columns.map(() => '?').join(', ');
     const insertQuery = `INSERT INTO ${loggingState.tableName} (${loggingState.columns.join(', ')}) VALUES (${placeholders})`;
     
-    loggingState.insertStmt = loggingState.db.prepare(insertQuery);
+    loggingState.writeQueue = new SqliteWriteQueue(loggingState.db, insertQuery, { name: 'Data log' });
   });
 }
 
@@ -490,6 +536,19 @@ app.use(bodyParser.json()) // json forms (e.g. axios)
 app.use(express.json());
 app.use(express.urlencoded({ extended: true })); // For URL-encoded data, if necessary
 
+// A running sweep (/smu/sweep) takes every "voltage,current" line on the serial port as
+// its next point, so requests that write SMU commands get 409 until it finishes. Reading
+// server state and stopping or pausing a cycler stay available
+const SWEEP_GUARDED_PATHS = ['/write', '/writecf', '/smu', '/cycler/start', '/cycler/resume', '/cycler/recover'];
+const SWEEP_UNGUARDED_PATHS = new Set(['/smu', '/smu/state', '/smu/sweep']);
+app.use(SWEEP_GUARDED_PATHS, (req, res, next) => {
+  const route = (req.baseUrl + req.path).replace(/\/$/, '');
+  if (activeSweep && !SWEEP_UNGUARDED_PATHS.has(route)) {
+    return res.status(409).json({ error: `A sweep is running on channel ${activeSweep.channel}` });
+  }
+  next();
+});
+
 //Write to serial port
 app.get('/write/*',function(req,res){	
 	toSend = req.originalUrl.replace("/write/","")
@@ -506,7 +565,7 @@ app.get('/reconnect', async (req, res) => {initializeSerialPort(sp,baud); res.se
 
 app.get('/disconnect', async (req, res) => {try{serialPort.close()} catch(e){console.log(e)}; res.send("foo")});
 
-app.post('/reconnect',async (req, res) => {x=req.body;initializeSerialPort(x['sp'],parseInt(['baud'])); res.send("foo") })
+app.post('/reconnect',async (req, res) => {x=req.body;initializeSerialPort(x['sp'],parseInt(x['baud']) || baud); res.send("foo") })
   
 app.get("/list_ports", async(req,res)=>{res.send(await SerialPort.list())});
 
@@ -542,6 +601,125 @@ app.get('/lastread/',function(req,res){
 });
 
 
+//Serial framing counters (bytes, complete lines, malformed samples, overflows)
+app.get('/serial/stats', function(req, res){
+	res.json(Object.assign(serialDecoder.stats(), {
+		ch1_samples: ch1.nextSeq,
+		ch2_samples: ch2.nextSeq,
+		otm_lines: otm.nextSeq,
+		sample_clock: SAMPLE_CLOCK
+	}))
+});
+
+// Server log configuration: level (error/warn/info/debug/trace), per-category overrides
+// (e.g. {"category": "cycler", "level": "debug"} for per-sample cutoff lines) and rate limit
+app.get('/log_level', function(req, res){
+	res.json(logger.config())
+});
+
+app.post('/log_level', function(req, res){
+	try {
+		const { level, category, rateLimit } = req.body || {};
+		if (level !== undefined) logger.setLevel(level, category);
+		if (rateLimit !== undefined) logger.setRateLimit(Number(rateLimit));
+		res.json(logger.config())
+	} catch (error) {
+		res.status(400).json({ error: error.message })
+	}
+});
+
+// Write queues currently open: the data log and each cycler's primary sink
+function activeSinks() {
+	const sinks = [];
+	if (loggingState.writeQueue) {
+		sinks.push({ labels: { sink: 'data_log', type: 'sqlite' }, stats: loggingState.writeQueue.stats() });
+	}
+	for (const cycler of cyclers.values()) {
+		if (cycler.cyclerSink) {
+			sinks.push({ labels: { sink: 'cycler', type: cycler.sink, channel: cycler.channel }, stats: cycler.cyclerSink.stats() });
+		}
+	}
+	return sinks;
+}
+
+// Prometheus text format; every value is read from the owning object at scrape time
+app.get('/metrics', function(req, res){
+	const decoder = serialDecoder.stats();
+	const sockets = broadcaster.stats();
+	const lag = eventLoopLag.stats();
+	const sinks = activeSinks();
+	const buffers = [[{ channel: 1 }, ch1], [{ channel: 2 }, ch2]];
+	const perSink = (field, scale = 1) => sinks.map(s => [s.labels, s.stats[field] * scale]);
+	const memory = process.memoryUsage();
+
+	const families = [
+		{ name: 'minismush_samples_total', type: 'counter', help: 'Samples parsed per channel',
+		  samples: buffers.map(([labels, b]) => [labels, b.nextSeq]) },
+		{ name: 'minismush_serial_bytes_total', type: 'counter', help: 'Bytes received from the serial port',
+		  value: decoder.bytes },
+		{ name: 'minismush_serial_lines_total', type: 'counter', help: 'Complete lines framed from the serial stream',
+		  value: decoder.lines },
+		{ name: 'minismush_serial_malformed_lines_total', type: 'counter', help: 'Channel lines that did not parse as a sample',
+		  value: decoder.malformed },
+		{ name: 'minismush_serial_overflows_total', type: 'counter', help: 'Partial lines dropped for exceeding the maximum line length',
+		  value: decoder.overflows },
+		{ name: 'minismush_otm_lines_total', type: 'counter', help: 'Non-sample lines received (command responses, messages)',
+		  value: otm.nextSeq },
+		{ name: 'minismush_serial_commands_total', type: 'counter', help: 'Commands written to the serial port (writeout)',
+		  value: serialOut.commands },
+		{ name: 'minismush_serial_command_bytes_total', type: 'counter', help: 'Bytes written to the serial port',
+		  value: serialOut.bytes },
+		{ name: 'minismush_sample_processing_seconds', type: 'summary', help: 'Time to ingest one channel sample (buffer, logging, cycler)',
+		  samples: [[null, sampleTiming.totalNs / 1e9, '_sum'], [null, sampleTiming.count, '_count']] },
+		{ name: 'minismush_sample_processing_max_seconds', type: 'gauge', help: 'Slowest channel sample ingest since start',
+		  value: sampleTiming.maxNs / 1e9 },
+		{ name: 'minismush_buffer_points', type: 'gauge', help: 'Samples held in the channel ring buffer',
+		  samples: buffers.map(([labels, b]) => [labels, b.length]) },
+		{ name: 'minismush_buffer_capacity_points', type: 'gauge', help: 'Channel ring buffer capacity',
+		  samples: buffers.map(([labels, b]) => [labels, b.capacity]) },
+		{ name: 'minismush_sink_queue_rows', type: 'gauge', help: 'Rows waiting to be written by a data sink',
+		  samples: sinks.map(s => [s.labels, s.stats.queueDepth + s.stats.inFlight]) },
+		{ name: 'minismush_sink_rows_written_total', type: 'counter', help: 'Rows written by a data sink',
+		  samples: perSink('rowsWritten') },
+		{ name: 'minismush_sink_errors_total', type: 'counter', help: 'Write errors in a data sink',
+		  samples: perSink('errors') },
+		{ name: 'minismush_sink_flush_seconds', type: 'summary', help: 'Time per batched sink flush',
+		  samples: [].concat(perSink('totalFlushMs', 1e-3).map(s => s.concat('_sum')),
+		                     perSink('flushes').map(s => s.concat('_count'))) },
+		{ name: 'minismush_sink_flush_max_seconds', type: 'gauge', help: 'Slowest sink flush since the sink opened',
+		  samples: perSink('maxFlushMs', 1e-3) },
+		{ name: 'minismush_csv_pending_writes', type: 'gauge', help: 'CSV appends (data and command logs) not yet completed',
+		  value: csvWriteStats.pending },
+		{ name: 'minismush_csv_errors_total', type: 'counter', help: 'CSV append errors',
+		  value: csvWriteStats.errors },
+		{ name: 'minismush_csv_write_seconds', type: 'summary', help: 'Time per CSV append',
+		  samples: [[null, csvWriteStats.totalMs / 1e3, '_sum'], [null, csvWriteStats.writes, '_count']] },
+		{ name: 'minismush_csv_write_max_seconds', type: 'gauge', help: 'Slowest CSV append since start',
+		  value: csvWriteStats.maxMs / 1e3 },
+		{ name: 'minismush_socketio_clients', type: 'gauge', help: 'Connected Socket.IO clients',
+		  value: sockets.clients },
+		{ name: 'minismush_socketio_subscribed_clients', type: 'gauge', help: 'Socket.IO clients subscribed to any stream',
+		  value: sockets.subscribed },
+		{ name: 'minismush_socketio_frames_total', type: 'counter', help: 'Coalesced sample frames emitted',
+		  value: sockets.framesSent },
+		{ name: 'minismush_socketio_bytes_total', type: 'counter', help: 'Bytes emitted in frames and raw data events',
+		  value: sockets.bytesSent },
+		{ name: 'minismush_event_loop_lag_seconds', type: 'gauge', help: `Event-loop delay over the last ${lag.windowMs / 1000} s`,
+		  samples: [[{ stat: 'mean' }, lag.mean], [{ stat: 'p50' }, lag.p50], [{ stat: 'p99' }, lag.p99], [{ stat: 'max' }, lag.max]] },
+		{ name: 'minismush_cycler_running', type: 'gauge', help: 'Whether the cycler on a channel is running',
+		  samples: [...cyclers.values()].map(c => [{ channel: c.channel }, c.isRunning ? 1 : 0]) },
+		{ name: 'process_resident_memory_bytes', type: 'gauge', help: 'Resident memory size',
+		  value: memory.rss },
+		{ name: 'process_heap_used_bytes', type: 'gauge', help: 'V8 heap in use',
+		  value: memory.heapUsed },
+		{ name: 'process_uptime_seconds', type: 'gauge', help: 'Seconds since the server started',
+		  value: process.uptime() }
+	];
+	res.set('Content-Type', 'text/plain; version=0.0.4');
+	res.send(metrics.render(families));
+});
+
+
 //read buffer
 app.get('/read/', function(req, res){
 	res.send(buf)
@@ -628,7 +806,7 @@ app.post('/start_sqlite_log', function(req, res) {
     loggingState.columns = columns || [];
     loggingState.schemaDetected = false;
     loggingState.db = null;
-    loggingState.insertStmt = null;
+    loggingState.writeQueue = null;
     
     console.log(`Started SQLite logging to: ${fullFilename}, table: ${table}`);
     res.json({ 
@@ -661,21 +839,22 @@ app.get('/log_status', function(req, res) {
     filename: loggingState.filename,
     tableName: loggingState.tableName,
     columns: loggingState.columns,
-    schemaDetected: loggingState.schemaDetected
+    schemaDetected: loggingState.schemaDetected,
+    writeQueue: loggingState.writeQueue ? loggingState.writeQueue.stats() : null
   });
 });
 
 // Helper function to stop logging and clean up resources
 function stopLogging() {
-  if (loggingState.insertStmt) {
-    loggingState.insertStmt.finalize();
-    loggingState.insertStmt = null;
-  }
-  
-  if (loggingState.db) {
-    loggingState.db.close();
-    loggingState.db = null;
+  // Flush queued rows before closing the database
+  const db = loggingState.db;
+  if (loggingState.writeQueue) {
+    loggingState.writeQueue.close(() => db.close());
+    loggingState.writeQueue = null;
+  } else if (db) {
+    db.close();
   }
+  loggingState.db = null;
   
   loggingState.isLogging = false;
   loggingState.type = null;
@@ -692,9 +871,17 @@ function stopLogging() {
 
 //sockets
 io.on('connection', function(socket){
-  io.emit('data',buf)
+  broadcaster.attach(socket);
+  // Raw subscribers start with the current serial buffer
+  socket.on('subscribe', function(options){
+    if (options && options.raw) socket.emit('data', buf)
+  });
   socket.on('input', function(msg){
    //console.log('message: ' + msg);
+	if (activeSweep) {
+		smuLog.warn('Serial input dropped while a sweep is running', { channel: activeSweep.channel });
+		return;
+	}
 	writeout(msg,le="\r\n")
 	
   });
@@ -706,61 +893,62 @@ io.on('connection', function(socket){
 });
 
 // Array-based battery cycling - uses ch1/ch2 data arrays instead of real-time stream
-function processArrayBasedCycling(channel = null) {
-  if (!cyclerState.isRunning || cyclerState.isPaused) return;
+function processArrayBasedCycling(cycler) {
+  if (!cycler.isRunning || cycler.isPaused) return;
   
-  // Determine which channel to process
-  const targetChannel = channel || cyclerState.channel;
-  if (!targetChannel) return;
+  const targetChannel = cycler.channel;
   
-  // Get the appropriate data array
+  // Get the appropriate ring buffer
   const dataArray = targetChannel === 1 ? ch1 : ch2;
   if (dataArray.length === 0) return;
   
   // Get the most recent data point
-  const latestData = dataArray[dataArray.length - 1];
+  const latestData = dataArray.latest();
   const voltage = latestData.voltage_V;
   const current = latestData.current_A;
   const timestamp = latestData.time_ms;
   
   // Store the latest data for reference
-  cyclerState.lastStreamingData = {
+  cycler.lastStreamingData = {
     voltage: voltage,
     current: current, 
     timestamp: timestamp
   };
   
-  console.log(`Array-based cycler (CH${targetChannel}): ${voltage.toFixed(6)}V, ${current.toExponential(6)}A`);
+  if (cyclerLog.enabled('trace')) {
+    cyclerLog.trace('Cycler sample', { channel: targetChannel, voltage: voltage, current: current });
+  }
   
   // Process the data for logging and cutoff checking
-  processCyclerDataFromArray(voltage, current, timestamp, targetChannel, dataArray);
+  processCyclerDataFromArray(cycler, voltage, current, timestamp, targetChannel, dataArray);
 }
 
 // Enhanced data processing with array-based analysis capabilities
-function processCyclerDataFromArray(voltage, current, timestamp, channel, dataArray) {
+function processCyclerDataFromArray(cycler, voltage, current, timestamp, channel, dataArray) {
   const now = timestamp;
-  const stepTime = (now - cyclerState.stepStartTime) / 1000;
-  const totalTime = (now - cyclerState.startTime) / 1000;
+  const stepTime = (now - cycler.stepStartTime) / 1000;
+  const totalTime = (now - cycler.startTime) / 1000;
   
   // Update Ah integration
-  updateAhIntegration(current, now);
+  updateAhIntegration(cycler, current, now);
   
-  // Array-based analysis: calculate trends, averages, etc.
-  const arrayAnalysis = performArrayAnalysis(dataArray, cyclerState.stepStartTime);
+  // Step statistics: trends, averages, etc. (O(1) running update)
+  cycler.stepStats.add(now, voltage, current);
+  const arrayAnalysis = cycler.stepStats.analysis();
   
   // Create enhanced data point with array analysis
   const dataPoint = {
     timestamp: new Date(now).toISOString(),
-    cycle: cyclerState.currentCycle,
-    step: cyclerState.currentStepIndex,
-    step_type: cyclerState.currentStep ? cyclerState.currentStep.mode : 'unknown',
+    cycle: cycler.currentCycle,
+    step: cycler.currentStepIndex,
+    step_type: cycler.currentStep ? cycler.currentStep.mode : 'unknown',
     step_time: stepTime,
     total_time: totalTime,
     voltage: voltage,
     current: current,
-    step_ah: cyclerState.stepAh,
-    cycle_ah: cyclerState.cycleAh,
-    total_ah: cyclerState.totalAh,
+    step_ah: cycler.stepAh,
+    cycle_ah: cycler.cycleAh,
+    total_ah: cycler.totalAh,
     channel: channel,
     // Array-based metrics
     voltage_trend: arrayAnalysis.voltageTrend,
@@ -770,173 +958,121 @@ function processCyclerDataFromArray(voltage, current, timestamp, channel, dataAr
     data_points_in_step: arrayAnalysis.dataPointsInStep
   };
   
-  cyclerState.stepData.push(dataPoint);
-  
-  // Write to SQLite database if logging enabled
-  if (cyclerState.cyclerDataStmt) {
-    try {
-      cyclerState.cyclerDataStmt.run(
-        dataPoint.timestamp,
-        now,
-        dataPoint.cycle,
-        dataPoint.step,
-        dataPoint.step_type,
-        dataPoint.step_time,
-        dataPoint.total_time,
-        dataPoint.voltage,
-        dataPoint.current,
-        dataPoint.step_ah,
-        dataPoint.cycle_ah,
-        dataPoint.total_ah,
-        null, // temperature_c
-        JSON.stringify(arrayAnalysis) // Store array analysis as JSON
-      );
-    } catch (err) {
-      console.error('Cycler SQLite write error:', err);
-    }
-  }
-  
-  // Also write to CSV for compatibility
-  if (cyclerState.cyclerCsvWriter) {
-    cyclerState.cyclerCsvWriter.writeRecords([dataPoint]).catch(err => {
-      console.error('Cycler CSV write error:', err);
-    });
+  // Write to the primary sink (SQLite or columnar) if logging enabled
+  if (cycler.cyclerSink) {
+    cycler.cyclerSink.push([
+      dataPoint.timestamp,
+      now,
+      dataPoint.cycle,
+      dataPoint.step,
+      dataPoint.step_type,
+      dataPoint.step_time,
+      dataPoint.total_time,
+      dataPoint.voltage,
+      dataPoint.current,
+      dataPoint.step_ah,
+      dataPoint.cycle_ah,
+      dataPoint.total_ah,
+      null, // temperature_c
+      null, // notes
+      arrayAnalysis.voltageTrend,
+      arrayAnalysis.currentStability,
+      arrayAnalysis.stepAvgVoltage,
+      arrayAnalysis.stepAvgCurrent,
+      arrayAnalysis.dataPointsInStep
+    ]);
   }
   
   // Emit real-time data with enhanced array analysis
-  io.emit('cycler_data', dataPoint);
+  broadcaster.queueCycler(dataPoint);
   
-  // Check cutoff conditions using both current data and array analysis
-  if (cyclerState.currentStep) {
-    console.log(`Checking cutoffs - Step: ${cyclerState.currentStep.mode}, V: ${voltage.toFixed(4)}V, I: ${current.toExponential(4)}A, Time: ${stepTime.toFixed(1)}s`);
-    if (checkStepCutoffsWithArrayAnalysis(voltage, current, stepTime, arrayAnalysis)) {
-      console.log(`✓ Cutoff triggered! Advancing to next step.`);
-      advanceToNextStep();
-    }
+  if (cycler.sampleRate && cycler.currentStep) {
+    const rate = cycler.sampleRate.update(now, cycler.currentStep, voltage, arrayAnalysis.voltageTrend);
+    if (rate !== null) applySampleRate(cycler, rate);
   }
-}
-
-// Perform analysis on data arrays for enhanced cycling logic
-function performArrayAnalysis(dataArray, stepStartTime) {
-  // Filter data points for current step only
-  const stepData = dataArray.filter(point => point.time_ms >= stepStartTime);
   
-  if (stepData.length === 0) {
-    return {
-      voltageTrend: 0,
-      currentStability: 0,
-      stepAvgVoltage: 0,
-      stepAvgCurrent: 0,
-      dataPointsInStep: 0
-    };
-  }
-  
-  // Calculate averages
-  const avgVoltage = stepData.reduce((sum, point) => sum + point.voltage_V, 0) / stepData.length;
-  const avgCurrent = stepData.reduce((sum, point) => sum + point.current_A, 0) / stepData.length;
-  
-  // Calculate voltage trend (slope over last 10 points or all if fewer)
-  const trendPoints = stepData.slice(-Math.min(10, stepData.length));
-  let voltageTrend = 0;
-  if (trendPoints.length >= 2) {
-    const firstPoint = trendPoints[0];
-    const lastPoint = trendPoints[trendPoints.length - 1];
-    const deltaTime = (lastPoint.time_ms - firstPoint.time_ms) / 1000; // seconds
-    const deltaVoltage = lastPoint.voltage_V - firstPoint.voltage_V;
-    voltageTrend = deltaTime > 0 ? deltaVoltage / deltaTime : 0; // V/s
-  }
-  
-  // Calculate current stability (coefficient of variation)
-  let currentStability = 0;
-  if (stepData.length >= 2) {
-    const currentStdDev = Math.sqrt(
-      stepData.reduce((sum, point) => sum + Math.pow(point.current_A - avgCurrent, 2), 0) / stepData.length
-    );
-    currentStability = Math.abs(avgCurrent) > 1e-9 ? currentStdDev / Math.abs(avgCurrent) : 0;
+  // Check cutoff conditions using both current data and array analysis
+  if (cycler.currentStep) {
+    if (cyclerLog.enabled('debug')) {
+      cyclerLog.debug('Checking cutoffs', {
+        channel: channel, mode: cycler.currentStep.mode, voltage: voltage, current: current, stepTime: stepTime
+      });
+    }
+    if (checkStepCutoffsWithArrayAnalysis(cycler, voltage, current, stepTime, arrayAnalysis)) {
+      cyclerLog.info('Cutoff triggered, advancing to next step', { channel: channel, step: cycler.currentStepIndex });
+      advanceToNextStep(cycler);
+    }
   }
-  
-  return {
-    voltageTrend: voltageTrend,           // V/s - positive means increasing
-    currentStability: currentStability,   // Coefficient of variation (0 = stable, higher = less stable)
-    stepAvgVoltage: avgVoltage,          // Average voltage for this step
-    stepAvgCurrent: avgCurrent,          // Average current for this step  
-    dataPointsInStep: stepData.length    // Number of data points collected in this step
-  };
 }
 
 
 // Process cycler data from streaming
-function processCyclerData(voltage, current) {
-  const now = Date.now();
-  const stepTime = (now - cyclerState.stepStartTime) / 1000;
-  const totalTime = (now - cyclerState.startTime) / 1000;
+function processCyclerData(cycler, voltage, current) {
+  const now = cyclerNow(cycler);
+  const stepTime = (now - cycler.stepStartTime) / 1000;
+  const totalTime = (now - cycler.startTime) / 1000;
   
   // Update Ah integration
-  updateAhIntegration(current, now);
+  updateAhIntegration(cycler, current, now);
   
   // Create data point
   const dataPoint = {
     timestamp: new Date().toISOString(),
-    cycle: cyclerState.currentCycle,
-    step: cyclerState.currentStepIndex,
-    step_type: cyclerState.currentStep ? cyclerState.currentStep.mode : 'unknown',
+    cycle: cycler.currentCycle,
+    step: cycler.currentStepIndex,
+    step_type: cycler.currentStep ? cycler.currentStep.mode : 'unknown',
     step_time: stepTime,
     total_time: totalTime,
     voltage: voltage,
     current: current,
-    step_ah: cyclerState.stepAh,
-    cycle_ah: cyclerState.cycleAh,
-    total_ah: cyclerState.totalAh
+    step_ah: cycler.stepAh,
+    cycle_ah: cycler.cycleAh,
+    total_ah: cycler.totalAh,
+    channel: cycler.channel
   };
   
-  cyclerState.stepData.push(dataPoint);
-  
-  // Write to SQLite database if logging enabled
-  if (cyclerState.cyclerDataStmt) {
-    try {
-      cyclerState.cyclerDataStmt.run(
-        dataPoint.timestamp,
-        now,
-        dataPoint.cycle,
-        dataPoint.step,
-        dataPoint.step_type,
-        dataPoint.step_time,
-        dataPoint.total_time,
-        dataPoint.voltage,
-        dataPoint.current,
-        dataPoint.step_ah,
-        dataPoint.cycle_ah,
-        dataPoint.total_ah,
-        null, // temperature_c
-        null  // notes
-      );
-    } catch (err) {
-      console.error('Cycler SQLite write error:', err);
-    }
-  }
-  
-  // Also write to CSV for compatibility
-  if (cyclerState.cyclerCsvWriter) {
-    cyclerState.cyclerCsvWriter.writeRecords([dataPoint]).catch(err => {
-      console.error('Cycler CSV write error:', err);
-    });
+  cycler.stepStats.add(now, voltage, current);
+  
+  // Write to the primary sink (SQLite or columnar) if logging enabled
+  if (cycler.cyclerSink) {
+    cycler.cyclerSink.push([
+      dataPoint.timestamp,
+      now,
+      dataPoint.cycle,
+      dataPoint.step,
+      dataPoint.step_type,
+      dataPoint.step_time,
+      dataPoint.total_time,
+      dataPoint.voltage,
+      dataPoint.current,
+      dataPoint.step_ah,
+      dataPoint.cycle_ah,
+      dataPoint.total_ah,
+      null, // temperature_c
+      null, // notes
+      null, null, null, null, null  // No step analysis on this path
+    ]);
   }
   
   // Emit real-time data
-  io.emit('cycler_data', dataPoint);
+  broadcaster.queueCycler(dataPoint);
   
   // Check cutoff conditions
-  if (cyclerState.currentStep && checkStepCutoffs(voltage, current, stepTime)) {
-    advanceToNextStep();
+  if (cycler.currentStep && checkStepCutoffs(cycler, voltage, current, stepTime)) {
+    advanceToNextStep(cycler);
   }
 }
 
 
 //smu helpder functions
+const serialOut = { commands: 0, bytes: 0 };  // Everything sent through writeout(), for /metrics
+
 function writeout(s,le="\r\n")
 {
   //console.log(`[SERIAL OUT] ${s}`);
   serialPort.write(s+le);
+  serialOut.commands++;
+  serialOut.bytes += s.length + le.length;
   
   // Log command if logging is active
   if (loggingState.isLogging) {
@@ -997,15 +1133,13 @@ function set_mode(ch,mode) {
 
 function set_current(ch,cur)
 {
-  console.log(`🔧 set_current(${ch}, ${cur}) - Current mode: ${smuState.channels[ch].mode}`);
   if (smuState.channels[ch].mode !=  "FIMV") {
-    console.log(`🔧 Switching to FIMV mode for current control`);
+    smuLog.debug('Switching to FIMV mode for current control', { channel: ch });
     set_mode(ch,'FIMV');
   }
-  console.log(`🔧 Sending command: SOUR${ch}:CURR ${cur}`);
   writeout(`SOUR${ch}:CURR ${cur}`);
   smuState.channels[ch].current = cur;
-  console.log(`🔧 State updated - channel ${ch} current set to ${cur}A`);
+  smuLog.debug('Current set', { channel: ch, current: cur });
 }
 
 function set_potential(ch,pot)
@@ -1391,23 +1525,362 @@ app.get("/smu/state", (req,res) => {
   }
 })
 
-// Data Array Access Endpoints
-app.get("/data/ch1", (req,res) => {
+// Sweeps: setpoint and MEAS{n}:VOLT:CURR? commands are written up to SWEEP_WINDOW points
+// ahead of their replies, so a point costs serial time rather than an HTTP round trip
+const SWEEP_WINDOW = parseInt(process.env.SWEEP_WINDOW) || 16;
+const SWEEP_MAX_POINTS = 10000;
+const SWEEP_REPLY_TIMEOUT_MS = 2000;  // Abort when the SMU goes this long without a reply
+const SWEEP_MODES = { voltage: 'FVMI', current: 'FIMV' };
+let activeSweep = null;  // At most one sweep at a time; handleSerialLine hands it replies (see SWEEP_GUARDED_PATHS)
+
+// A MEAS{n}:VOLT:CURR? reply is exactly "voltage,current"; returns null for anything else
+function parseSweepReply(line) {
+  const p = line.split(",");
+  if (p.length !== 2) return null;
+  const voltage = parseFloat(p[0]), current = parseFloat(p[1]);
+  return isNaN(voltage) || isNaN(current) ? null : [voltage, current];
+}
+
+// `points` evenly spaced setpoints from start to stop inclusive
+function sweepSetpoints(start, stop, points) {
+  const setpoints = new Float64Array(points);
+  for (let k = 0; k < points; k++) {
+    setpoints[k] = points === 1 ? start : start + (stop - start) * k / (points - 1);
+  }
+  return setpoints;
+}
+
+// Resolves with the measured columns once every point has a reply
+function runSweep(channel, setpoints, mode, dwellMs) {
+  return new Promise((resolve, reject) => {
+    const n = setpoints.length;
+    const sweep = {
+      channel: channel,
+      time_ms: new Float64Array(n),
+      voltage_V: new Float64Array(n),
+      current_A: new Float64Array(n),
+      sent: 0,
+      received: 0,
+      replyTimer: null,
+      dwellTimer: null
+    };
+
+    function finish(error) {
+      clearTimeout(sweep.replyTimer);
+      clearTimeout(sweep.dwellTimer);
+      activeSweep = null;
+      if (error) reject(error);
+      else resolve(sweep);
+    }
+
+    function armReplyTimeout() {
+      clearTimeout(sweep.replyTimer);
+      sweep.replyTimer = setTimeout(() => {
+        const error = new Error(`SMU stopped replying after ${sweep.received} of ${n} points`);
+        error.status = 504;
+        finish(error);
+      }, SWEEP_REPLY_TIMEOUT_MS + dwellMs);
+    }
+
+    function measure() {
+      sweep.dwellTimer = null;
+      measure_voltage_and_current(channel);
+      sendMore();
+    }
+
+    function sendMore() {
+      while (sweep.sent < n && sweep.sent - sweep.received < SWEEP_WINDOW && !sweep.dwellTimer) {
+        const setpoint = setpoints[sweep.sent++];
+        if (mode === 'voltage') set_potential(channel, setpoint);
+        else set_current(channel, setpoint);
+        if (dwellMs > 0) sweep.dwellTimer = setTimeout(measure, dwellMs);
+        else measure_voltage_and_current(channel);
+      }
+    }
+
+    // Returns true when the line was a measurement reply for this sweep
+    sweep.accept = (line) => {
+      const reply = parseSweepReply(line);
+      if (!reply) return false;
+      const k = sweep.received++;
+      sweep.time_ms[k] = Date.now();
+      sweep.voltage_V[k] = reply[0];
+      sweep.current_A[k] = -reply[1];  // Same sign convention as /data/chN
+      if (sweep.received === n) {
+        finish();
+      } else {
+        armReplyTimeout();
+        sendMore();
+      }
+      return true;
+    };
+
+    activeSweep = sweep;
+    armReplyTimeout();
+    sendMore();
+  });
+}
+
+// Sweep the source and measure at each point: body { channel, start, stop, points, dwell?, mode? }
+app.post('/smu/sweep', async (req, res) => {
   try {
-    const limit = req.query.limit ? parseInt(req.query.limit) : ch1.length;
-    const offset = req.query.offset ? parseInt(req.query.offset) : 0;
-    
-    const startIndex = Math.max(0, ch1.length - limit - offset);
-    const endIndex = Math.max(0, ch1.length - offset);
-    
+    const { channel, start, stop, points } = req.body;
+    const dwell = req.body.dwell === undefined ? 0 : Number(req.body.dwell);
+    const mode = req.body.mode || 'voltage';
+
+    if (channel !== 1 && channel !== 2) {
+      return res.status(400).json({ error: 'channel must be 1 or 2' });
+    }
+    if (!Number.isFinite(start) || !Number.isFinite(stop)) {
+      return res.status(400).json({ error: 'start and stop are required numbers' });
+    }
+    if (!Number.isInteger(points) || points < 1 || points > SWEEP_MAX_POINTS) {
+      return res.status(400).json({ error: `points must be an integer from 1 to ${SWEEP_MAX_POINTS}` });
+    }
+    if (!Number.isFinite(dwell) || dwell < 0) {
+      return res.status(400).json({ error: 'dwell must be a non-negative number of seconds' });
+    }
+    if (!SWEEP_MODES[mode]) {
+      return res.status(400).json({ error: `mode must be one of: ${Object.keys(SWEEP_MODES).join(', ')}` });
+    }
+    if (!serialPort || !serialPort.isOpen) {
+      return res.status(503).json({ error: 'Serial port is not open' });
+    }
+    if (activeSweep) {
+      return res.status(409).json({ error: `A sweep is already running on channel ${activeSweep.channel}` });
+    }
+    if ((cyclers.get(channel) || {}).isRunning) {
+      return res.status(409).json({ error: `Cycler is running on channel ${channel}` });
+    }
+
+    const setpoints = sweepSetpoints(start, stop, points);
+    const started = Date.now();
+    smuLog.info('Sweep started', { channel: channel, mode: mode, start: start, stop: stop, points: points, dwell: dwell });
+    const sweep = await runSweep(channel, setpoints, mode, dwell * 1000);
     res.json({
-      channel: 1,
-      total_points: ch1.length,
-      returned_points: endIndex - startIndex,
-      offset: offset,
-      data: ch1.slice(startIndex, endIndex)
+      channel: channel,
+      mode: mode,
+      points: points,
+      dwell: dwell,
+      elapsed_ms: Date.now() - started,
+      setpoint: Array.from(setpoints),
+      time_ms: Array.from(sweep.time_ms),
+      voltage_V: Array.from(sweep.voltage_V),
+      current_A: Array.from(sweep.current_A)
     });
   } catch (error) {
+    console.error('Error running sweep:', error);
+    res.status(error.status || 500).json({ error: error.message });
+  }
+});
+
+// Largest-triangle-three-buckets downsampling over ring buffer indices [start, end)
+// Returns indices into data; buckets match python_examples/decimation.py
+function lttbIndices(data, start, end, points, field) {
+  const n = end - start;
+  if (points >= n || points < 3) {
+    return Array.from({ length: n }, (_, i) => start + i);
+  }
+  
+  // Bucket b (1..points-2) covers rows r with 1 + floor((r-1)(points-2)/(n-2)) == b
+  const edges = new Array(points + 1);
+  edges[0] = 0;
+  for (let b = 1; b < points - 1; b++) {
+    edges[b] = Math.ceil((b - 1) * (n - 2) / (points - 2)) + 1;
+  }
+  edges[points - 1] = n - 1;
+  edges[points] = n;
+  
+  const selected = new Array(points);
+  selected[0] = start;
+  selected[points - 1] = end - 1;
+  
+  let a = start;
+  for (let b = 1; b < points - 1; b++) {
+    // Average of the next bucket
+    let cx = 0, cy = 0;
+    const nextStart = start + edges[b + 1], nextEnd = start + edges[b + 2];
+    for (let i = nextStart; i < nextEnd; i++) {
+      cx += data.value('time_ms', i);
+      cy += data.value(field, i);
+    }
+    cx /= (nextEnd - nextStart);
+    cy /= (nextEnd - nextStart);
+    
+    const ax = data.value('time_ms', a), ay = data.value(field, a);
+    let maxArea = -1, maxIndex = start + edges[b];
+    for (let i = start + edges[b]; i < start + edges[b + 1]; i++) {
+      const area = Math.abs((ax - cx) * (data.value(field, i) - ay) - (ax - data.value('time_ms', i)) * (cy - ay));
+      if (area > maxArea) {
+        maxArea = area;
+        maxIndex = i;
+      }
+    }
+    selected[b] = maxIndex;
+    a = maxIndex;
+  }
+  return selected;
+}
+
+// Per-bucket min/max downsampling over ring buffer indices [start, end), keeps spikes visible
+function minMaxIndices(data, start, end, points, field) {
+  const n = end - start;
+  if (points >= n || points < 2) {
+    return Array.from({ length: n }, (_, i) => start + i);
+  }
+  
+  const buckets = Math.floor(points / 2);
+  const selected = [];
+  for (let b = 0; b < buckets; b++) {
+    const bStart = start + Math.ceil(b * n / buckets);
+    const bEnd = start + Math.ceil((b + 1) * n / buckets);
+    let lo = bStart, hi = bStart;
+    for (let i = bStart + 1; i < bEnd; i++) {
+      if (data.value(field, i) < data.value(field, lo)) lo = i;
+      if (data.value(field, i) > data.value(field, hi)) hi = i;
+    }
+    selected.push(Math.min(lo, hi));
+    if (hi !== lo) selected.push(Math.max(lo, hi));
+  }
+  return selected;
+}
+
+// Logical index range for ?start=&end= (time_ms, start <= time_ms < end), found by binary search
+function timeRangeIndices(dataArray, query) {
+  const bound = (name) => {
+    if (query[name] === undefined || query[name] === '') return undefined;
+    const value = Number(query[name]);
+    if (!Number.isFinite(value)) throw new RangeError(`${name} must be a time_ms number`);
+    return value;
+  };
+  const startMs = bound('start');
+  const endMs = bound('end');
+  if (startMs !== undefined && endMs !== undefined && endMs < startMs) {
+    throw new RangeError('end must not be before start');
+  }
+  return Object.assign(dataArray.timeRange(startMs, endMs), { startMs: startMs, endMs: endMs });
+}
+
+// Select (and optionally decimate) samples of a channel ring buffer for the /data/chN endpoints:
+// a contiguous [startIndex, endIndex) or, when decimating, a list of logical indices
+function channelSelection(dataArray, query) {
+  const range = timeRangeIndices(dataArray, query);
+  const rangeLength = range.end - range.start;
+  const limit = query.limit ? parseInt(query.limit) : rangeLength;
+  const offset = query.offset ? parseInt(query.offset) : 0;
+  
+  const selection = {
+    rangeLength: rangeLength,
+    offset: offset,
+    startIndex: Math.max(range.start, range.end - limit - offset),
+    endIndex: Math.max(range.start, range.end - offset),
+    indices: null,
+    decimation: null
+  };
+  
+  if (query.since !== undefined) {
+    // Forward paging by sequence number: the oldest `limit` samples with seq >= since
+    const since = Number(query.since);
+    if (!Number.isInteger(since)) {
+      throw new RangeError('since must be a sequence number');
+    }
+    selection.startIndex = Math.min(range.end, Math.max(range.start, since - dataArray.firstSeq));
+    selection.endIndex = Math.min(range.end, selection.startIndex + limit);
+    selection.offset = 0;
+  }
+  
+  const points = query.points ? parseInt(query.points) : 0;
+  if (points > 0) {
+    const method = query.method || 'lttb';
+    const field = query.field || 'voltage_V';
+    if (!['lttb', 'minmax'].includes(method)) {
+      throw new RangeError('method must be lttb or minmax');
+    }
+    if (!['voltage_V', 'current_A'].includes(field)) {
+      throw new RangeError('field must be voltage_V or current_A');
+    }
+    
+    selection.indices = method === 'lttb' ?
+      lttbIndices(dataArray, selection.startIndex, selection.endIndex, points, field) :
+      minMaxIndices(dataArray, selection.startIndex, selection.endIndex, points, field);
+    selection.decimation = { method: method, field: field, points: points };
+  }
+  return selection;
+}
+
+function channelDataResponse(channel, dataArray, query) {
+  const selection = channelSelection(dataArray, query);
+  const response = {
+    channel: channel,
+    total_points: dataArray.length,
+    range_points: selection.rangeLength,
+    returned_points: selection.endIndex - selection.startIndex,
+    offset: selection.offset,
+    first_seq: dataArray.firstSeq,
+    next_seq: dataArray.nextSeq,
+    server: SERVER_INSTANCE
+  };
+  
+  if (selection.indices) {
+    response.decimation = selection.decimation;
+    response.returned_points = selection.indices.length;
+    response.data = selection.indices.map(i => dataArray.point(i));
+  } else {
+    response.data = dataArray.slice(selection.startIndex, selection.endIndex);
+  }
+  
+  return response;
+}
+
+// ?format=binary: the selection as one columnar little-endian float64 body (count time_ms
+// values, then voltage_V, then current_A; the layout of socket frames) with the JSON
+// response's counters in X-Minismush-* headers. No per-sample objects are built
+function sendChannelBinary(res, channel, dataArray, query) {
+  const selection = channelSelection(dataArray, query);
+  const packed = selection.indices ?
+    dataArray.packIndices(selection.indices, RING_FIELDS) :
+    dataArray.packColumns(selection.startIndex, selection.endIndex, RING_FIELDS);
+  const count = packed.length / RING_FIELDS.length;
+  const headers = {
+    'Content-Type': 'application/octet-stream',
+    'X-Minismush-Channel': channel,
+    'X-Minismush-Count': count,
+    'X-Minismush-Fields': RING_FIELDS.join(','),
+    'X-Minismush-Layout': 'columnar-f64le',
+    'X-Minismush-Total-Points': dataArray.length,
+    'X-Minismush-Range-Points': selection.rangeLength,
+    'X-Minismush-Next-Seq': dataArray.nextSeq,
+    'X-Minismush-Server': SERVER_INSTANCE
+  };
+  if (selection.indices) {
+    headers['X-Minismush-Decimation'] = `${selection.decimation.method},${selection.decimation.field},${selection.decimation.points}`;
+  } else {
+    // Contiguous selection: sample k has seq first_seq + k
+    headers['X-Minismush-First-Seq'] = dataArray.firstSeq + selection.startIndex;
+  }
+  res.set(headers);
+  res.end(float64LE(packed));
+}
+
+function sendChannelData(res, channel, dataArray, query) {
+  if (query.format === 'binary') return sendChannelBinary(res, channel, dataArray, query);
+  if (query.format !== undefined && query.format !== 'json') {
+    throw new RangeError('format must be json or binary');
+  }
+  res.json(channelDataResponse(channel, dataArray, query));
+}
+
+// Data Array Access Endpoints
+// Optional ?start=&end= (time_ms) select a time window by binary search
+// Optional ?points=N&method=lttb|minmax&field=voltage_V|current_A decimates the selection
+// Optional ?format=binary returns packed float64 columns instead of JSON objects
+app.get("/data/ch1", (req,res) => {
+  try {
+    sendChannelData(res, 1, ch1, req.query);
+  } catch (error) {
+    if (error instanceof RangeError) {
+      return res.status(400).json({ error: error.message });
+    }
     console.error('Error getting CH1 data:', error);
     res.status(500).json({ error: 'Failed to get CH1 data' });
   }
@@ -1415,32 +1888,38 @@ app.get("/data/ch1", (req,res) => {
 
 app.get("/data/ch2", (req,res) => {
   try {
-    const limit = req.query.limit ? parseInt(req.query.limit) : ch2.length;
-    const offset = req.query.offset ? parseInt(req.query.offset) : 0;
-    
-    const startIndex = Math.max(0, ch2.length - limit - offset);
-    const endIndex = Math.max(0, ch2.length - offset);
-    
-    res.json({
-      channel: 2,
-      total_points: ch2.length,
-      returned_points: endIndex - startIndex,
-      offset: offset,
-      data: ch2.slice(startIndex, endIndex)
-    });
+    sendChannelData(res, 2, ch2, req.query);
   } catch (error) {
+    if (error instanceof RangeError) {
+      return res.status(400).json({ error: error.message });
+    }
     console.error('Error getting CH2 data:', error);
     res.status(500).json({ error: 'Failed to get CH2 data' });
   }
 })
 
+// Recent cycler points by sequence number: ?since=<seq>&limit=N (oldest first). The last
+// few thousand points broadcast as 'cycler_frame' are retained for clients catching up
+app.get("/data/cycler", (req,res) => {
+  const since = req.query.since !== undefined ? Number(req.query.since) : 0;
+  const limit = req.query.limit ? parseInt(req.query.limit) : Infinity;
+  if (!Number.isInteger(since)) {
+    return res.status(400).json({ error: 'since must be a sequence number' });
+  }
+  res.json(Object.assign(broadcaster.cyclerRange(since, limit), { server: SERVER_INSTANCE }));
+})
+
 // Combined data analysis endpoint
+// Optional ?start=&end= (time_ms) restricts the ranges to that window; min/max/mean come
+// from the ring buffer block summaries, so a window costs O(blocks), not O(samples)
 app.get("/data/analysis", (req,res) => {
   try {
     const channel = parseInt(req.query.channel) || 1;
     const dataArray = channel === 1 ? ch1 : ch2;
+    const range = timeRangeIndices(dataArray, req.query);
+    const windowed = range.startMs !== undefined || range.endMs !== undefined;
     
-    if (dataArray.length === 0) {
+    if (range.end <= range.start) {
       return res.json({
         channel: channel,
         analysis: null,
@@ -1448,31 +1927,34 @@ app.get("/data/analysis", (req,res) => {
       });
     }
     
-    // Perform analysis on entire array
-    const analysis = performArrayAnalysis(dataArray, 0); // Analyze all data
-    
     // Additional statistics
-    const latest = dataArray[dataArray.length - 1];
-    const oldest = dataArray[0];
+    const latest = dataArray.point(range.end - 1);
+    const oldest = dataArray.point(range.start);
     const timeSpan = latest.time_ms - oldest.time_ms;
     
-    res.json({
+    const response = {
       channel: channel,
       total_points: dataArray.length,
+      range_points: range.end - range.start,
       time_span_ms: timeSpan,
       time_span_hours: timeSpan / (1000 * 3600),
       latest_data: latest,
-      analysis: analysis,
-      voltage_range: {
-        min: Math.min(...dataArray.map(p => p.voltage_V)),
-        max: Math.max(...dataArray.map(p => p.voltage_V))
-      },
-      current_range: {
-        min: Math.min(...dataArray.map(p => p.current_A)),
-        max: Math.max(...dataArray.map(p => p.current_A))
-      }
-    });
+      voltage_range: dataArray.rangeStats('voltage_V', range.start, range.end),
+      current_range: dataArray.rangeStats('current_A', range.start, range.end)
+    };
+    if (windowed) {
+      response.start = range.startMs;
+      response.end = range.endMs;
+      response.first_seq = oldest.seq;
+    } else {
+      // Running statistics over the entire buffer
+      response.analysis = dataArray.stats.analysis();
+    }
+    res.json(response);
   } catch (error) {
+    if (error instanceof RangeError) {
+      return res.status(400).json({ error: error.message });
+    }
     console.error('Error getting data analysis:', error);
     res.status(500).json({ error: 'Failed to get data analysis' });
   }
@@ -1664,58 +2146,108 @@ app.get('/smu', (req, res) => {
 // BATTERY CYCLER FUNCTIONALITY
 // ============================================================================
 
+const BATTERY_DIR = './data/battery';
+const CYCLER_SINKS = ['sqlite', 'columnar'];
+// Cycler state is checkpointed to <testId>.checkpoint.json every CYCLER_CHECKPOINT_MS and at
+// every step change, so a restarted server can resume the test (POST /cycler/recover)
+const CHECKPOINT_INTERVAL_MS = parseInt(process.env.CYCLER_CHECKPOINT_MS) || 5000;
+// CYCLER_ADAPTIVE_RATE=1 adapts the streaming rate of tests that do not set adaptiveRate themselves
+const ADAPTIVE_RATE_DEFAULT = ['1', 'true'].includes(process.env.CYCLER_ADAPTIVE_RATE);
+const CYCLER_INSERT_SQL = `
+  INSERT INTO data (
+    timestamp, unix_timestamp, cycle, step, step_type, step_time_s, total_time_s,
+    voltage_v, current_a, step_ah, cycle_ah, total_ah, temperature_c, notes,
+    voltage_trend, current_stability, step_avg_voltage, step_avg_current, data_points_in_step
+  ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+`;
+
 // Battery Cycler State Management
-let cyclerState = {
-  isRunning: false,
-  isPaused: false,
-  channel: null,
-  steps: [],
-  currentStepIndex: 0,
-  currentCycle: 0,
-  totalCycles: 0,
-  startTime: null,
-  stepStartTime: null,
-  lastMeasurementTime: null,
-  
-  // Integrators and counters
-  totalAh: 0,           // Total Ah since start
-  stepAh: 0,            // Ah for current step
-  cycleAh: 0,           // Ah for current cycle
-  lastCurrent: 0,       // Last measured current for integration
-  
-  // Current step data
-  currentStep: null,
-  stepData: [],         // Data points for current step
-  
-  // Logging
-  cyclerLogFile: null,
-  cyclerCsvFile: null,
-  cyclerCsvWriter: null,
-  cyclerDb: null,
-  cyclerDataStmt: null,
-  
-  // Streaming data
-  lastStreamingData: null
-};
+// One independent cycler per SMU channel, each with its own step sequence,
+// integrators, log store and cutoff processing. Serial samples are dispatched
+// to the cycler for their channel.
+const CYCLER_CHANNELS = [1, 2];
+const cyclers = new Map();  // channel -> cycler state (kept after stop for status/export)
+
+function createCyclerState(channel) {
+  return {
+    isRunning: false,
+    isPaused: false,
+    channel: channel,
+    steps: [],
+    currentStepIndex: 0,
+    currentCycle: 0,
+    totalCycles: 0,
+    startTime: null,
+    stepStartTime: null,
+    lastMeasurementTime: null,
+    
+    // Integrators and counters
+    totalAh: 0,           // Total Ah since start
+    stepAh: 0,            // Ah for current step
+    cycleAh: 0,           // Ah for current cycle
+    lastCurrent: 0,       // Last measured current for integration
+    
+    // Current step data
+    currentStep: null,
+    stepStats: new RunningStats(),  // Running statistics for the current step
+    
+    // Logging
+    cyclerLogFile: null,  // battery_test_*.db or battery_test_*.columns/
+    testId: null,         // battery_test_<timestamp>_ch<n>, used by /cycler/export/:testId
+    sink: 'sqlite',       // Primary sink: 'sqlite' or 'columnar'
+    cyclerDb: null,
+    cyclerSink: null,     // SqliteWriteQueue or ColumnarWriter (both push/flush/close/stats)
+    archiveOnStop: true,  // Write a columnar archive next to the database when the test stops (sqlite sink)
+    checkpointTimer: null,
+    lastCheckpoint: null, // Wall time (ms) of the last checkpoint written
+    sampleRate: null,     // AdaptiveSampleRate when the test adapts the streaming rate (sample_rate.js)
+    
+    // Streaming data
+    lastStreamingData: null
+  };
+}
+
+// Current time on the cycler's clock: host time, or with SAMPLE_CLOCK=device the time of
+// the channel's latest sample, so step and test times follow the sample timestamps
+function cyclerNow(cycler) {
+  if (SAMPLE_CLOCK === 'device') {
+    const latest = (cycler.channel === 1 ? ch1 : ch2).latest();
+    if (latest) return latest.time_ms;
+  }
+  return Date.now();
+}
+
+// Cycler for a request: the given channel, or the only cycler (running first) when no
+// channel is given. Returns null if there is none or the choice is ambiguous.
+function resolveCycler(channel) {
+  if (channel !== undefined && channel !== null && channel !== '') {
+    return cyclers.get(Number(channel)) || null;
+  }
+  const all = [...cyclers.values()];
+  const running = all.filter(c => c.isRunning);
+  if (running.length === 1) return running[0];
+  if (running.length === 0 && all.length === 1) return all[0];
+  return null;
+}
 
 // Amp-hour integrator using trapezoidal rule
-function updateAhIntegration(current, timestamp) {
-  if (cyclerState.lastMeasurementTime === null) {
-    cyclerState.lastMeasurementTime = timestamp;
-    cyclerState.lastCurrent = current;
+function updateAhIntegration(cycler, current, timestamp) {
+  if (cycler.lastMeasurementTime === null) {
+    cycler.lastMeasurementTime = timestamp;
+    cycler.lastCurrent = current;
     return;
   }
   
-  const deltaTimeHours = (timestamp - cyclerState.lastMeasurementTime) / (1000 * 3600);
-  const avgCurrent = (current + cyclerState.lastCurrent) / 2;
+  const deltaTimeHours = (timestamp - cycler.lastMeasurementTime) / (1000 * 3600);
+  const avgCurrent = (current + cycler.lastCurrent) / 2;
   const deltaAh = avgCurrent * deltaTimeHours;
   
-  cyclerState.totalAh += deltaAh;
-  cyclerState.stepAh += deltaAh;
-  cyclerState.cycleAh += deltaAh;
+  cycler.totalAh += deltaAh;
+  cycler.stepAh += deltaAh;
+  cycler.cycleAh += deltaAh;
   
-  cyclerState.lastMeasurementTime = timestamp;
-  cyclerState.lastCurrent = current;
+  cycler.lastMeasurementTime = timestamp;
+  cycler.lastCurrent = current;
 }
 
 // Step validation and parsing
@@ -1757,6 +2289,10 @@ function validateCyclerSteps(steps) {
         throw new Error(`CV step missing voltage at step ${i}`);
       }
     }
+    
+    if (step.sample_rate !== undefined && !(typeof step.sample_rate === 'number' && step.sample_rate > 0)) {
+      throw new Error(`sample_rate must be a positive number of Hz at step ${i}`);
+    }
   }
   
   if (!cycleStartFound) {
@@ -1770,28 +2306,59 @@ function validateCyclerSteps(steps) {
   return true;
 }
 
-// Initialize cycler logging with SQLite database
-function initializeCyclerLogging(testMetadata = {}) {
-  if (cyclerState.cyclerLogFile) {
+// Test metadata recorded with every cycler log (SQLite metadata table or columnar metadata.json)
+function buildTestMetadata(cycler, testMetadata = {}) {
+  return {
+    test_name: testMetadata.testName || 'Battery Cycling Test',
+    test_type: testMetadata.testType || 'cycling',
+    channel: cycler.channel.toString(),
+    total_cycles: cycler.totalCycles.toString(),
+    start_time: new Date().toISOString(),
+    operator: testMetadata.operator || 'system',
+    battery_id: testMetadata.batteryId || 'unknown',
+    battery_type: testMetadata.batteryType || 'unknown',
+    capacity_ah: testMetadata.capacityAh ? testMetadata.capacityAh.toString() : 'unknown',
+    temperature_c: testMetadata.temperatureC ? testMetadata.temperatureC.toString() : 'ambient',
+    notes: testMetadata.notes || '',
+    step_definition: JSON.stringify(cycler.steps),
+    sink: cycler.sink,
+    software_version: 'minismush-1.0',
+    data_format_version: '1.1'  // 1.1: step analysis in typed columns instead of JSON in notes
+  };
+}
+
+// Initialize cycler logging to the primary sink: a SQLite database (default) or a
+// columnar directory. CSV is derived on demand from either (GET /cycler/export/:testId).
+function initializeCyclerLogging(cycler, testMetadata = {}) {
+  if (cycler.cyclerLogFile) {
     const timestamp = new Date().toISOString().replace(/[:.]/g, '-');
-    const batteryDir = './data/battery';
     
     // Ensure battery log directory exists
-    const fs = require('fs');
-    if (!fs.existsSync(batteryDir)) {
-      fs.mkdirSync(batteryDir, { recursive: true });
+    if (!fs.existsSync(BATTERY_DIR)) {
+      fs.mkdirSync(BATTERY_DIR, { recursive: true });
     }
     
-    const sqliteFilename = `${batteryDir}/battery_test_${timestamp}.db`;
-    const csvFilename = `${batteryDir}/battery_test_${timestamp}.csv`;
+    const testId = `battery_test_${timestamp}_ch${cycler.channel}`;  // Unique per concurrent channel
+    const defaultMetadata = buildTestMetadata(cycler, testMetadata);
+    cycler.testId = testId;
+    
+    if (cycler.sink === 'columnar') {
+      const columnsDir = `${BATTERY_DIR}/${testId}.columns`;
+      cycler.cyclerSink = new ColumnarWriter(columnsDir, defaultMetadata, { metadataIntervalMs: CHECKPOINT_INTERVAL_MS });
+      cycler.cyclerLogFile = columnsDir;
+      cyclerLog.info('Battery test logging initialized', { channel: cycler.channel, sink: 'columnar', path: columnsDir });
+      return;
+    }
+    
+    const sqliteFilename = `${BATTERY_DIR}/${testId}.db`;
     
     // Create SQLite database
-    cyclerState.cyclerDb = new sqlite3.Database(sqliteFilename);
+    cycler.cyclerDb = openDatabase(sqlite3, sqliteFilename);
     
     // Use serialize to ensure tables are created before proceeding
-    cyclerState.cyclerDb.serialize(() => {
+    cycler.cyclerDb.serialize(() => {
       // Create metadata table
-      cyclerState.cyclerDb.run(`
+      cycler.cyclerDb.run(`
         CREATE TABLE IF NOT EXISTS metadata (
           id INTEGER PRIMARY KEY AUTOINCREMENT,
           key TEXT UNIQUE NOT NULL,
@@ -1801,7 +2368,7 @@ function initializeCyclerLogging(testMetadata = {}) {
       `);
       
       // Create data table
-      cyclerState.cyclerDb.run(`
+      cycler.cyclerDb.run(`
         CREATE TABLE IF NOT EXISTS data (
           id INTEGER PRIMARY KEY AUTOINCREMENT,
           timestamp DATETIME NOT NULL,
@@ -1818,74 +2385,101 @@ function initializeCyclerLogging(testMetadata = {}) {
           total_ah REAL NOT NULL,
           temperature_c REAL,
           notes TEXT,
-          created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+          created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+          voltage_trend REAL,
+          current_stability REAL,
+          step_avg_voltage REAL,
+          step_avg_current REAL,
+          data_points_in_step INTEGER
         )
       `);
       
-      // Insert test metadata (after tables are created)
-      const defaultMetadata = {
-        test_name: testMetadata.testName || 'Battery Cycling Test',
-        test_type: testMetadata.testType || 'cycling',
-        channel: cyclerState.channel.toString(),
-        total_cycles: cyclerState.totalCycles.toString(),
-        start_time: new Date().toISOString(),
-        operator: testMetadata.operator || 'system',
-        battery_id: testMetadata.batteryId || 'unknown',
-        battery_type: testMetadata.batteryType || 'unknown',
-        capacity_ah: testMetadata.capacityAh ? testMetadata.capacityAh.toString() : 'unknown',
-        temperature_c: testMetadata.temperatureC ? testMetadata.temperatureC.toString() : 'ambient',
-        notes: testMetadata.notes || '',
-        step_definition: JSON.stringify(cyclerState.steps),
-        software_version: 'minismush-1.0',
-        data_format_version: '1.0'
-      };
-      
-      // Insert metadata
-      const metadataStmt = cyclerState.cyclerDb.prepare('INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)');
+      // Insert metadata (after tables are created)
+      const metadataStmt = cycler.cyclerDb.prepare('INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)');
       for (const [key, value] of Object.entries(defaultMetadata)) {
         metadataStmt.run(key, value);
       }
       metadataStmt.finalize();
       
-      // Prepare data insert statement (after tables are created)
-      cyclerState.cyclerDataStmt = cyclerState.cyclerDb.prepare(`
-        INSERT INTO data (
-          timestamp, unix_timestamp, cycle, step, step_type, step_time_s, total_time_s,
-          voltage_v, current_a, step_ah, cycle_ah, total_ah, temperature_c, notes
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-      `);
-    });
-    
-    // Also maintain CSV logging for compatibility
-    const csvHeaders = [
-      { id: 'timestamp', title: 'Timestamp' },
-      { id: 'cycle', title: 'Cycle' },
-      { id: 'step', title: 'Step' },
-      { id: 'step_type', title: 'Step_Type' },
-      { id: 'step_time', title: 'Step_Time_s' },
-      { id: 'total_time', title: 'Total_Time_s' },
-      { id: 'voltage', title: 'Voltage_V' },
-      { id: 'current', title: 'Current_A' },
-      { id: 'step_ah', title: 'Step_Ah' },
-      { id: 'cycle_ah', title: 'Cycle_Ah' },
-      { id: 'total_ah', title: 'Total_Ah' }
-    ];
-    
-    cyclerState.cyclerCsvWriter = createCsvWriter({
-      path: csvFilename,
-      header: csvHeaders,
-      append: false
+      // Batched data inserts (after tables are created)
+      cycler.cyclerSink = new SqliteWriteQueue(cycler.cyclerDb, CYCLER_INSERT_SQL, { name: 'Cycler' });
     });
     
-    cyclerState.cyclerLogFile = sqliteFilename;
-    cyclerState.cyclerCsvFile = csvFilename;
+    cycler.cyclerLogFile = sqliteFilename;
     
-    console.log(`Battery test logging initialized:`);
-    console.log(`  SQLite: ${sqliteFilename}`);
-    console.log(`  CSV: ${csvFilename}`);
+    cyclerLog.info('Battery test logging initialized', { channel: cycler.channel, sink: 'sqlite', path: sqliteFilename });
   }
 }
 
+// Convert a finished battery_test_*.db into a memory-mappable columnar archive
+// (battery_test_*.columns/) so analysis can np.memmap a single cycle directly
+function writeColumnarArchive(dbFile, callback = () => {}) {
+  const archiveDir = dbFile.replace(/\.db$/, '') + '.columns';
+  const db = new sqlite3.Database(dbFile, sqlite3.OPEN_READONLY, (openErr) => {
+    if (openErr) return callback(openErr);
+    
+    db.all('SELECT key, value FROM metadata', (metaErr, metaRows) => {
+      if (metaErr) { db.close(); return callback(metaErr); }
+      
+      db.get('SELECT COUNT(*) AS n FROM data', (countErr, countRow) => {
+        if (countErr) { db.close(); return callback(countErr); }
+        
+        const rows = countRow.n;
+        const columns = {};
+        for (const [name, spec] of Object.entries(ARCHIVE_COLUMNS)) {
+          columns[name] = new spec.type(rows);
+        }
+        const index = [];
+        let i = 0;
+        
+        db.each(
+          'SELECT unix_timestamp, voltage_v, current_a, step_ah, cycle, step, step_type FROM data ORDER BY id',
+          (rowErr, row) => {
+            if (rowErr || i >= rows) return;
+            columns.time_ms[i] = row.unix_timestamp;
+            columns.voltage_v[i] = row.voltage_v === null ? NaN : row.voltage_v;
+            columns.current_a[i] = row.current_a === null ? NaN : row.current_a;
+            columns.step_ah[i] = row.step_ah;
+            columns.cycle[i] = row.cycle;
+            columns.step[i] = row.step;
+            columns.step_type[i] = stepTypeCode(row.step_type);
+            
+            // Cycle/step offset index: [cycle, step, start, end) per contiguous step
+            const last = index[index.length - 1];
+            if (!last || last[0] !== row.cycle || last[1] !== row.step) {
+              if (last) last[3] = i;
+              index.push([row.cycle, row.step, i, i + 1]);
+            }
+            i++;
+          },
+          (eachErr) => {
+            db.close();
+            if (eachErr) return callback(eachErr);
+            if (index.length > 0) index[index.length - 1][3] = i;
+            
+            try {
+              fs.mkdirSync(archiveDir, { recursive: true });
+              for (const [name, spec] of Object.entries(ARCHIVE_COLUMNS)) {
+                const column = columns[name].subarray(0, i);
+                fs.writeFileSync(path.join(archiveDir, spec.file),
+                  Buffer.from(column.buffer, column.byteOffset, column.byteLength));
+              }
+              writeIndex(archiveDir, index);
+              
+              const testMetadata = {};
+              metaRows.forEach(r => { testMetadata[r.key] = r.value; });
+              writeMetadata(archiveDir, i, testMetadata);
+              callback(null, archiveDir);
+            } catch (writeErr) {
+              callback(writeErr);
+            }
+          }
+        );
+      });
+    });
+  });
+}
+
 // Determine the expected current direction for CV steps based on voltage and historical data
 function determineCVDirection(stepVoltage, currentVoltage, initialCurrent) {
   // If we have an initial current measurement, use its sign as the primary indicator
@@ -1907,12 +2501,12 @@ function determineCVDirection(stepVoltage, currentVoltage, initialCurrent) {
 }
 
 // Enhanced cutoff checking using array analysis
-function checkStepCutoffsWithArrayAnalysis(voltage, current, stepTime, arrayAnalysis) {
-  const step = cyclerState.currentStep;
+function checkStepCutoffsWithArrayAnalysis(cycler, voltage, current, stepTime, arrayAnalysis) {
+  const step = cycler.currentStep;
   if (!step) return false;
   
   // Use standard cutoff logic as base
-  const standardCutoff = checkStepCutoffs(voltage, current, stepTime);
+  const standardCutoff = checkStepCutoffs(cycler, voltage, current, stepTime);
   if (standardCutoff) return true;
   
   // Enhanced array-based cutoffs
@@ -1922,7 +2516,9 @@ function checkStepCutoffsWithArrayAnalysis(voltage, current, stepTime, arrayAnal
     // If voltage trend is very stable and current is near cutoff, end step
     if (Math.abs(arrayAnalysis.voltageTrend) < 0.001 && // V/s - very stable voltage
         Math.abs(current) <= Math.abs(step.cutoff_A) * 1.1) { // Within 110% of cutoff current
-      console.log(`Enhanced CV cutoff: stable voltage trend (${arrayAnalysis.voltageTrend.toExponential(3)} V/s) and current near target`);
+      cyclerLog.info('Enhanced CV cutoff: stable voltage trend and current near target', {
+        channel: cycler.channel, voltageTrend: arrayAnalysis.voltageTrend, current: current
+      });
       return true;
     }
   }
@@ -1931,7 +2527,7 @@ function checkStepCutoffsWithArrayAnalysis(voltage, current, stepTime, arrayAnal
   if (step.mode === 'cc' && arrayAnalysis.currentStability < 0.05) { // Very stable current
     // If we've reached a voltage plateau with stable current, check if we should end
     if (Math.abs(arrayAnalysis.voltageTrend) < 0.0001 && arrayAnalysis.dataPointsInStep > 20) {
-      console.log(`Enhanced CC cutoff: voltage plateau detected with stable current`);
+      cyclerLog.debug('Voltage plateau detected with stable current', { channel: cycler.channel });
       // Still need to meet at least one cutoff condition
       return false; // Let standard cutoffs handle this
     }
@@ -1940,9 +2536,9 @@ function checkStepCutoffsWithArrayAnalysis(voltage, current, stepTime, arrayAnal
   // Capacity-based enhanced cutoffs
   if (step.cutoff_Ah !== undefined && arrayAnalysis.dataPointsInStep > 10) {
     // Use more accurate step-based Ah calculation
-    const stepAh = Math.abs(cyclerState.stepAh);
+    const stepAh = Math.abs(cycler.stepAh);
     if (stepAh >= Math.abs(step.cutoff_Ah)) {
-      console.log(`Enhanced capacity cutoff: ${stepAh.toFixed(6)} Ah >= ${Math.abs(step.cutoff_Ah)} Ah`);
+      cyclerLog.info('Enhanced capacity cutoff', { channel: cycler.channel, stepAh: stepAh, cutoffAh: step.cutoff_Ah });
       return true;
     }
   }
@@ -1951,18 +2547,16 @@ function checkStepCutoffsWithArrayAnalysis(voltage, current, stepTime, arrayAnal
 }
 
 // Check if current step cutoff conditions are met (original function)
-function checkStepCutoffs(voltage, current, stepTime) {
-  const step = cyclerState.currentStep;
+function checkStepCutoffs(cycler, voltage, current, stepTime) {
+  const step = cycler.currentStep;
   if (!step) return false;
   
-  console.log(`  → Checking cutoffs for ${step.mode} step:`, {
-    voltage: voltage.toFixed(4),
-    current: current.toExponential(4), 
-    stepTime: stepTime.toFixed(1),
-    cutoff_V: step.cutoff_V,
-    cutoff_A: step.cutoff_A,
-    cutoff_time_s: step.cutoff_time_s
-  });
+  if (cyclerLog.enabled('trace')) {
+    cyclerLog.trace('Step cutoffs', {
+      channel: cycler.channel, mode: step.mode, voltage: voltage, current: current, stepTime: stepTime,
+      cutoff_V: step.cutoff_V, cutoff_A: step.cutoff_A, cutoff_time_s: step.cutoff_time_s
+    });
+  }
   
   // Voltage cutoffs (same for all modes)
   if (step.cutoff_V !== undefined) {
@@ -1970,25 +2564,25 @@ function checkStepCutoffs(voltage, current, stepTime) {
       // CC mode: directional voltage cutoffs
       if ((step.current > 0 && voltage >= step.cutoff_V) ||
           (step.current < 0 && voltage <= step.cutoff_V)) {
-        console.log(`CC voltage cutoff reached: ${voltage}V (target: ${step.cutoff_V}V)`);
+        cyclerLog.info('CC voltage cutoff reached', { channel: cycler.channel, voltage: voltage, cutoff_V: step.cutoff_V });
         return true;
       }
     } else if (step.mode === 'cv') {
       // CV mode: directional voltage cutoff based on charging/discharging
       // Determine if this is a charging or discharging CV step
-      const isChargingCV = cyclerState.stepData.length > 0 ? 
-        cyclerState.stepData.some(d => d.current > 0) : step.voltage > 3.5; // Assume >3.5V is charging
+      const isChargingCV = cycler.stepStats.count > 0 ? 
+        cycler.stepStats.positiveCurrentSeen : step.voltage > 3.5; // Assume >3.5V is charging
       
       if (isChargingCV) {
         // Charging CV: end if voltage drops below cutoff (indicates capacity limit reached)
         if (voltage <= step.cutoff_V) {
-          console.log(`CV charging voltage cutoff reached: ${voltage}V dropped below ${step.cutoff_V}V`);
+          cyclerLog.info('CV charging voltage cutoff reached', { channel: cycler.channel, voltage: voltage, cutoff_V: step.cutoff_V });
           return true;
         }
       } else {
         // Discharging CV: end if voltage rises above cutoff (indicates load removed)
         if (voltage >= step.cutoff_V) {
-          console.log(`CV discharging voltage cutoff reached: ${voltage}V rose above ${step.cutoff_V}V`);
+          cyclerLog.info('CV discharging voltage cutoff reached', { channel: cycler.channel, voltage: voltage, cutoff_V: step.cutoff_V });
           return true;
         }
       }
@@ -1996,12 +2590,12 @@ function checkStepCutoffs(voltage, current, stepTime) {
   }
   
   if (step.cutoff_V_min !== undefined && voltage <= step.cutoff_V_min) {
-    console.log(`Minimum voltage cutoff reached: ${voltage}V (min: ${step.cutoff_V_min}V)`);
+    cyclerLog.info('Minimum voltage cutoff reached', { channel: cycler.channel, voltage: voltage, cutoff_V_min: step.cutoff_V_min });
     return true;
   }
   
   if (step.cutoff_V_max !== undefined && voltage >= step.cutoff_V_max) {
-    console.log(`Maximum voltage cutoff reached: ${voltage}V (max: ${step.cutoff_V_max}V)`);
+    cyclerLog.info('Maximum voltage cutoff reached', { channel: cycler.channel, voltage: voltage, cutoff_V_max: step.cutoff_V_max });
     return true;
   }
   
@@ -2010,43 +2604,43 @@ function checkStepCutoffs(voltage, current, stepTime) {
     if (step.mode === 'cc') {
       // CC mode: simple absolute value check
       if (Math.abs(current) <= Math.abs(step.cutoff_A)) {
-        console.log(`CC current cutoff reached: ${current}A (target: ${step.cutoff_A}A)`);
+        cyclerLog.info('CC current cutoff reached', { channel: cycler.channel, current: current, cutoff_A: step.cutoff_A });
         return true;
       }
     } else if (step.mode === 'cv') {
       // CV mode: directional current cutoff
       // Determine expected current direction for this CV step
-      const expectedDirection = determineCVDirection(step.voltage, voltage, cyclerState.stepData.length > 0 ? cyclerState.stepData[0].current : undefined);
+      const expectedDirection = determineCVDirection(step.voltage, voltage, cycler.stepStats.firstCurrent);
       
       if (expectedDirection !== 0) {
         // Check if current has dropped below cutoff in the expected direction
         if (expectedDirection > 0) {
           // Charging CV: check if positive current dropped below positive cutoff
           if (step.cutoff_A > 0 && current <= step.cutoff_A && current >= 0) {
-            console.log(`CV charging current cutoff reached: ${current}A (cutoff: ${step.cutoff_A}A, charging)`);
+            cyclerLog.info('CV charging current cutoff reached', { channel: cycler.channel, current: current, cutoff_A: step.cutoff_A });
             return true;
           }
           // Or if current became negative (direction change)
           if (current < 0) {
-            console.log(`CV charging direction change: ${current}A (was charging, now discharging)`);
+            cyclerLog.info('CV charging direction change', { channel: cycler.channel, current: current });
             return true;
           }
         } else {
           // Discharging CV: check if negative current dropped below negative cutoff
           if (step.cutoff_A < 0 && current >= step.cutoff_A && current <= 0) {
-            console.log(`CV discharging current cutoff reached: ${current}A (cutoff: ${step.cutoff_A}A, discharging)`);
+            cyclerLog.info('CV discharging current cutoff reached', { channel: cycler.channel, current: current, cutoff_A: step.cutoff_A });
             return true;
           }
           // Or if current became positive (direction change)
           if (current > 0) {
-            console.log(`CV discharging direction change: ${current}A (was discharging, now charging)`);
+            cyclerLog.info('CV discharging direction change', { channel: cycler.channel, current: current });
             return true;
           }
         }
       } else {
         // Bidirectional or maintenance CV: check absolute value
         if (Math.abs(current) <= Math.abs(step.cutoff_A)) {
-          console.log(`CV maintenance current cutoff reached: ${current}A (target: ${step.cutoff_A}A)`);
+          cyclerLog.info('CV maintenance current cutoff reached', { channel: cycler.channel, current: current, cutoff_A: step.cutoff_A });
           return true;
         }
       }
@@ -2057,30 +2651,30 @@ function checkStepCutoffs(voltage, current, stepTime) {
   if (step.cutoff_Ah !== undefined) {
     if (step.mode === 'cc') {
       // CC mode: use absolute value for capacity-based cutoffs
-      if (Math.abs(cyclerState.stepAh) >= Math.abs(step.cutoff_Ah)) {
-        console.log(`CC capacity cutoff reached: ${cyclerState.stepAh}Ah (target: ${step.cutoff_Ah}Ah)`);
+      if (Math.abs(cycler.stepAh) >= Math.abs(step.cutoff_Ah)) {
+        cyclerLog.info('CC capacity cutoff reached', { channel: cycler.channel, stepAh: cycler.stepAh, cutoff_Ah: step.cutoff_Ah });
         return true;
       }
     } else if (step.mode === 'cv') {
       // CV mode: directional capacity cutoff
-      const expectedDirection = determineCVDirection(step.voltage, voltage, cyclerState.stepData.length > 0 ? cyclerState.stepData[0].current : undefined);
+      const expectedDirection = determineCVDirection(step.voltage, voltage, cycler.stepStats.firstCurrent);
       
       if (expectedDirection > 0) {
         // Charging CV: check positive Ah accumulation
-        if (step.cutoff_Ah > 0 && cyclerState.stepAh >= step.cutoff_Ah) {
-          console.log(`CV charging capacity cutoff reached: ${cyclerState.stepAh}Ah (target: ${step.cutoff_Ah}Ah)`);
+        if (step.cutoff_Ah > 0 && cycler.stepAh >= step.cutoff_Ah) {
+          cyclerLog.info('CV charging capacity cutoff reached', { channel: cycler.channel, stepAh: cycler.stepAh, cutoff_Ah: step.cutoff_Ah });
           return true;
         }
       } else if (expectedDirection < 0) {
         // Discharging CV: check negative Ah accumulation
-        if (step.cutoff_Ah < 0 && cyclerState.stepAh <= step.cutoff_Ah) {
-          console.log(`CV discharging capacity cutoff reached: ${cyclerState.stepAh}Ah (target: ${step.cutoff_Ah}Ah)`);
+        if (step.cutoff_Ah < 0 && cycler.stepAh <= step.cutoff_Ah) {
+          cyclerLog.info('CV discharging capacity cutoff reached', { channel: cycler.channel, stepAh: cycler.stepAh, cutoff_Ah: step.cutoff_Ah });
           return true;
         }
       } else {
         // Bidirectional: use absolute value
-        if (Math.abs(cyclerState.stepAh) >= Math.abs(step.cutoff_Ah)) {
-          console.log(`CV bidirectional capacity cutoff reached: ${cyclerState.stepAh}Ah (target: ${step.cutoff_Ah}Ah)`);
+        if (Math.abs(cycler.stepAh) >= Math.abs(step.cutoff_Ah)) {
+          cyclerLog.info('CV bidirectional capacity cutoff reached', { channel: cycler.channel, stepAh: cycler.stepAh, cutoff_Ah: step.cutoff_Ah });
           return true;
         }
       }
@@ -2089,293 +2683,554 @@ function checkStepCutoffs(voltage, current, stepTime) {
   
   // Time cutoffs (same for all modes)
   if (step.cutoff_time_s !== undefined && stepTime >= step.cutoff_time_s) {
-    console.log(`Time cutoff reached: ${stepTime}s (target: ${step.cutoff_time_s}s)`);
+    cyclerLog.info('Time cutoff reached', { channel: cycler.channel, stepTime: stepTime, cutoff_time_s: step.cutoff_time_s });
     return true;
   }
   
   return false;
 }
 
+// Send an adaptive rate change to the SMU (SOUR{n}:DATA:SRATE)
+function applySampleRate(cycler, rate) {
+  set_sample_rate(cycler.channel, rate);
+  cyclerLog.debug('Sample rate changed', { channel: cycler.channel, rate: rate, reason: cycler.sampleRate.reason });
+}
+
 // Execute current step - simplified to only set SMU mode, measurements come from streaming
-async function executeCurrentStep() {
-  if (!cyclerState.isRunning || cyclerState.isPaused) {
-    console.log(`Step execution skipped - running: ${cyclerState.isRunning}, paused: ${cyclerState.isPaused}`);
+async function executeCurrentStep(cycler) {
+  if (!cycler.isRunning || cycler.isPaused) {
+    cyclerLog.debug('Step execution skipped', { channel: cycler.channel, running: cycler.isRunning, paused: cycler.isPaused });
     return;
   }
   
-  const step = cyclerState.currentStep;
+  const step = cycler.currentStep;
   if (!step) {
-    console.log(`No current step defined - currentStep:`, step);
+    cyclerLog.warn('No current step defined', { channel: cycler.channel });
     return;
   }
   
-  console.log(`Setting SMU for step ${cyclerState.currentStepIndex}: ${step.mode}`);
-  
   try {
     // Set SMU based on step mode - measurements will come from streaming
     switch (step.mode) {
       case 'cc':
-        console.log(`Setting CC mode: ${step.current}A on channel ${cyclerState.channel}`);
-        console.log(`Calling enable_channel(${cyclerState.channel})`);
-        enable_channel(cyclerState.channel);
-        console.log(`Calling set_current(${cyclerState.channel}, ${step.current})`);
-        set_current(cyclerState.channel, step.current);
-        console.log(`Channel ${cyclerState.channel} enabled for CC step - commands sent`);
+        enable_channel(cycler.channel);
+        set_current(cycler.channel, step.current);
         break;
         
       case 'cv':
-        console.log(`Setting CV mode: ${step.voltage}V on channel ${cyclerState.channel}`);
-        console.log(`Calling enable_channel(${cyclerState.channel})`);
-        enable_channel(cyclerState.channel);
-        console.log(`Calling set_potential(${cyclerState.channel}, ${step.voltage})`);
-        set_potential(cyclerState.channel, step.voltage);
-        console.log(`Channel ${cyclerState.channel} enabled for CV step - commands sent`);
+        enable_channel(cycler.channel);
+        set_potential(cycler.channel, step.voltage);
         break;
         
       case 'ocv':
       case 'rest':
-        console.log(`Setting ${step.mode.toUpperCase()} mode on channel ${cyclerState.channel}`);
-        console.log(`Calling set_current(${cyclerState.channel}, 0) for ${step.mode}`);
         // For OCV/REST, set current to zero (high impedance) but keep channel enabled for voltage measurement
-        set_current(cyclerState.channel, 0);
-        console.log(`Calling enable_channel(${cyclerState.channel})`);
-        enable_channel(cyclerState.channel);
-        console.log(`Channel ${cyclerState.channel} enabled for ${step.mode.toUpperCase()} step - commands sent`);
+        set_current(cycler.channel, 0);
+        enable_channel(cycler.channel);
         break;
         
       default:
-        console.log(`Unknown step mode: ${step.mode}`);
-        break;
+        cyclerLog.warn('Unknown step mode', { channel: cycler.channel, mode: step.mode });
+        return;
     }
     
+    cyclerLog.info('Step configured', {
+      channel: cycler.channel, step: cycler.currentStepIndex, mode: step.mode,
+      current: step.current, voltage: step.voltage
+    });
+    
+    if (cycler.sampleRate) {
+      const rate = cycler.sampleRate.stepChanged(cyclerNow(cycler), step);
+      if (rate !== null) applySampleRate(cycler, rate);
+    }
     
   } catch (error) {
-    console.error('Step execution error:', error);
-    stopCycler();
+    cyclerLog.error('Step execution error', { channel: cycler.channel, error: error });
+    stopCycler(cycler);
   }
 }
 
 // Advance to next step
-function advanceToNextStep() {
-  console.log(`Completing step ${cyclerState.currentStepIndex}: ${cyclerState.currentStep.mode}`);
+function advanceToNextStep(cycler) {
+  cyclerLog.info('Step completed', { channel: cycler.channel, step: cycler.currentStepIndex, mode: cycler.currentStep.mode });
   
   // Reset step counters
-  cyclerState.stepAh = 0;
-  cyclerState.stepStartTime = Date.now();
-  cyclerState.stepData = [];
+  cycler.stepAh = 0;
+  cycler.stepStartTime = cyclerNow(cycler);
+  cycler.stepStats.reset();
   
   // Find next step
-  cyclerState.currentStepIndex++;
+  cycler.currentStepIndex++;
   
-  while (cyclerState.currentStepIndex < cyclerState.steps.length) {
-    const nextStep = cyclerState.steps[cyclerState.currentStepIndex];
+  while (cycler.currentStepIndex < cycler.steps.length) {
+    const nextStep = cycler.steps[cycler.currentStepIndex];
     
     if (nextStep.cycle === 'end') {
       // End of cycle - check if we should repeat
-      cyclerState.currentCycle++;
-      console.log(`Cycle ${cyclerState.currentCycle} completed`);
+      cycler.currentCycle++;
+      cyclerLog.info('Cycle completed', { channel: cycler.channel, cycle: cycler.currentCycle });
       
       // Reset cycle counters
-      cyclerState.cycleAh = 0;
+      cycler.cycleAh = 0;
       
-      if (cyclerState.totalCycles === 0 || cyclerState.currentCycle < cyclerState.totalCycles) {
+      if (cycler.totalCycles === 0 || cycler.currentCycle < cycler.totalCycles) {
         // Start next cycle
-        cyclerState.currentStepIndex = 0;
-        while (cyclerState.currentStepIndex < cyclerState.steps.length && 
-               cyclerState.steps[cyclerState.currentStepIndex].cycle !== 'start') {
-          cyclerState.currentStepIndex++;
+        cycler.currentStepIndex = 0;
+        while (cycler.currentStepIndex < cycler.steps.length && 
+               cycler.steps[cycler.currentStepIndex].cycle !== 'start') {
+          cycler.currentStepIndex++;
         }
-        cyclerState.currentStepIndex++; // Move past cycle start
+        cycler.currentStepIndex++; // Move past cycle start
         continue;
       } else {
         // All cycles completed
-        console.log('All cycles completed');
-        stopCycler();
+        cyclerLog.info('All cycles completed', { channel: cycler.channel });
+        stopCycler(cycler);
         return;
       }
     }
     
     if (nextStep.cycle === 'start') {
-      cyclerState.currentStepIndex++;
+      cycler.currentStepIndex++;
       continue;
     }
     
     // Valid step found
-    cyclerState.currentStep = nextStep;
-    console.log(`Starting step ${cyclerState.currentStepIndex}: ${nextStep.mode}`);
-    console.log(`Step definition:`, JSON.stringify(nextStep, null, 2));
+    cycler.currentStep = nextStep;
+    cyclerLog.debug('Starting step', { channel: cycler.channel, step: cycler.currentStepIndex, definition: nextStep });
     
     // Execute the new step
-    executeCurrentStep();
+    executeCurrentStep(cycler);
+    writeCheckpoint(cycler);
     return;
   }
   
   // No more steps
-  console.log('Cycler sequence completed');
-  stopCycler();
+  cyclerLog.info('Cycler sequence completed', { channel: cycler.channel });
+  stopCycler(cycler);
 }
 
 // Start cycler
-function startCycler(channel, steps, cycles = 0, enableLogging = true, testMetadata = {}) {
-  if (cyclerState.isRunning) {
-    throw new Error('Cycler is already running');
+// adaptiveRate: true (default policy) or policy overrides (see sample_rate.js) adapt the streaming
+// rate to the step state; null uses CYCLER_ADAPTIVE_RATE, false keeps the channel's fixed rate
+function startCycler(channel, steps, cycles = 0, enableLogging = true, testMetadata = {}, archiveOnStop = true, sink = 'sqlite', adaptiveRate = null) {
+  channel = Number(channel);
+  if (!CYCLER_CHANNELS.includes(channel)) {
+    throw new Error(`Invalid cycler channel ${channel} (expected one of: ${CYCLER_CHANNELS.join(', ')})`);
+  }
+  const existing = cyclers.get(channel);
+  if (existing && existing.isRunning) {
+    throw new Error(`Cycler is already running on channel ${channel}`);
+  }
+  if (!CYCLER_SINKS.includes(sink)) {
+    throw new Error(`Unknown cycler sink '${sink}' (expected one of: ${CYCLER_SINKS.join(', ')})`);
   }
   
   // Validate inputs
   validateCyclerSteps(steps);
-  
-  // Initialize state
-  cyclerState.isRunning = true;
-  cyclerState.isPaused = false;
-  cyclerState.channel = channel;
-  cyclerState.steps = steps;
-  cyclerState.totalCycles = cycles;
-  cyclerState.currentCycle = 1;
-  cyclerState.currentStepIndex = 0;
-  cyclerState.startTime = Date.now();
-  cyclerState.stepStartTime = Date.now();
-  cyclerState.lastMeasurementTime = null;
+  if (adaptiveRate === null || adaptiveRate === undefined) adaptiveRate = ADAPTIVE_RATE_DEFAULT;
+  const sampleRate = adaptiveRate
+    ? new AdaptiveSampleRate(adaptiveRate === true ? {} : adaptiveRate, smuState.channels[channel].sampleRate)
+    : null;
+  
+  // Fresh state for this channel; the previous (stopped) test on it is replaced
+  const cycler = createCyclerState(channel);
+  cyclers.set(channel, cycler);
+  cycler.isRunning = true;
+  cycler.isPaused = false;
+  cycler.steps = steps;
+  cycler.totalCycles = cycles;
+  cycler.currentCycle = 1;
+  cycler.currentStepIndex = 0;
+  cycler.startTime = cyclerNow(cycler);
+  cycler.stepStartTime = cycler.startTime;
+  cycler.lastMeasurementTime = null;
   
   // Reset counters
-  cyclerState.totalAh = 0;
-  cyclerState.stepAh = 0;
-  cyclerState.cycleAh = 0;
-  cyclerState.lastCurrent = 0;
-  cyclerState.stepData = [];
+  cycler.totalAh = 0;
+  cycler.stepAh = 0;
+  cycler.cycleAh = 0;
+  cycler.lastCurrent = 0;
+  cycler.stepStats.reset();
+  cycler.archiveOnStop = archiveOnStop;
+  cycler.sink = sink;
+  cycler.testId = null;
+  cycler.sampleRate = sampleRate;
   
   // Initialize logging
   if (enableLogging) {
-    cyclerState.cyclerLogFile = true;
-    initializeCyclerLogging(testMetadata);
+    cycler.cyclerLogFile = true;
+    initializeCyclerLogging(cycler, testMetadata);
   }
   
   // Find first actual step (skip cycle start)
-  while (cyclerState.currentStepIndex < steps.length && 
-         steps[cyclerState.currentStepIndex].cycle === 'start') {
-    cyclerState.currentStepIndex++;
+  while (cycler.currentStepIndex < steps.length && 
+         steps[cycler.currentStepIndex].cycle === 'start') {
+    cycler.currentStepIndex++;
   }
   
-  if (cyclerState.currentStepIndex >= steps.length) {
+  if (cycler.currentStepIndex >= steps.length) {
     throw new Error('No valid steps found in cycle definition');
   }
   
-  cyclerState.currentStep = steps[cyclerState.currentStepIndex];
+  cycler.currentStep = steps[cycler.currentStepIndex];
   
-  console.log(`Cycler started on channel ${channel}, ${cycles || 'infinite'} cycles`);
-  console.log(`Found ${steps.length} total steps`);
-  console.log(`All steps:`, JSON.stringify(steps, null, 2));
-  console.log(`Starting at step index: ${cyclerState.currentStepIndex}`);
-  console.log(`Current step:`, cyclerState.currentStep);
-  console.log(`First step: ${cyclerState.currentStep ? cyclerState.currentStep.mode : 'UNDEFINED'}`);
+  cyclerLog.info('Cycler started', {
+    channel: channel, cycles: cycles || 'infinite', steps: steps.length,
+    firstStep: cycler.currentStepIndex, mode: cycler.currentStep.mode, testId: cycler.testId
+  });
+  cyclerLog.debug('Step definition', { channel: channel, steps: steps });
   
   // Execute first step first to set up SMU mode
-  executeCurrentStep();
+  executeCurrentStep(cycler);
+  startCheckpoints(cycler);
   
   // Then start data streaming after SMU is configured
   setTimeout(() => {
     start_streaming(channel);
-    console.log(`Started data streaming on channel ${channel}`);
+    cyclerLog.debug('Started data streaming', { channel: channel });
   }, 1000);
+  
+  return cycler;
 }
 
-// Pause cycler
-function pauseCycler() {
-  if (!cyclerState.isRunning) {
-    throw new Error('Cycler is not running');
+// ----------------------------------------------------------------------------
+// Checkpoints and crash recovery
+// ----------------------------------------------------------------------------
+
+function checkpointFile(testId) {
+  return path.join(BATTERY_DIR, `${testId}.checkpoint.json`);
+}
+
+// Everything needed to resume the current step: position, clocks, integrators and step statistics.
+// outputOff marks a graceful shutdown (the channel was disabled, so no charge flowed while down).
+function cyclerCheckpoint(cycler, outputOff = false) {
+  return {
+    version: 1,
+    savedAt: Date.now(),
+    outputOff: outputOff,
+    testId: cycler.testId,
+    channel: cycler.channel,
+    sink: cycler.sink,
+    archiveOnStop: cycler.archiveOnStop,
+    steps: cycler.steps,
+    totalCycles: cycler.totalCycles,
+    currentCycle: cycler.currentCycle,
+    currentStepIndex: cycler.currentStepIndex,
+    isPaused: cycler.isPaused,
+    startTime: cycler.startTime,
+    stepStartTime: cycler.stepStartTime,
+    lastMeasurementTime: cycler.lastMeasurementTime,
+    lastCurrent: cycler.lastCurrent,
+    totalAh: cycler.totalAh,
+    stepAh: cycler.stepAh,
+    cycleAh: cycler.cycleAh,
+    stepStats: cycler.stepStats.toJSON(),
+    adaptiveRate: cycler.sampleRate
+      ? { policy: cycler.sampleRate.policy, initialRate: cycler.sampleRate.initialRate }
+      : null
+  };
+}
+
+// Atomic (write + rename) so a crash mid-write leaves the previous checkpoint intact
+function writeCheckpoint(cycler, outputOff = false) {
+  if (!cycler.testId || !cycler.isRunning) return;  // Unlogged tests have no store to resume into
+  try {
+    writeFileAtomic(checkpointFile(cycler.testId), JSON.stringify(cyclerCheckpoint(cycler, outputOff)));
+    cycler.lastCheckpoint = Date.now();
+  } catch (error) {
+    cyclerLog.error('Checkpoint write error', { channel: cycler.channel, error: error });
   }
-  cyclerState.isPaused = true;
-  console.log('Cycler paused');
 }
 
-// Resume cycler
-function resumeCycler() {
-  if (!cyclerState.isRunning || !cyclerState.isPaused) {
-    throw new Error('Cycler is not paused');
+function startCheckpoints(cycler) {
+  writeCheckpoint(cycler);
+  cycler.checkpointTimer = setInterval(() => writeCheckpoint(cycler), CHECKPOINT_INTERVAL_MS);
+  if (cycler.checkpointTimer.unref) cycler.checkpointTimer.unref();
+}
+
+// Checkpoint on an interrupted stop (shutdown) so the test can be recovered; delete it otherwise
+function finishCheckpoints(cycler, status) {
+  clearInterval(cycler.checkpointTimer);
+  cycler.checkpointTimer = null;
+  if (!cycler.testId) return;
+  if (status === 'interrupted') {
+    writeCheckpoint(cycler, true);
+  } else {
+    fs.rmSync(checkpointFile(cycler.testId), { force: true });
   }
-  cyclerState.isPaused = false;
-  console.log('Cycler resumed');
 }
 
-// Stop cycler
-function stopCycler() {
-  
-  // Stop data streaming
-  if (cyclerState.channel) {
+function readCheckpoints() {
+  if (!fs.existsSync(BATTERY_DIR)) return [];
+  const checkpoints = [];
+  for (const name of fs.readdirSync(BATTERY_DIR)) {
+    if (!name.endsWith('.checkpoint.json')) continue;
     try {
-      stop_streaming(cyclerState.channel);
-      console.log(`Stopped data streaming on channel ${cyclerState.channel}`);
-      disable_channel(cyclerState.channel);
+      checkpoints.push(JSON.parse(fs.readFileSync(path.join(BATTERY_DIR, name), 'utf8')));
     } catch (error) {
-      console.error('Error stopping streaming/disabling channel during cycler stop:', error);
+      cyclerLog.warn('Unreadable checkpoint', { file: name, error: error });
     }
   }
+  return checkpoints;
+}
+
+// Rebuild a cycler from its checkpoint and reopen its store for appending; the current
+// step resumes with its elapsed time, integrators and statistics, without reading the log
+function recoverCycler(checkpoint) {
+  const channel = Number(checkpoint.channel);
+  const existing = cyclers.get(channel);
+  if (existing && existing.isRunning) {
+    throw new Error(`Cycler is already running on channel ${channel}`);
+  }
+  const store = resolveTestStore(checkpoint.testId);
+  if (!store) {
+    throw new Error(`Log store for test '${checkpoint.testId}' not found`);
+  }
+  
+  const cycler = createCyclerState(channel);
+  cycler.steps = checkpoint.steps;
+  cycler.totalCycles = checkpoint.totalCycles;
+  cycler.currentCycle = checkpoint.currentCycle;
+  cycler.currentStepIndex = checkpoint.currentStepIndex;
+  cycler.currentStep = checkpoint.steps[checkpoint.currentStepIndex];
+  cycler.startTime = checkpoint.startTime;
+  cycler.stepStartTime = checkpoint.stepStartTime;
+  // After a crash the SMU kept sourcing, so the first new sample integrates across the gap;
+  // after a graceful shutdown the channel was off and the gap is skipped
+  cycler.lastMeasurementTime = checkpoint.outputOff ? null : checkpoint.lastMeasurementTime;
+  cycler.lastCurrent = checkpoint.lastCurrent;
+  cycler.totalAh = checkpoint.totalAh;
+  cycler.stepAh = checkpoint.stepAh;
+  cycler.cycleAh = checkpoint.cycleAh;
+  cycler.stepStats = RunningStats.fromJSON(checkpoint.stepStats);
+  cycler.archiveOnStop = checkpoint.archiveOnStop;
+  if (checkpoint.adaptiveRate) {
+    cycler.sampleRate = new AdaptiveSampleRate(checkpoint.adaptiveRate.policy, checkpoint.adaptiveRate.initialRate);
+  }
+  cycler.sink = store.sink;
+  cycler.testId = store.testId;
+  cycler.cyclerLogFile = store.path;
+  
+  const resumed = { test_status: 'running', recovered_at: new Date().toISOString() };
+  if (store.sink === 'columnar') {
+    cycler.cyclerSink = new ColumnarWriter(store.path, resumed, { append: true, metadataIntervalMs: CHECKPOINT_INTERVAL_MS });
+  } else {
+    cycler.cyclerDb = openDatabase(sqlite3, store.path);
+    for (const [key, value] of Object.entries(resumed)) {
+      cycler.cyclerDb.run('INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)', key, value);
+    }
+    cycler.cyclerSink = new SqliteWriteQueue(cycler.cyclerDb, CYCLER_INSERT_SQL, { name: 'Cycler' });
+  }
+  
+  cyclers.set(channel, cycler);
+  cycler.isRunning = true;
+  cycler.isPaused = !!checkpoint.isPaused;
+  
+  cyclerLog.info('Cycler recovered', {
+    channel: channel, testId: cycler.testId, cycle: cycler.currentCycle, step: cycler.currentStepIndex,
+    stepTime: (cyclerNow(cycler) - cycler.stepStartTime) / 1000, totalAh: cycler.totalAh,
+    downtime_s: (Date.now() - checkpoint.savedAt) / 1000
+  });
   
-  // Close database connections
-  if (cyclerState.cyclerDataStmt) {
-    cyclerState.cyclerDataStmt.finalize();
-    cyclerState.cyclerDataStmt = null;
+  executeCurrentStep(cycler);
+  startCheckpoints(cycler);
+  setTimeout(() => start_streaming(channel), 1000);
+  return cycler;
+}
+
+// CYCLER_AUTO_RECOVER=1 resumes every checkpointed test once the serial port first opens
+let autoRecoverDone = false;
+function autoRecoverCyclers() {
+  if (autoRecoverDone || !['1', 'true'].includes(process.env.CYCLER_AUTO_RECOVER)) return;
+  autoRecoverDone = true;
+  for (const checkpoint of readCheckpoints()) {
+    try {
+      recoverCycler(checkpoint);
+    } catch (error) {
+      cyclerLog.error('Automatic recovery failed', { testId: checkpoint.testId, error: error });
+    }
   }
+}
+
+// Stop cycler; callback runs once the database is flushed and closed
+function stopCycler(cycler, status = 'completed', callback = () => {}) {
+  finishCheckpoints(cycler, status);
   
-  if (cyclerState.cyclerDb) {
-    // Update metadata with end time and completion status
+  // Stop data streaming
+  if (cycler.channel) {
     try {
-      cyclerState.cyclerDb.run('INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)', 
-        'end_time', new Date().toISOString());
-      cyclerState.cyclerDb.run('INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)', 
-        'test_status', 'completed');
-      cyclerState.cyclerDb.run('INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)', 
-        'final_cycle_count', cyclerState.currentCycle.toString());
-      cyclerState.cyclerDb.run('INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)', 
-        'total_test_time_s', cyclerState.startTime ? ((Date.now() - cyclerState.startTime) / 1000).toString() : '0');
+      stop_streaming(cycler.channel);
+      cyclerLog.debug('Stopped data streaming', { channel: cycler.channel });
+      disable_channel(cycler.channel);
+      // Put back the rate the channel streamed at before the test adapted it
+      if (cycler.sampleRate && cycler.sampleRate.initialRate) {
+        set_sample_rate(cycler.channel, cycler.sampleRate.initialRate);
+      }
     } catch (error) {
-      console.error('Error updating final metadata:', error);
+      cyclerLog.error('Error stopping streaming/disabling channel during cycler stop', { channel: cycler.channel, error: error });
     }
+  }
+  
+  const finalMetadata = {
+    end_time: new Date().toISOString(),
+    test_status: status,
+    final_cycle_count: cycler.currentCycle.toString(),
+    total_test_time_s: cycler.startTime ? ((cyclerNow(cycler) - cycler.startTime) / 1000).toString() : '0'
+  };
+  
+  // Flush queued rows, then finalize metadata and close the database
+  if (cycler.cyclerDb) {
+    const db = cycler.cyclerDb;
+    const queue = cycler.cyclerSink;
+    const dbFile = cycler.cyclerLogFile;
+    const archive = cycler.archiveOnStop && status !== 'interrupted';  // Interrupted tests may be recovered
+    
+    const closeDb = () => {
+      try {
+        for (const [key, value] of Object.entries(finalMetadata)) {
+          db.run('INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)', key, value);
+        }
+      } catch (error) {
+        cyclerLog.error('Error updating final metadata', { channel: cycler.channel, error: error });
+      }
+      
+      db.close((closeErr) => {
+        if (closeErr || !archive || typeof dbFile !== 'string') return callback(closeErr);
+        writeColumnarArchive(dbFile, (err, archiveDir) => {
+          if (err) {
+            cyclerLog.error('Columnar archive error', { error: err });
+          } else {
+            cyclerLog.info('Columnar archive written', { archive: archiveDir });
+          }
+          callback(null);
+        });
+      });
+    };
     
-    cyclerState.cyclerDb.close();
-    cyclerState.cyclerDb = null;
+    if (queue) {
+      queue.close(closeDb);
+    } else {
+      closeDb();
+    }
+    cycler.cyclerDb = null;
+    cycler.cyclerSink = null;
+  } else if (cycler.cyclerSink) {
+    // Columnar sink: flush the last chunk and record the final metadata in metadata.json
+    const writer = cycler.cyclerSink;
+    cycler.cyclerSink = null;
+    writer.close(finalMetadata, (err) => {
+      if (err) cyclerLog.error('Columnar sink close error', { error: err });
+      callback(err);
+    });
+  } else {
+    process.nextTick(callback);
   }
   
-  cyclerState.isRunning = false;
-  cyclerState.isPaused = false;
+  cycler.isRunning = false;
+  cycler.isPaused = false;
   
-  console.log('Cycler stopped and database closed');
-  io.emit('cycler_status', { status: 'stopped' });
+  cyclerLog.info('Cycler stopped', { channel: cycler.channel, status: status });
+  io.emit('cycler_status', { channel: cycler.channel, status: 'stopped' });
 }
 
 // Pause/Resume cycler
-function pauseCycler() {
-  cyclerState.isPaused = true;
-  console.log('Cycler paused');
-  io.emit('cycler_status', { status: 'paused' });
+function pauseCycler(cycler) {
+  cycler.isPaused = true;
+  if (cycler.cyclerSink) cycler.cyclerSink.flush();
+  writeCheckpoint(cycler);
+  cyclerLog.info('Cycler paused', { channel: cycler.channel });
+  io.emit('cycler_status', { channel: cycler.channel, status: 'paused' });
 }
 
-function resumeCycler() {
-  cyclerState.isPaused = false;
-  console.log('Cycler resumed');
-  io.emit('cycler_status', { status: 'running' });
+function resumeCycler(cycler) {
+  cycler.isPaused = false;
+  writeCheckpoint(cycler);
+  cyclerLog.info('Cycler resumed', { channel: cycler.channel });
+  io.emit('cycler_status', { channel: cycler.channel, status: 'running' });
 }
 
 // ============================================================================
 // BATTERY CYCLER REST API ENDPOINTS
 // ============================================================================
 
+// Status snapshot of one cycler
+function cyclerStatus(cycler) {
+  const now = cyclerNow(cycler);
+  const stepTime = cycler.stepStartTime ? 
+    (now - cycler.stepStartTime) / 1000 : 0;
+  const totalTime = cycler.startTime ? 
+    (now - cycler.startTime) / 1000 : 0;
+  
+  return {
+    isRunning: cycler.isRunning,
+    isPaused: cycler.isPaused,
+    channel: cycler.channel,
+    currentCycle: cycler.currentCycle,
+    totalCycles: cycler.totalCycles,
+    currentStepIndex: cycler.currentStepIndex,
+    currentStep: cycler.currentStep,
+    stepTime: stepTime,
+    totalTime: totalTime,
+    totalAh: cycler.totalAh,
+    stepAh: cycler.stepAh,
+    cycleAh: cycler.cycleAh,
+    logFile: cycler.cyclerLogFile,
+    testId: cycler.testId,
+    sink: cycler.sink,
+    totalSteps: cycler.steps.length,
+    writeQueue: cycler.cyclerSink ? cycler.cyclerSink.stats() : null,
+    lastCheckpoint: cycler.lastCheckpoint ? new Date(cycler.lastCheckpoint).toISOString() : null,
+    sampleRate: cycler.sampleRate ? cycler.sampleRate.toJSON() : null
+  };
+}
+
+// Cycler addressed by a control request (body or query `channel`); sends a 400 and
+// returns null when there is no such cycler or the channel is ambiguous
+function cyclerForRequest(req, res) {
+  const channel = (req.body && req.body.channel !== undefined) ? req.body.channel : req.query.channel;
+  const cycler = resolveCycler(channel);
+  if (!cycler) {
+    const error = channel !== undefined
+      ? `No cycler on channel ${channel}`
+      : (cyclers.size ? 'channel is required when more than one cycler exists' : 'Cycler is not running');
+    res.status(400).json({ error: error });
+  }
+  return cycler;
+}
+
 // Start cycler
 app.post('/cycler/start', (req, res) => {
   try {
-    const { channel, steps, cycles, enableLogging, metadata } = req.body;
+    const { channel, steps, cycles, enableLogging, metadata, archive, sink, adaptiveRate } = req.body;
     
     if (!channel || !steps) {
       return res.status(400).json({ error: 'Channel and steps are required' });
     }
+    if (sink && !CYCLER_SINKS.includes(sink)) {
+      return res.status(400).json({ error: `sink must be one of: ${CYCLER_SINKS.join(', ')}` });
+    }
+    const existing = cyclers.get(Number(channel));
+    if (existing && existing.isRunning) {
+      return res.status(409).json({ error: `Cycler is already running on channel ${channel}` });
+    }
+    
+    if (adaptiveRate !== undefined && adaptiveRate !== null && typeof adaptiveRate !== 'boolean' &&
+        (typeof adaptiveRate !== 'object' || Array.isArray(adaptiveRate))) {
+      return res.status(400).json({ error: 'adaptiveRate must be true, false or an object of policy overrides' });
+    }
     
-    startCycler(channel, steps, cycles || 0, enableLogging !== false, metadata || {});
+    const cycler = startCycler(channel, steps, cycles || 0, enableLogging !== false, metadata || {}, archive !== false, sink || 'sqlite', adaptiveRate);
     
     res.json({
       success: true,
       message: 'Cycler started successfully',
-      channel: channel,
+      channel: cycler.channel,
       totalSteps: steps.length,
-      cycles: cycles || 'infinite'
+      cycles: cycles || 'infinite',
+      sink: cycler.sink,
+      testId: cycler.testId,
+      sampleRate: cycler.sampleRate ? cycler.sampleRate.toJSON() : null
     });
     
   } catch (error) {
@@ -2387,8 +3242,16 @@ app.post('/cycler/start', (req, res) => {
 // Stop cycler
 app.post('/cycler/stop', (req, res) => {
   try {
-    stopCycler();
-    res.json({ success: true, message: 'Cycler stopped' });
+    if (cyclers.size === 0) {
+      return res.json({ success: true, message: 'Cycler is not running' });
+    }
+    const cycler = cyclerForRequest(req, res);
+    if (!cycler) return;
+    if (!cycler.isRunning) {
+      return res.json({ success: true, channel: cycler.channel, message: 'Cycler is not running' });
+    }
+    stopCycler(cycler);
+    res.json({ success: true, channel: cycler.channel, message: 'Cycler stopped' });
   } catch (error) {
     console.error('Error stopping cycler:', error);
     res.status(500).json({ error: error.message });
@@ -2398,11 +3261,13 @@ app.post('/cycler/stop', (req, res) => {
 // Pause cycler
 app.post('/cycler/pause', (req, res) => {
   try {
-    if (!cyclerState.isRunning) {
+    const cycler = cyclerForRequest(req, res);
+    if (!cycler) return;
+    if (!cycler.isRunning) {
       return res.status(400).json({ error: 'Cycler is not running' });
     }
-    pauseCycler();
-    res.json({ success: true, message: 'Cycler paused' });
+    pauseCycler(cycler);
+    res.json({ success: true, channel: cycler.channel, message: 'Cycler paused' });
   } catch (error) {
     console.error('Error pausing cycler:', error);
     res.status(500).json({ error: error.message });
@@ -2412,41 +3277,82 @@ app.post('/cycler/pause', (req, res) => {
 // Resume cycler
 app.post('/cycler/resume', (req, res) => {
   try {
-    if (!cyclerState.isRunning || !cyclerState.isPaused) {
+    const cycler = cyclerForRequest(req, res);
+    if (!cycler) return;
+    if (!cycler.isRunning || !cycler.isPaused) {
       return res.status(400).json({ error: 'Cycler is not paused' });
     }
-    resumeCycler();
-    res.json({ success: true, message: 'Cycler resumed' });
+    resumeCycler(cycler);
+    res.json({ success: true, channel: cycler.channel, message: 'Cycler resumed' });
   } catch (error) {
     console.error('Error resuming cycler:', error);
     res.status(500).json({ error: error.message });
   }
 });
 
-// Get cycler status
+// Tests left running by a crash or shutdown that POST /cycler/recover can resume
+app.get('/cycler/checkpoints', (req, res) => {
+  try {
+    const checkpoints = readCheckpoints().map(c => ({
+      testId: c.testId,
+      channel: c.channel,
+      sink: c.sink,
+      savedAt: new Date(c.savedAt).toISOString(),
+      outputOff: c.outputOff,
+      currentCycle: c.currentCycle,
+      totalCycles: c.totalCycles,
+      currentStepIndex: c.currentStepIndex,
+      totalSteps: c.steps.length,
+      totalAh: c.totalAh,
+      running: !!(cyclers.get(Number(c.channel)) || {}).isRunning
+    }));
+    res.json({ checkpoints: checkpoints });
+  } catch (error) {
+    console.error('Error listing checkpoints:', error);
+    res.status(500).json({ error: error.message });
+  }
+});
+
+// Resume checkpointed tests: body { channel?, testId? } selects one, otherwise all are recovered
+app.post('/cycler/recover', (req, res) => {
+  try {
+    if (!serialPort || !serialPort.isOpen) {
+      return res.status(503).json({ error: 'Serial port is not open' });
+    }
+    const { channel, testId } = req.body || {};
+    const matching = readCheckpoints().filter(c =>
+      (channel === undefined || Number(c.channel) === Number(channel)) &&
+      (testId === undefined || c.testId === testId));
+    if (matching.length === 0) {
+      return res.status(404).json({ error: 'No matching checkpoint' });
+    }
+    const busy = matching.find(c => (cyclers.get(Number(c.channel)) || {}).isRunning);
+    if (busy) {
+      return res.status(409).json({ error: `Cycler is already running on channel ${busy.channel}` });
+    }
+    const recovered = matching.map(c => cyclerStatus(recoverCycler(c)));
+    res.json({ success: true, recovered: recovered });
+  } catch (error) {
+    console.error('Error recovering cycler:', error);
+    res.status(500).json({ error: error.message });
+  }
+});
+
+// Get cycler status: ?channel=N for one channel; without it, the only (or only running)
+// cycler, or an idle summary. `channels` always lists every cycler by channel.
 app.get('/cycler/status', (req, res) => {
   try {
-    const stepTime = cyclerState.stepStartTime ? 
-      (Date.now() - cyclerState.stepStartTime) / 1000 : 0;
-    const totalTime = cyclerState.startTime ? 
-      (Date.now() - cyclerState.startTime) / 1000 : 0;
+    const channels = {};
+    for (const [channel, cycler] of cyclers) channels[channel] = cyclerStatus(cycler);
     
-    res.json({
-      isRunning: cyclerState.isRunning,
-      isPaused: cyclerState.isPaused,
-      channel: cyclerState.channel,
-      currentCycle: cyclerState.currentCycle,
-      totalCycles: cyclerState.totalCycles,
-      currentStepIndex: cyclerState.currentStepIndex,
-      currentStep: cyclerState.currentStep,
-      stepTime: stepTime,
-      totalTime: totalTime,
-      totalAh: cyclerState.totalAh,
-      stepAh: cyclerState.stepAh,
-      cycleAh: cyclerState.cycleAh,
-      logFile: cyclerState.cyclerLogFile,
-      totalSteps: cyclerState.steps.length
-    });
+    if (req.query.channel !== undefined && !cyclers.has(Number(req.query.channel))) {
+      return res.json(Object.assign(cyclerStatus(createCyclerState(Number(req.query.channel))), { channels: channels }));
+    }
+    const cycler = resolveCycler(req.query.channel);
+    const status = cycler ? cyclerStatus(cycler) : cyclerStatus(createCyclerState(null));
+    if (!cycler) status.isRunning = [...cyclers.values()].some(c => c.isRunning);
+    status.channels = channels;
+    res.json(status);
   } catch (error) {
     console.error('Error getting cycler status:', error);
     res.status(500).json({ error: error.message });
@@ -2476,17 +3382,177 @@ app.post('/cycler/validate', (req, res) => {
   }
 });
 
+// ============================================================================
+// CSV EXPORT (derived on demand from the primary sink)
+// ============================================================================
+
+const EXPORT_CSV_HEADER = 'Timestamp,Cycle,Step,Step_Type,Step_Time_s,Total_Time_s,Voltage_V,Current_A,Step_Ah,Cycle_Ah,Total_Ah';
+const EXPORT_CHUNK_ROWS = 5000;
+
+function csvValue(v) {
+  return v === null || v === undefined || Number.isNaN(v) ? '' : String(v);
+}
+
+// Locate a test's primary store: battery_test_<timestamp>(.db|.columns)
+function resolveTestStore(testId) {
+  const id = String(testId).replace(/\.(db|columns|csv)$/, '');
+  if (!/^[\w.-]+$/.test(id) || id.includes('..')) return null;
+  const dbFile = path.join(BATTERY_DIR, `${id}.db`);
+  if (fs.existsSync(dbFile)) return { testId: id, sink: 'sqlite', path: dbFile };
+  const columnsDir = path.join(BATTERY_DIR, `${id}.columns`);
+  if (fs.existsSync(path.join(columnsDir, 'metadata.json'))) return { testId: id, sink: 'columnar', path: columnsDir };
+  return null;
+}
+
+// Pull CSV text chunks from nextChunk(cb(err, text | null)) and write them with backpressure
+function streamChunks(res, nextChunk, done = () => {}) {
+  let aborted = false;
+  res.on('close', () => { aborted = true; });
+  const pump = () => {
+    if (aborted) return done();
+    nextChunk((err, text) => {
+      if (err) {
+        console.error('CSV export error:', err);
+        res.end();
+        return done();
+      }
+      if (text === null) {
+        res.end();
+        return done();
+      }
+      if (res.write(text)) setImmediate(pump);
+      else res.once('drain', pump);
+    });
+  };
+  pump();
+}
+
+// Keyset-paged read of the data table (the database may still be written by a running test)
+function streamSqliteCsv(store, res) {
+  const db = new sqlite3.Database(store.path, sqlite3.OPEN_READONLY, (openErr) => {
+    if (openErr) return res.status(500).json({ error: openErr.message });
+    res.setHeader('Content-Type', 'text/csv');
+    res.setHeader('Content-Disposition', `attachment; filename="${store.testId}.csv"`);
+    res.write(EXPORT_CSV_HEADER + '\n');
+    
+    let lastId = 0;
+    streamChunks(res, (cb) => {
+      db.all(`
+        SELECT id, timestamp, cycle, step, step_type, step_time_s, total_time_s,
+               voltage_v, current_a, step_ah, cycle_ah, total_ah
+        FROM data WHERE id > ? ORDER BY id LIMIT ?
+      `, [lastId, EXPORT_CHUNK_ROWS], (err, rows) => {
+        if (err) return cb(err);
+        if (rows.length === 0) return cb(null, null);
+        lastId = rows[rows.length - 1].id;
+        cb(null, rows.map(r => [
+          r.timestamp, r.cycle, r.step, r.step_type, r.step_time_s, r.total_time_s,
+          r.voltage_v, r.current_a, r.step_ah, r.cycle_ah, r.total_ah
+        ].map(csvValue).join(',')).join('\n') + '\n');
+      });
+    }, () => db.close());
+  });
+}
+
+// Chunked read of the column files. Step/total time and cycle/total Ah are not stored
+// columnar; they are rebuilt exactly as the cycler computes them: a step starts at the
+// last sample of the previous step (or the test start_time) and the Ah counters are
+// sums of completed steps' final step_ah plus the current step_ah.
+function streamColumnarCsv(store, res) {
+  let metadata;
+  try {
+    metadata = JSON.parse(fs.readFileSync(path.join(store.path, 'metadata.json'), 'utf8'));
+  } catch (err) {
+    return res.status(500).json({ error: err.message });
+  }
+  res.setHeader('Content-Type', 'text/csv');
+  res.setHeader('Content-Disposition', `attachment; filename="${store.testId}.csv"`);
+  res.write(EXPORT_CSV_HEADER + '\n');
+  
+  const rows = metadata.rows;
+  const stepTypes = metadata.step_types || ARCHIVE_STEP_TYPES;
+  const testStart = Date.parse(metadata.test && metadata.test.start_time);
+  let row = 0;
+  let prev = null;   // { cycle, step, time, stepAh }
+  let stepStart = NaN, cycleBase = 0, totalBase = 0;
+  
+  streamChunks(res, (cb) => {
+    if (row >= rows) return cb(null, null);
+    const end = Math.min(rows, row + EXPORT_CHUNK_ROWS);
+    let c;
+    try {
+      c = readColumns(store.path, metadata, row, end);
+    } catch (err) {
+      return cb(err);
+    }
+    const lines = new Array(end - row);
+    for (let i = 0; i < end - row; i++) {
+      const t = c.time_ms[i], cycle = c.cycle[i], step = c.step[i];
+      if (!prev) {
+        stepStart = Number.isNaN(testStart) ? t : testStart;
+      } else if (prev.cycle !== cycle || prev.step !== step) {
+        stepStart = prev.time;
+        totalBase += prev.stepAh;
+        cycleBase = prev.cycle === cycle ? cycleBase + prev.stepAh : 0;
+      }
+      const stepAh = c.step_ah[i];
+      lines[i] = [
+        new Date(t).toISOString(), cycle, step, stepTypes[c.step_type[i]] || 'unknown',
+        (t - stepStart) / 1000, (t - (Number.isNaN(testStart) ? t : testStart)) / 1000,
+        c.voltage_v[i], c.current_a[i], stepAh, cycleBase + stepAh, totalBase + stepAh
+      ].map(csvValue).join(',');
+      prev = { cycle: cycle, step: step, time: t, stepAh: stepAh };
+    }
+    row = end;
+    cb(null, lines.join('\n') + '\n');
+  });
+}
+
+// List cycler tests available for export
+app.get('/cycler/tests', (req, res) => {
+  try {
+    if (!fs.existsSync(BATTERY_DIR)) return res.json({ tests: [] });
+    const tests = new Map();
+    for (const name of fs.readdirSync(BATTERY_DIR)) {
+      const match = name.match(/^(battery_test_[\w.-]+?)\.(db|columns)$/);
+      if (!match) continue;
+      const entry = tests.get(match[1]) || { testId: match[1], sqlite: false, columnar: false };
+      if (match[2] === 'db') entry.sqlite = true;
+      else entry.columnar = true;
+      tests.set(match[1], entry);
+    }
+    res.json({
+      tests: [...tests.values()].sort((a, b) => a.testId.localeCompare(b.testId)),
+      current: [...cyclers.values()].filter(c => c.isRunning && c.testId).map(c => c.testId)
+    });
+  } catch (error) {
+    console.error('Error listing cycler tests:', error);
+    res.status(500).json({ error: error.message });
+  }
+});
+
+// Stream a test as CSV (legacy cycler CSV columns) from its SQLite or columnar store
+app.get('/cycler/export/:testId', (req, res) => {
+  const store = resolveTestStore(req.params.testId);
+  if (!store) {
+    return res.status(404).json({ error: `Test '${req.params.testId}' not found` });
+  }
+  if (store.sink === 'sqlite') streamSqliteCsv(store, res);
+  else streamColumnarCsv(store, res);
+});
+
 // Array-based cycler analysis endpoints
 app.get('/cycler/step_analysis', (req, res) => {
   try {
-    if (!cyclerState.isRunning) {
+    const cycler = resolveCycler(req.query.channel);
+    if (!cycler || !cycler.isRunning) {
       return res.json({ 
         error: 'Cycler not running',
         analysis: null 
       });
     }
     
-    const channel = cyclerState.channel;
+    const channel = cycler.channel;
     const dataArray = channel === 1 ? ch1 : ch2;
     
     if (dataArray.length === 0) {
@@ -2496,19 +3562,19 @@ app.get('/cycler/step_analysis', (req, res) => {
       });
     }
     
-    // Get analysis for current step
-    const stepAnalysis = performArrayAnalysis(dataArray, cyclerState.stepStartTime);
+    // Running statistics for the current step
+    const stepAnalysis = cycler.stepStats.analysis();
     
     res.json({
       channel: channel,
-      current_cycle: cyclerState.currentCycle,
-      current_step: cyclerState.currentStepIndex,
-      step_type: cyclerState.currentStep?.mode || 'unknown',
-      step_time_s: (Date.now() - cyclerState.stepStartTime) / 1000,
+      current_cycle: cycler.currentCycle,
+      current_step: cycler.currentStepIndex,
+      step_type: cycler.currentStep?.mode || 'unknown',
+      step_time_s: (cyclerNow(cycler) - cycler.stepStartTime) / 1000,
       step_analysis: stepAnalysis,
-      step_ah: cyclerState.stepAh,
-      cycle_ah: cyclerState.cycleAh,
-      total_ah: cyclerState.totalAh
+      step_ah: cycler.stepAh,
+      cycle_ah: cycler.cycleAh,
+      total_ah: cycler.totalAh
     });
     
   } catch (error) {
@@ -2519,14 +3585,15 @@ app.get('/cycler/step_analysis', (req, res) => {
 
 app.get('/cycler/performance_metrics', (req, res) => {
   try {
-    if (!cyclerState.isRunning) {
+    const cycler = resolveCycler(req.query.channel);
+    if (!cycler || !cycler.isRunning) {
       return res.json({ 
         error: 'Cycler not running',
         metrics: null 
       });
     }
     
-    const channel = cyclerState.channel;
+    const channel = cycler.channel;
     const dataArray = channel === 1 ? ch1 : ch2;
     
     if (dataArray.length === 0) {
@@ -2536,11 +3603,12 @@ app.get('/cycler/performance_metrics', (req, res) => {
       });
     }
     
-    // Calculate performance metrics from entire run
-    const startTime = cyclerState.startTime;
-    const runData = dataArray.filter(point => point.time_ms >= startTime);
+    // Calculate performance metrics from entire run (retained part of the buffer)
+    const startTime = cycler.startTime;
+    const runStart = dataArray.lowerBound(startTime);
+    const runPoints = dataArray.length - runStart;
     
-    if (runData.length === 0) {
+    if (runPoints === 0) {
       return res.json({
         error: 'No run data available',
         metrics: null
@@ -2548,34 +3616,37 @@ app.get('/cycler/performance_metrics', (req, res) => {
     }
     
     // Calculate metrics
-    const totalRunTime = (Date.now() - startTime) / 1000; // seconds
-    const avgPower = runData.reduce((sum, point) => 
-      sum + (point.voltage_V * point.current_A), 0) / runData.length;
-    
-    const energyWh = runData.reduce((sum, point, index) => {
-      if (index === 0) return sum;
-      const prevPoint = runData[index - 1];
-      const deltaTime = (point.time_ms - prevPoint.time_ms) / (1000 * 3600); // hours
-      const avgPowerW = (point.voltage_V * point.current_A + 
-                        prevPoint.voltage_V * prevPoint.current_A) / 2;
-      return sum + (avgPowerW * deltaTime);
-    }, 0);
+    const totalRunTime = (cyclerNow(cycler) - startTime) / 1000; // seconds
+    let powerSum = 0;
+    let energyWh = 0;
+    let prevTime = 0, prevPower = 0;
+    for (let i = runStart; i < dataArray.length; i++) {
+      const time = dataArray.value('time_ms', i);
+      const power = dataArray.value('voltage_V', i) * dataArray.value('current_A', i);
+      powerSum += power;
+      if (i > runStart) {
+        energyWh += (power + prevPower) / 2 * (time - prevTime) / (1000 * 3600);
+      }
+      prevTime = time;
+      prevPower = power;
+    }
+    const avgPower = powerSum / runPoints;
     
     res.json({
       channel: channel,
       total_runtime_s: totalRunTime,
       total_runtime_h: totalRunTime / 3600,
-      current_cycle: cyclerState.currentCycle,
-      total_cycles_planned: cyclerState.totalCycles,
-      completion_percentage: cyclerState.totalCycles > 0 ? 
-        (cyclerState.currentCycle / cyclerState.totalCycles) * 100 : 0,
+      current_cycle: cycler.currentCycle,
+      total_cycles_planned: cycler.totalCycles,
+      completion_percentage: cycler.totalCycles > 0 ? 
+        (cycler.currentCycle / cycler.totalCycles) * 100 : 0,
       metrics: {
-        total_ah: cyclerState.totalAh,
-        cycle_ah: cyclerState.cycleAh,
+        total_ah: cycler.totalAh,
+        cycle_ah: cycler.cycleAh,
         avg_power_w: avgPower,
         total_energy_wh: energyWh,
-        data_points_collected: runData.length,
-        avg_data_rate: runData.length / totalRunTime // points per second
+        data_points_collected: runPoints,
+        avg_data_rate: runPoints / totalRunTime // points per second
       }
     });
     
@@ -2588,15 +3659,16 @@ app.get('/cycler/performance_metrics', (req, res) => {
 // Force manual array-based processing (for testing/debugging)
 app.post('/cycler/process_arrays', (req, res) => {
   try {
-    if (!cyclerState.isRunning) {
+    const cycler = resolveCycler(req.body && req.body.channel);
+    if (!cycler || !cycler.isRunning) {
       return res.json({ 
         error: 'Cycler not running',
         processed: false 
       });
     }
     
-    const channel = cyclerState.channel;
-    processArrayBasedCycling(channel);
+    const channel = cycler.channel;
+    processArrayBasedCycling(cycler);
     
     res.json({
       message: 'Array-based processing triggered',
@@ -2611,4 +3683,23 @@ app.post('/cycler/process_arrays', (req, res) => {
   }
 });
 
-console.log('Battery cycler functionality loaded successfully');
\ No newline at end of file
+console.log('Battery cycler functionality loaded successfully');
+// Flush batched SQLite writes before exiting (Ctrl-C, kill, crash)
+function shutdown(code) {
+  const running = [...cyclers.values()].filter(c => c.isRunning);
+  let remaining = running.length;
+  const finish = () => flushAllWriteQueues(() => process.exit(code));
+  if (remaining === 0) return finish();
+  for (const cycler of running) {
+    stopCycler(cycler, 'interrupted', () => {
+      if (--remaining === 0) finish();
+    });
+  }
+}
+
+process.on('SIGINT', () => shutdown(0));
+process.on('SIGTERM', () => shutdown(0));
+process.on('uncaughtException', (err) => {
+  console.error('Uncaught exception, flushing logs before exit:', err);
+  shutdown(1);
+});
@@ -7,9 +7,11 @@ created by the minismush battery cycler.
 
 Usage:
     python analyze_battery_data.py battery_test_*.db
+    python analyze_battery_data.py battery_test_*.columns   (columnar archive, needs numpy)
 
 Requirements:
     - Standard Python libraries (sqlite3, matplotlib, pandas optional)
+    - numpy for energy/efficiency metrics and columnar archives
 """
 
 import sqlite3
@@ -17,12 +19,45 @@ import sys
 import os
 from datetime import datetime
 
+# step_ah restarts at every step, so a step's capacity is its final row, not the sum of its rows
+STEP_CAPACITY_CTE = """
+WITH step_final AS (
+    SELECT cycle, step, step_ah
+    FROM data
+    WHERE id IN (SELECT MAX(id) FROM data GROUP BY cycle, step)
+),
+cycle_capacity AS (
+    SELECT
+        cycle,
+        SUM(CASE WHEN step_ah > 0 THEN step_ah ELSE 0 END) as charge_ah,
+        SUM(CASE WHEN step_ah < 0 THEN ABS(step_ah) ELSE 0 END) as discharge_ah
+    FROM step_final
+    GROUP BY cycle
+)
+"""
+
 def connect_database(db_path):
-    """Connect to SQLite database and return connection"""
+    """
+    Connect to SQLite database and return connection
+
+    A columnar archive directory is opened as a ColumnarArchive instead; the
+    analysis functions then summarize its memory-mapped columns with NumPy.
+    """
     if not os.path.exists(db_path):
         print(f"❌ Database file not found: {db_path}")
         return None
     
+    if os.path.isdir(db_path):
+        try:
+            from columnar_archive import ColumnarArchive
+            return ColumnarArchive(db_path)
+        except ImportError:
+            print("❌ Columnar archives require numpy (pip install numpy)")
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            print(f"❌ Archive read error: {e}")
+            return None
+    
     try:
         conn = sqlite3.connect(db_path)
         conn.row_factory = sqlite3.Row  # Enable column access by name
@@ -31,12 +66,27 @@ def connect_database(db_path):
         print(f"❌ Database connection error: {e}")
         return None
 
+def is_archive(conn):
+    """True if connect_database() returned a columnar archive rather than a SQLite connection"""
+    return not isinstance(conn, sqlite3.Connection)
+
+def summary_rows(summary):
+    """Rows (dicts, None for NaN) from a ColumnarArchive step_summary()/cycle_summary()"""
+    names = list(summary)
+    columns = [summary[name].tolist() for name in names]
+    return [{name: (None if isinstance(value, float) and value != value else value)
+             for name, value in zip(names, values)}
+            for values in zip(*columns)]
+
 def print_test_metadata(conn):
     """Print test metadata in a formatted table"""
     print("📋 TEST METADATA")
     print("=" * 50)
     
-    cursor = conn.execute("SELECT key, value FROM metadata ORDER BY key")
+    if is_archive(conn):
+        cursor = [{'key': key, 'value': value} for key, value in sorted(conn.test_metadata.items())]
+    else:
+        cursor = conn.execute("SELECT key, value FROM metadata ORDER BY key")
     
     for row in cursor:
         key = row['key'].replace('_', ' ').title()
@@ -60,21 +110,22 @@ def analyze_cycle_summary(conn):
     print("🔄 CYCLE SUMMARY")
     print("=" * 80)
     
-    query = """
+    query = STEP_CAPACITY_CTE + """
     SELECT 
-        cycle,
+        d.cycle,
         COUNT(*) as data_points,
-        MIN(voltage_v) as min_voltage,
-        MAX(voltage_v) as max_voltage,
-        SUM(CASE WHEN current_a > 0 THEN step_ah ELSE 0 END) as charge_ah,
-        SUM(CASE WHEN current_a < 0 THEN ABS(step_ah) ELSE 0 END) as discharge_ah,
-        MAX(total_time_s) as cycle_end_time_s
-    FROM data 
-    GROUP BY cycle 
-    ORDER BY cycle
+        MIN(d.voltage_v) as min_voltage,
+        MAX(d.voltage_v) as max_voltage,
+        c.charge_ah,
+        c.discharge_ah,
+        MAX(d.total_time_s) as total_time_s
+    FROM data d
+    JOIN cycle_capacity c ON c.cycle = d.cycle
+    GROUP BY d.cycle 
+    ORDER BY d.cycle
     """
     
-    cursor = conn.execute(query)
+    cursor = summary_rows(conn.cycle_summary()) if is_archive(conn) else conn.execute(query)
     
     print(f"{'Cycle':<6} {'Points':<8} {'Min V':<7} {'Max V':<7} {'Charge':<9} {'Discharge':<10} {'Time (h)':<10}")
     print("-" * 80)
@@ -86,7 +137,7 @@ def analyze_cycle_summary(conn):
         max_v = f"{row['max_voltage']:.3f}" if row['max_voltage'] else "N/A"
         charge = f"{row['charge_ah']:.4f}" if row['charge_ah'] else "0.0000"
         discharge = f"{row['discharge_ah']:.4f}" if row['discharge_ah'] else "0.0000"
-        time_h = f"{row['cycle_end_time_s']/3600:.2f}" if row['cycle_end_time_s'] else "N/A"
+        time_h = f"{row['total_time_s']/3600:.2f}" if row['total_time_s'] else "N/A"
         
         print(f"{cycle:<6} {points:<8} {min_v:<7} {max_v:<7} {charge:<9} {discharge:<10} {time_h:<10}")
     
@@ -97,23 +148,27 @@ def analyze_step_breakdown(conn, cycle_num=1):
     print(f"⚡ STEP BREAKDOWN - CYCLE {cycle_num}")
     print("=" * 70)
     
-    query = """
+    query = STEP_CAPACITY_CTE + """
     SELECT 
-        step,
-        step_type,
+        d.step,
+        d.step_type,
         COUNT(*) as data_points,
-        MAX(step_time_s) as duration_s,
-        MIN(voltage_v) as min_voltage,
-        MAX(voltage_v) as max_voltage,
-        AVG(current_a) as avg_current,
-        MAX(step_ah) as total_ah
-    FROM data 
-    WHERE cycle = ?
-    GROUP BY step, step_type
-    ORDER BY step
+        MAX(d.step_time_s) as duration_s,
+        MIN(d.voltage_v) as min_voltage,
+        MAX(d.voltage_v) as max_voltage,
+        AVG(d.current_a) as avg_current,
+        f.step_ah
+    FROM data d
+    JOIN step_final f ON f.cycle = d.cycle AND f.step = d.step
+    WHERE d.cycle = ?
+    GROUP BY d.step, d.step_type
+    ORDER BY d.step
     """
     
-    cursor = conn.execute(query, (cycle_num,))
+    if is_archive(conn):
+        cursor = [row for row in summary_rows(conn.step_summary()) if row['cycle'] == cycle_num]
+    else:
+        cursor = conn.execute(query, (cycle_num,))
     
     print(f"{'Step':<5} {'Type':<5} {'Points':<8} {'Duration':<10} {'V Range':<12} {'Avg I (mA)':<12} {'Ah':<10}")
     print("-" * 70)
@@ -125,33 +180,74 @@ def analyze_step_breakdown(conn, cycle_num=1):
         duration = f"{row['duration_s']:.0f}s" if row['duration_s'] else "N/A"
         v_range = f"{row['min_voltage']:.3f}-{row['max_voltage']:.3f}" if row['min_voltage'] and row['max_voltage'] else "N/A"
         avg_i_ma = f"{row['avg_current']*1000:.1f}" if row['avg_current'] else "N/A"
-        ah = f"{row['total_ah']:.4f}" if row['total_ah'] else "N/A"
+        ah = f"{row['step_ah']:.4f}" if row['step_ah'] else "N/A"
         
         print(f"{step:<5} {step_type:<5} {points:<8} {duration:<10} {v_range:<12} {avg_i_ma:<12} {ah:<10}")
     
     print()
 
+def has_analysis_columns(conn):
+    """True if the data table has the typed step analysis columns (data_format_version 1.1+)"""
+    if is_archive(conn):
+        return True  # Computed from the columns by ColumnarArchive.step_summary()
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(data)")}
+    return 'voltage_trend' in columns and 'data_points_in_step' in columns
+
+def analyze_step_statistics(conn, cycle_num=1):
+    """Print the cycler's running step analysis as recorded at the end of each step"""
+    print(f"📈 STEP STATISTICS - CYCLE {cycle_num}")
+    print("=" * 70)
+    
+    if not has_analysis_columns(conn):
+        print("No typed step analysis columns (older database).")
+        print("Convert older databases with: python migrate_analysis_columns.py <database.db>")
+        print()
+        return
+    
+    # The last row of a step carries the statistics over the whole step
+    query = """
+    SELECT step, step_type, data_points_in_step as data_points, step_avg_voltage as avg_voltage,
+           step_avg_current as avg_current, voltage_trend, current_stability
+    FROM data
+    WHERE id IN (SELECT MAX(id) FROM data WHERE cycle = ? GROUP BY step)
+      AND data_points_in_step IS NOT NULL
+    ORDER BY step
+    """
+    
+    if is_archive(conn):
+        cursor = [row for row in summary_rows(conn.step_summary())
+                  if row['cycle'] == cycle_num and row['avg_voltage'] is not None
+                  and row['avg_current'] is not None]
+    else:
+        cursor = conn.execute(query, (cycle_num,))
+    
+    print(f"{'Step':<5} {'Type':<5} {'Points':<8} {'Avg V':<8} {'Avg I (mA)':<11} {'dV/dt (V/s)':<13} {'I stab.':<8}")
+    print("-" * 70)
+    
+    for row in cursor:
+        print(f"{row['step']:<5} {row['step_type'].upper():<5} {row['data_points']:<8} "
+              f"{row['avg_voltage']:<8.4f} {row['avg_current']*1000:<11.3f} "
+              f"{row['voltage_trend']:<13.2e} {row['current_stability']:<8.4f}")
+    
+    print()
+
 def analyze_capacity_fade(conn):
     """Analyze capacity fade over cycles"""
     print("📉 CAPACITY FADE ANALYSIS")
     print("=" * 50)
     
-    query = """
-    SELECT 
-        cycle,
-        SUM(CASE WHEN current_a > 0 THEN step_ah ELSE 0 END) as charge_capacity,
-        SUM(CASE WHEN current_a < 0 THEN ABS(step_ah) ELSE 0 END) as discharge_capacity
-    FROM data 
-    GROUP BY cycle 
+    query = STEP_CAPACITY_CTE + """
+    SELECT cycle, charge_ah, discharge_ah
+    FROM cycle_capacity 
     ORDER BY cycle
     """
     
-    cursor = conn.execute(query)
+    cursor = summary_rows(conn.cycle_summary()) if is_archive(conn) else conn.execute(query)
     
     capacities = []
     for row in cursor:
-        charge_cap = row['charge_capacity'] or 0
-        discharge_cap = row['discharge_capacity'] or 0
+        charge_cap = row['charge_ah'] or 0
+        discharge_cap = row['discharge_ah'] or 0
         capacities.append({
             'cycle': row['cycle'],
             'charge': charge_cap,
@@ -175,23 +271,36 @@ def analyze_capacity_fade(conn):
     
     print()
 
+def analyze_efficiency(db_path):
+    """Print per-cycle energy (Wh) and coulombic/energy efficiency"""
+    try:
+        from energy_analysis import analyze_energy, print_efficiency_summary
+    except ImportError:
+        print("⚡ Energy & efficiency analysis requires numpy (pip install numpy)")
+        print()
+        return
+    
+    _, cycles = analyze_energy(db_path)
+    print_efficiency_summary(cycles)
+
 def export_csv_summary(conn, output_file):
     """Export cycle summary to CSV"""
-    query = """
+    query = STEP_CAPACITY_CTE + """
     SELECT 
-        cycle,
-        SUM(CASE WHEN current_a > 0 THEN step_ah ELSE 0 END) as charge_ah,
-        SUM(CASE WHEN current_a < 0 THEN ABS(step_ah) ELSE 0 END) as discharge_ah,
-        MAX(total_time_s) as total_time_s,
-        AVG(voltage_v) as avg_voltage,
-        MIN(voltage_v) as min_voltage,
-        MAX(voltage_v) as max_voltage
-    FROM data 
-    GROUP BY cycle 
-    ORDER BY cycle
+        d.cycle,
+        c.charge_ah,
+        c.discharge_ah,
+        MAX(d.total_time_s) as total_time_s,
+        AVG(d.voltage_v) as avg_voltage,
+        MIN(d.voltage_v) as min_voltage,
+        MAX(d.voltage_v) as max_voltage
+    FROM data d
+    JOIN cycle_capacity c ON c.cycle = d.cycle
+    GROUP BY d.cycle 
+    ORDER BY d.cycle
     """
     
-    cursor = conn.execute(query)
+    cursor = summary_rows(conn.cycle_summary()) if is_archive(conn) else conn.execute(query)
     
     with open(output_file, 'w') as f:
         f.write("cycle,charge_ah,discharge_ah,total_time_s,avg_voltage,min_voltage,max_voltage\n")
@@ -200,22 +309,15 @@ def export_csv_summary(conn, output_file):
     
     print(f"📊 Cycle summary exported to: {output_file}")
 
-def main():
-    if len(sys.argv) != 2:
-        print("Usage: python analyze_battery_data.py <database_file.db>")
-        print("\nExample:")
-        print("  python analyze_battery_data.py battery_test_2024-01-15T10-30-45-123Z.db")
-        sys.exit(1)
-    
-    db_path = sys.argv[1]
-    
+def analyze(db_path):
+    """Print the full analysis of a database or archive; returns False if it cannot be opened"""
     print(f"🔋 Battery Data Analysis")
     print(f"Database: {db_path}")
     print("=" * 60)
     
     conn = connect_database(db_path)
     if not conn:
-        sys.exit(1)
+        return False
     
     try:
         # Print test metadata
@@ -226,18 +328,33 @@ def main():
         
         # Analyze first cycle in detail
         analyze_step_breakdown(conn, cycle_num=1)
+        analyze_step_statistics(conn, cycle_num=1)
         
         # Capacity fade analysis
         analyze_capacity_fade(conn)
         
+        # Energy and efficiency
+        analyze_efficiency(db_path)
+        
         # Export summary
-        csv_output = db_path.replace('.db', '_summary.csv')
+        csv_output = os.path.splitext(db_path.rstrip(os.sep))[0] + '_summary.csv'
         export_csv_summary(conn, csv_output)
         
     except sqlite3.Error as e:
         print(f"❌ Database query error: {e}")
     finally:
         conn.close()
+    return True
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python analyze_battery_data.py <database_file.db | archive.columns>")
+        print("\nExample:")
+        print("  python analyze_battery_data.py battery_test_2024-01-15T10-30-45-123Z.db")
+        sys.exit(1)
+    
+    if not analyze(sys.argv[1]):
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
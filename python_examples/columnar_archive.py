@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Columnar Archive Format for Completed Battery Tests
+
+Converts a battery_test_*.db into a directory of raw, memory-mappable column
+files so analysis can slice a single cycle without parsing SQLite rows or CSV.
+The server writes the same layout automatically when a cycler test stops.
+
+Archive layout (battery_test_TIMESTAMP.columns/):
+    metadata.json   - Row count, column dtypes, step type codes, test metadata
+    time_ms.f64     - unix_timestamp in ms
+    voltage_v.f64   - Voltage (NaN where missing)
+    current_a.f64   - Current (NaN where missing)
+    step_ah.f64     - Step capacity
+    cycle.i32       - Cycle number
+    step.i32        - Step index
+    step_type.u8    - Index into metadata.json "step_types"
+    index.i64       - One row per contiguous step: cycle, step, start row, end row
+
+Usage:
+    python columnar_archive.py battery_test_*.db [--output DIR]
+
+Requirements:
+    - numpy
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+
+import numpy as np
+
+FORMAT_NAME = 'minismush-columnar'
+FORMAT_VERSION = 1
+STEP_TYPES = ['cc', 'cv', 'ocv', 'rest', 'unknown']
+
+COLUMNS = {
+    'time_ms': ('time_ms.f64', 'f8'),
+    'voltage_v': ('voltage_v.f64', 'f8'),
+    'current_a': ('current_a.f64', 'f8'),
+    'step_ah': ('step_ah.f64', 'f8'),
+    'cycle': ('cycle.i32', 'i4'),
+    'step': ('step.i32', 'i4'),
+    'step_type': ('step_type.u8', 'u1'),
+}
+INDEX_FILE = 'index.i64'
+TREND_POINTS = 10                 # Rows in the voltage trend, as the server's step analysis
+SUMMARY_BATCH_ROWS = 1 << 20      # Data rows per summary pass (bounds the temporary arrays)
+STEP_SUMMARY_FIELDS = ['cycle', 'step', 'step_type', 'data_points', 'duration_s', 'min_voltage',
+                       'max_voltage', 'avg_voltage', 'voltage_points', 'avg_current', 'step_ah',
+                       'voltage_trend', 'current_stability']
+CYCLE_SUMMARY_FIELDS = ['cycle', 'data_points', 'min_voltage', 'max_voltage', 'avg_voltage',
+                        'charge_ah', 'discharge_ah', 'total_time_s']
+
+
+def archive_path_for(db_path):
+    """Default archive directory for a database file"""
+    return os.path.splitext(db_path)[0] + '.columns'
+
+
+def is_archive(path):
+    """True if path is a columnar archive directory"""
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, 'metadata.json'))
+
+
+def build_index(cycle, step):
+    """Cycle/step offset index: rows of (cycle, step, start, end) per contiguous step"""
+    if len(step) == 0:
+        return np.empty((0, 4), dtype=np.int64)
+    change = np.flatnonzero((np.diff(step) != 0) | (np.diff(cycle) != 0)) + 1
+    starts = np.concatenate(([0], change))
+    ends = np.concatenate((change, [len(step)]))
+    return np.column_stack((cycle[starts], step[starts], starts, ends)).astype(np.int64)
+
+
+def convert(db_path, output_dir=None, chunk_size=100000):
+    """
+    Convert a battery test database into a columnar archive
+
+    Args:
+        db_path: Path to battery_test_*.db
+        output_dir: Archive directory (default: next to the database, *.columns)
+        chunk_size: Rows fetched from SQLite per chunk
+
+    Returns:
+        Path of the archive directory
+    """
+    output_dir = output_dir or archive_path_for(db_path)
+    os.makedirs(output_dir, exist_ok=True)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        test_metadata = dict(conn.execute("SELECT key, value FROM metadata").fetchall())
+        rows = conn.execute("SELECT COUNT(*) FROM data").fetchone()[0]
+
+        arrays = {name: np.empty(rows, dtype=dtype) for name, (_, dtype) in COLUMNS.items()}
+        type_codes = {name: code for code, name in enumerate(STEP_TYPES)}
+        unknown = type_codes['unknown']
+
+        cursor = conn.execute("""
+            SELECT unix_timestamp, voltage_v, current_a, step_ah, cycle, step, step_type
+            FROM data ORDER BY id
+        """)
+        offset = 0
+        while True:
+            chunk = cursor.fetchmany(chunk_size)
+            if not chunk:
+                break
+            end = offset + len(chunk)
+            numeric = np.array([r[:6] for r in chunk], dtype=np.float64)
+            arrays['time_ms'][offset:end] = numeric[:, 0]
+            arrays['voltage_v'][offset:end] = numeric[:, 1]
+            arrays['current_a'][offset:end] = numeric[:, 2]
+            arrays['step_ah'][offset:end] = numeric[:, 3]
+            arrays['cycle'][offset:end] = numeric[:, 4]
+            arrays['step'][offset:end] = numeric[:, 5]
+            arrays['step_type'][offset:end] = [type_codes.get(r[6], unknown) for r in chunk]
+            offset = end
+    finally:
+        conn.close()
+
+    write_archive(output_dir, arrays, test_metadata)
+    return output_dir
+
+
+def write_archive(output_dir, arrays, test_metadata):
+    """Write column arrays, the offset index and metadata.json"""
+    for name, (filename, dtype) in COLUMNS.items():
+        np.ascontiguousarray(arrays[name], dtype='<' + dtype).tofile(os.path.join(output_dir, filename))
+
+    index = build_index(arrays['cycle'], arrays['step'])
+    index.astype('<i8').tofile(os.path.join(output_dir, INDEX_FILE))
+
+    metadata = {
+        'format': FORMAT_NAME,
+        'version': FORMAT_VERSION,
+        'rows': int(len(arrays['time_ms'])),
+        'byte_order': 'little',
+        'columns': {name: {'file': f, 'dtype': d} for name, (f, d) in COLUMNS.items()},
+        'index': {'file': INDEX_FILE, 'dtype': 'i8', 'fields': ['cycle', 'step', 'start', 'end']},
+        'step_types': STEP_TYPES,
+        'test': test_metadata,
+    }
+    with open(os.path.join(output_dir, 'metadata.json'), 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+
+class ColumnarArchive:
+    """Read-only, memory-mapped view of a columnar test archive"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'metadata.json')) as f:
+            self.metadata = json.load(f)
+        if self.metadata.get('format') != FORMAT_NAME:
+            raise ValueError(f"Not a {FORMAT_NAME} archive: {path}")
+
+        self.rows = self.metadata['rows']
+        self.step_types = self.metadata['step_types']
+        prefix = '<' if self.metadata.get('byte_order', 'little') == 'little' else '>'
+        self._dtypes = {name: np.dtype(prefix + spec['dtype'])
+                        for name, spec in self.metadata['columns'].items()}
+
+        index_spec = self.metadata['index']
+        index_file = os.path.join(path, index_spec['file'])
+        raw = np.fromfile(index_file, dtype=prefix + index_spec['dtype'])
+        self.index = raw.reshape(-1, len(index_spec['fields']))
+        self._columns = {}
+
+    @property
+    def test_metadata(self):
+        """Key/value pairs copied from the database metadata table"""
+        return self.metadata.get('test', {})
+
+    def column(self, name):
+        """Memory-mapped array for a whole column"""
+        if name not in self._columns:
+            spec = self.metadata['columns'][name]
+            filename = os.path.join(self.path, spec['file'])
+            if self.rows == 0:
+                self._columns[name] = np.empty(0, dtype=self._dtypes[name])
+            else:
+                self._columns[name] = np.memmap(filename, dtype=self._dtypes[name],
+                                                mode='r', shape=(self.rows,))
+        return self._columns[name]
+
+    def cycle_range(self, cycle):
+        """(start, end) rows spanned by a cycle"""
+        rows = self.index[self.index[:, 0] == cycle]
+        if len(rows) == 0:
+            raise KeyError(f"Cycle {cycle} not in archive")
+        return int(rows[:, 2].min()), int(rows[:, 3].max())
+
+    def cycle(self, cycle, columns=None):
+        """Dict of memory-mapped column slices for one cycle"""
+        start, end = self.cycle_range(cycle)
+        return {name: self.column(name)[start:end] for name in (columns or COLUMNS)}
+
+    def step(self, cycle, step, columns=None):
+        """Dict of memory-mapped column slices for one step of one cycle"""
+        rows = self.index[(self.index[:, 0] == cycle) & (self.index[:, 1] == step)]
+        if len(rows) == 0:
+            raise KeyError(f"Cycle {cycle} step {step} not in archive")
+        start, end = int(rows[0, 2]), int(rows[-1, 3])
+        return {name: self.column(name)[start:end] for name in (columns or COLUMNS)}
+
+    def step_summary(self):
+        """
+        Per-step statistics computed on the memory-mapped columns
+
+        One entry per index row. Missing (NaN) voltage/current samples are left
+        out of the minima, maxima and means. voltage_trend and
+        current_stability follow the server's running step analysis (trend
+        over the last TREND_POINTS rows, population std / |mean| current).
+
+        Returns:
+            Dict of arrays: cycle, step, step_type, data_points, duration_s,
+            min_voltage, max_voltage, avg_voltage, voltage_points, avg_current,
+            step_ah, voltage_trend, current_stability
+        """
+        index = self.index
+        steps = len(index)
+        if not steps:
+            return {name: np.empty(0) for name in STEP_SUMMARY_FIELDS}
+        starts, ends = index[:, 2], index[:, 3]
+        type_codes = np.asarray(self.column('step_type')[starts], dtype=np.intp)
+        summary = {
+            'cycle': index[:, 0].copy(),
+            'step': index[:, 1].copy(),
+            'step_type': np.array(self.step_types, dtype=object)[type_codes],
+            'data_points': ends - starts,
+            'voltage_points': np.zeros(steps, dtype=np.int64),
+        }
+        for name in ('min_voltage', 'max_voltage', 'avg_voltage', 'avg_current', 'current_stability'):
+            summary[name] = np.full(steps, np.nan)
+
+        time_ms, voltage = self.column('time_ms'), self.column('voltage_v')
+        current = self.column('current_a')
+        last = ends - 1
+        summary['duration_s'] = (time_ms[last] - time_ms[starts]) / 1000
+        summary['step_ah'] = np.asarray(self.column('step_ah')[last], dtype=np.float64)
+
+        first = np.maximum(starts, ends - TREND_POINTS)
+        elapsed = (time_ms[last] - time_ms[first]) / 1000
+        rise = voltage[last] - voltage[first]
+        trend = np.divide(rise, elapsed, out=np.zeros(steps), where=elapsed > 0)
+        summary['voltage_trend'] = np.nan_to_num(trend)
+
+        for i0, i1 in self._step_batches():
+            r0, r1 = int(starts[i0]), int(ends[i1 - 1])
+            offsets = starts[i0:i1] - r0
+            lengths = ends[i0:i1] - starts[i0:i1]
+            v, c = voltage[r0:r1], current[r0:r1]
+
+            summary['min_voltage'][i0:i1] = np.fmin.reduceat(v, offsets)
+            summary['max_voltage'][i0:i1] = np.fmax.reduceat(v, offsets)
+            v_valid = ~np.isnan(v)
+            v_count = np.add.reduceat(v_valid, offsets)
+            v_sum = np.add.reduceat(np.where(v_valid, v, 0.0), offsets)
+            summary['voltage_points'][i0:i1] = v_count
+            summary['avg_voltage'][i0:i1] = np.divide(v_sum, v_count, out=np.full(i1 - i0, np.nan),
+                                                      where=v_count > 0)
+
+            c_valid = ~np.isnan(c)
+            c_count = np.add.reduceat(c_valid, offsets)
+            c_mean = np.divide(np.add.reduceat(np.where(c_valid, c, 0.0), offsets), c_count,
+                               out=np.full(i1 - i0, np.nan), where=c_count > 0)
+            deviation = np.where(c_valid, c - np.repeat(c_mean, lengths), 0.0)
+            c_std = np.sqrt(np.add.reduceat(deviation * deviation, offsets) / np.maximum(c_count, 1))
+            stable = (c_count >= 2) & (np.abs(c_mean) > 1e-9)
+            summary['avg_current'][i0:i1] = c_mean
+            summary['current_stability'][i0:i1] = np.divide(c_std, np.abs(c_mean), out=np.zeros(i1 - i0),
+                                                            where=stable)
+        return summary
+
+    def cycle_summary(self):
+        """
+        Per-cycle totals computed from step_summary()
+
+        charge_ah/discharge_ah add up the final step_ah of every step with a
+        positive/negative capacity; total_time_s is the cycle's last row
+        relative to the start of the test.
+
+        Returns:
+            Dict of arrays: cycle, data_points, min_voltage, max_voltage,
+            avg_voltage, charge_ah, discharge_ah, total_time_s
+        """
+        steps = self.step_summary()
+        cycles = steps['cycle']
+        if not len(cycles):
+            return {name: np.empty(0) for name in CYCLE_SUMMARY_FIELDS}
+        offsets = np.flatnonzero(np.concatenate(([True], cycles[1:] != cycles[:-1])))
+        step_ah = steps['step_ah']
+        v_count = np.add.reduceat(steps['voltage_points'], offsets)
+        v_sum = np.add.reduceat(np.where(steps['voltage_points'] > 0,
+                                         steps['avg_voltage'] * steps['voltage_points'], 0.0), offsets)
+        time_ms = self.column('time_ms')
+        last_row = self.index[np.append(offsets[1:], len(cycles)) - 1, 3] - 1
+        return {
+            'cycle': cycles[offsets],
+            'data_points': np.add.reduceat(steps['data_points'], offsets),
+            'min_voltage': np.fmin.reduceat(steps['min_voltage'], offsets),
+            'max_voltage': np.fmax.reduceat(steps['max_voltage'], offsets),
+            'avg_voltage': np.divide(v_sum, v_count, out=np.full(len(offsets), np.nan), where=v_count > 0),
+            'charge_ah': np.add.reduceat(np.where(step_ah > 0, step_ah, 0.0), offsets),
+            'discharge_ah': np.add.reduceat(np.where(step_ah < 0, -step_ah, 0.0), offsets),
+            'total_time_s': (time_ms[last_row] - time_ms[0]) / 1000,
+        }
+
+    def _step_batches(self):
+        """(first, end) index rows covering about SUMMARY_BATCH_ROWS data rows each (at least one step)"""
+        ends = self.index[:, 3]
+        first = 0
+        while first < len(ends):
+            row_start = self.index[first, 2]
+            end = max(first + 1, int(np.searchsorted(ends, row_start + SUMMARY_BATCH_ROWS, side='right')))
+            yield first, end
+            first = end
+
+    def close(self):
+        """Drop the column memory maps"""
+        self._columns.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a battery test database to a columnar archive")
+    parser.add_argument('database', help="battery_test_*.db file")
+    parser.add_argument('--output', help="Archive directory (default: <database>.columns)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.database):
+        print(f"❌ Database file not found: {args.database}")
+        sys.exit(1)
+
+    output_dir = convert(args.database, args.output)
+    archive = ColumnarArchive(output_dir)
+    print(f"📦 Archive written to: {output_dir}")
+    print(f"   {archive.rows} rows, {len(archive.index)} steps")
+
+
+if __name__ == "__main__":
+    main()
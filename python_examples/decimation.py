@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Time Series Decimation for Plotting
+
+Returns a visually faithful downsample of a battery test's `data` table for a
+time range and target point count, without loading the full range into memory.
+Rows are streamed from SQLite in chunks and reduced with either
+largest-triangle-three-buckets (LTTB) or per-bucket min/max.
+
+Usage:
+    python decimation.py battery_test_*.db [--points 2000] [--method lttb|minmax]
+                         [--column voltage_v] [--start MS] [--end MS] [--csv out.csv]
+
+Requirements:
+    - numpy
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+
+import numpy as np
+
+DEFAULT_CHUNK_SIZE = 50000
+COLUMNS = ('voltage_v', 'current_a', 'step_ah', 'cycle_ah', 'total_ah')
+
+
+def lttb(x, y, points):
+    """
+    Largest-triangle-three-buckets downsampling
+
+    Args:
+        x: Monotonic x values (e.g. time)
+        y: Sample values
+        points: Target number of output points (>= 3)
+
+    Returns:
+        Indices of the selected samples
+    """
+    n = len(x)
+    if points >= n or points < 3:
+        return np.arange(n)
+
+    ids = _bucket_ids(np.arange(n), n, points)
+    edges = np.searchsorted(ids, np.arange(points + 1))
+    selected = np.empty(points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for b in range(1, points - 1):
+        start, end, next_end = edges[b], edges[b + 1], edges[b + 2]
+        cx = x[end:next_end].mean()
+        cy = y[end:next_end].mean()
+
+        bx, by = x[start:end], y[start:end]
+        area = np.abs((x[a] - cx) * (by - y[a]) - (x[a] - bx) * (cy - y[a]))
+        a = start + int(np.argmax(area))
+        selected[b] = a
+
+    return selected
+
+
+def minmax(x, y, points):
+    """
+    Per-bucket min/max downsampling
+
+    Keeps the minimum and maximum sample of each of points/2 equal-count
+    buckets, so spikes survive decimation.
+
+    Returns:
+        Sorted indices of the selected samples
+    """
+    n = len(x)
+    if points >= n or points < 2:
+        return np.arange(n)
+
+    buckets = points // 2
+    edges = -(-np.arange(buckets + 1) * n // buckets)
+    starts = edges[:-1]
+    lo = np.empty(len(starts), dtype=np.int64)
+    hi = np.empty(len(starts), dtype=np.int64)
+    for i, (start, end) in enumerate(zip(starts, edges[1:])):
+        seg = y[start:end]
+        lo[i] = start + int(np.argmin(seg))
+        hi[i] = start + int(np.argmax(seg))
+    return np.unique(np.concatenate((lo, hi)))
+
+
+def decimate(x, y, points, method='lttb'):
+    """Dispatch to lttb() or minmax() and return the selected (x, y)"""
+    if method == 'lttb':
+        idx = lttb(x, y, points)
+    elif method == 'minmax':
+        idx = minmax(x, y, points)
+    else:
+        raise ValueError(f"Unknown decimation method: {method}")
+    return x[idx], y[idx]
+
+
+def _range_clause(start, end):
+    clauses, params = [], []
+    if start is not None:
+        clauses.append("unix_timestamp >= ?")
+        params.append(int(start))
+    if end is not None:
+        clauses.append("unix_timestamp <= ?")
+        params.append(int(end))
+    clauses.append("{column} IS NOT NULL")
+    return " WHERE " + " AND ".join(clauses), params
+
+
+def _iter_chunks(conn, column, start, end, chunk_size):
+    """Yield (row offset, x array, y array) for the range, ordered by id"""
+    where, params = _range_clause(start, end)
+    cursor = conn.execute(
+        f"SELECT unix_timestamp, {column} FROM data{where.format(column=column)} ORDER BY id",
+        params)
+    offset = 0
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        chunk = np.array(rows, dtype=np.float64)
+        yield offset, chunk[:, 0], chunk[:, 1]
+        offset += len(rows)
+
+
+def _bucket_ids(rows, n, points):
+    """LTTB bucket id per row index (0 and points-1 hold the first/last rows)"""
+    ids = 1 + ((rows - 1) * (points - 2)) // (n - 2)
+    ids[rows == 0] = 0
+    ids[rows == n - 1] = points - 1
+    return ids
+
+
+def _stream_lttb(conn, column, start, end, n, points, chunk_size):
+    """Two streaming passes: bucket averages, then triangle selection"""
+    sums_x = np.zeros(points)
+    sums_y = np.zeros(points)
+    counts = np.zeros(points)
+    for offset, x, y in _iter_chunks(conn, column, start, end, chunk_size):
+        ids = _bucket_ids(np.arange(offset, offset + len(x)), n, points)
+        sums_x += np.bincount(ids, weights=x, minlength=points)
+        sums_y += np.bincount(ids, weights=y, minlength=points)
+        counts += np.bincount(ids, minlength=points)
+    avg_x = sums_x / np.maximum(counts, 1)
+    avg_y = sums_y / np.maximum(counts, 1)
+
+    out_x = np.empty(points)
+    out_y = np.empty(points)
+    best_area = -1.0
+    current = 0
+    for offset, x, y in _iter_chunks(conn, column, start, end, chunk_size):
+        ids = _bucket_ids(np.arange(offset, offset + len(x)), n, points)
+        bounds = np.flatnonzero(np.diff(ids)) + 1
+        for seg_x, seg_y, seg_ids in zip(np.split(x, bounds), np.split(y, bounds), np.split(ids, bounds)):
+            bucket = int(seg_ids[0])
+            if bucket != current:
+                current, best_area = bucket, -1.0
+            if bucket == 0 or bucket == points - 1:
+                out_x[bucket], out_y[bucket] = seg_x[0], seg_y[0]
+                continue
+            ax, ay = out_x[bucket - 1], out_y[bucket - 1]
+            cx, cy = avg_x[bucket + 1], avg_y[bucket + 1]
+            area = np.abs((ax - cx) * (seg_y - ay) - (ax - seg_x) * (cy - ay))
+            i = int(np.argmax(area))
+            if area[i] > best_area:
+                best_area = area[i]
+                out_x[bucket], out_y[bucket] = seg_x[i], seg_y[i]
+    return out_x, out_y
+
+
+def _stream_minmax(conn, column, start, end, n, points, chunk_size):
+    """Single streaming pass keeping each bucket's min and max sample"""
+    buckets = max(points // 2, 1)
+    lo = np.full((buckets, 2), [np.nan, np.inf])
+    hi = np.full((buckets, 2), [np.nan, -np.inf])
+    for offset, x, y in _iter_chunks(conn, column, start, end, chunk_size):
+        ids = (np.arange(offset, offset + len(x)) * buckets) // n
+        bounds = np.flatnonzero(np.diff(ids)) + 1
+        for seg_x, seg_y, seg_ids in zip(np.split(x, bounds), np.split(y, bounds), np.split(ids, bounds)):
+            b = int(seg_ids[0])
+            i, j = int(np.argmin(seg_y)), int(np.argmax(seg_y))
+            if seg_y[i] < lo[b, 1]:
+                lo[b] = seg_x[i], seg_y[i]
+            if seg_y[j] > hi[b, 1]:
+                hi[b] = seg_x[j], seg_y[j]
+    both = np.concatenate((lo, hi))
+    both = both[np.isfinite(both[:, 0])]
+    _, keep = np.unique(both[:, 0], return_index=True)
+    both = both[keep]
+    return both[:, 0], both[:, 1]
+
+
+def decimate_db(db_path, column='voltage_v', start=None, end=None, points=2000,
+                method='lttb', chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Decimate one column of a battery test database for plotting
+
+    Args:
+        db_path: Path to battery_test_*.db
+        column: Column to decimate (voltage_v, current_a, step_ah, ...)
+        start: Start of range as unix_timestamp in ms (inclusive, optional)
+        end: End of range as unix_timestamp in ms (inclusive, optional)
+        points: Target number of output points
+        method: 'lttb' or 'minmax'
+        chunk_size: Rows fetched from SQLite per chunk
+
+    Returns:
+        (time_ms, values) NumPy arrays
+    """
+    if column not in COLUMNS:
+        raise ValueError(f"Column must be one of {', '.join(COLUMNS)}")
+    if method not in ('lttb', 'minmax'):
+        raise ValueError(f"Unknown decimation method: {method}")
+
+    conn = sqlite3.connect(db_path)
+    try:
+        where, params = _range_clause(start, end)
+        n = conn.execute(f"SELECT COUNT(*) FROM data{where.format(column=column)}", params).fetchone()[0]
+
+        if n <= points or n < 3:
+            xs, ys = [], []
+            for _, x, y in _iter_chunks(conn, column, start, end, chunk_size):
+                xs.append(x)
+                ys.append(y)
+            if not xs:
+                return np.empty(0), np.empty(0)
+            return np.concatenate(xs), np.concatenate(ys)
+
+        if method == 'lttb':
+            return _stream_lttb(conn, column, start, end, n, max(points, 3), chunk_size)
+        return _stream_minmax(conn, column, start, end, n, points, chunk_size)
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decimate minismush test data for plotting")
+    parser.add_argument('database', help="battery_test_*.db file")
+    parser.add_argument('--points', type=int, default=2000, help="Target number of points")
+    parser.add_argument('--method', choices=('lttb', 'minmax'), default='lttb')
+    parser.add_argument('--column', choices=COLUMNS, default='voltage_v')
+    parser.add_argument('--start', type=int, default=None, help="Range start (unix ms)")
+    parser.add_argument('--end', type=int, default=None, help="Range end (unix ms)")
+    parser.add_argument('--csv', help="Write decimated points to this CSV file")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.database):
+        print(f"❌ Database file not found: {args.database}")
+        sys.exit(1)
+
+    t, values = decimate_db(args.database, args.column, args.start, args.end,
+                            args.points, args.method)
+    print(f"📉 {len(t)} points ({args.method}, {args.column})")
+
+    if args.csv:
+        np.savetxt(args.csv, np.column_stack((t, values)), delimiter=',',
+                   header=f"unix_timestamp,{args.column}", comments='', fmt='%.10g')
+        print(f"📊 Decimated data exported to: {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Differential Capacity (dQ/dV) Analysis Tool
+
+Computes capacity-vs-voltage curves, dQ/dV and per-cycle overpotential for every
+cycle in a minismush battery test database. All per-cycle work is vectorized with
+NumPy and fanned out across a process pool; results are cached next to the
+database so repeated runs return immediately.
+
+Usage:
+    python dqdv_analysis.py battery_test_*.db|battery_test_*.columns [--bin-width 0.005] [--window 5] [--workers 4]
+
+Requirements:
+    - numpy
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+CACHE_VERSION = 1
+
+
+def load_columns(db_path):
+    """Load cycle, step, voltage_v, current_a and step_ah columns as NumPy arrays"""
+    if os.path.isdir(db_path):
+        from columnar_archive import ColumnarArchive
+        archive = ColumnarArchive(db_path)
+        voltage = np.asarray(archive.column('voltage_v'))
+        current = np.asarray(archive.column('current_a'))
+        keep = np.isfinite(voltage) & np.isfinite(current)
+        return {
+            'cycle': np.asarray(archive.column('cycle'), dtype=np.int64)[keep],
+            'step': np.asarray(archive.column('step'), dtype=np.int64)[keep],
+            'voltage': voltage[keep],
+            'current': current[keep],
+            'step_ah': np.asarray(archive.column('step_ah'))[keep],
+        }
+
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("""
+            SELECT cycle, step, voltage_v, current_a, step_ah
+            FROM data
+            WHERE voltage_v IS NOT NULL AND current_a IS NOT NULL
+            ORDER BY id
+        """).fetchall()
+    finally:
+        conn.close()
+
+    table = np.array(rows, dtype=np.float64).reshape(-1, 5)
+    return {
+        'cycle': table[:, 0].astype(np.int64),
+        'step': table[:, 1].astype(np.int64),
+        'voltage': table[:, 2],
+        'current': table[:, 3],
+        'step_ah': table[:, 4],
+    }
+
+
+def step_boundaries(step):
+    """Return (starts, ends) row indices for each contiguous run of a step index"""
+    change = np.flatnonzero(np.diff(step)) + 1
+    starts = np.concatenate(([0], change))
+    ends = np.concatenate((change, [len(step)]))
+    return starts, ends
+
+
+def half_cycle_capacity(step, step_ah, charging):
+    """
+    Accumulated capacity (Ah) through the charge or discharge half of a cycle
+
+    Each step's step_ah restarts at zero, so consecutive steps in the same
+    direction (e.g. CC followed by CV) are offset by the final capacity of the
+    steps before them.
+
+    Returns:
+        (row mask, capacity for the masked rows)
+    """
+    starts, ends = step_boundaries(step)
+    finals = step_ah[ends - 1]
+    direction = finals > 0 if charging else finals < 0
+    lengths = ends - starts
+
+    mask = np.repeat(direction, lengths)
+    if not mask.any():
+        return mask, np.empty(0)
+
+    kept_finals = np.abs(finals[direction])
+    offsets = np.concatenate(([0.0], np.cumsum(kept_finals)[:-1]))
+    capacity = np.abs(step_ah[mask]) + np.repeat(offsets, lengths[direction])
+    return mask, capacity
+
+
+def bin_voltage(voltage, capacity, edges):
+    """
+    Average capacity within fixed voltage bins
+
+    Returns:
+        Mean capacity per bin (NaN for empty bins), one value per bin centre
+    """
+    n_bins = len(edges) - 1
+    idx = np.digitize(voltage, edges) - 1
+    valid = (idx >= 0) & (idx < n_bins)
+    counts = np.bincount(idx[valid], minlength=n_bins)
+    sums = np.bincount(idx[valid], weights=capacity[valid], minlength=n_bins)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def smooth(values, window):
+    """Centred moving average that preserves array length"""
+    if window <= 1 or len(values) < window:
+        return values
+    kernel = np.ones(window) / window
+    padded = np.pad(values, (window // 2, window - 1 - window // 2), mode='edge')
+    return np.convolve(padded, kernel, mode='valid')
+
+
+def interpolate_to_grid(x, y, grid):
+    """Interpolate y(x) onto grid, leaving NaN outside the measured range"""
+    finite = np.isfinite(x) & np.isfinite(y)
+    if finite.sum() < 2:
+        return np.full(len(grid), np.nan)
+    x, y = x[finite], y[finite]
+    order = np.argsort(x)
+    return np.interp(grid, x[order], y[order], left=np.nan, right=np.nan)
+
+
+def capacity_curve(voltage, capacity, edges, grid, window):
+    """Binned, interpolated and smoothed Q(V) plus its derivative dQ/dV"""
+    centres = (edges[:-1] + edges[1:]) / 2
+    binned = bin_voltage(voltage, capacity, edges)
+    q = interpolate_to_grid(centres, binned, grid)
+
+    finite = np.isfinite(q)
+    q_smooth = q.copy()
+    q_smooth[finite] = smooth(q[finite], window)
+
+    dqdv = np.full(len(grid), np.nan)
+    if finite.sum() >= 2:
+        dqdv[finite] = np.gradient(q_smooth[finite], grid[finite])
+    return q_smooth, dqdv
+
+
+def overpotential(charge_v, charge_q, discharge_v, discharge_q, points=200):
+    """
+    Half the mean gap between charge and discharge voltage at equal depth
+
+    Both curves are mapped onto a shared 0-1 state-of-charge grid (discharge
+    capacity counted from the top of charge) before taking the difference.
+    """
+    if len(charge_q) < 2 or len(discharge_q) < 2:
+        return np.nan
+    soc = np.linspace(0, 1, points)
+    vc = interpolate_to_grid(charge_q / charge_q.max(), charge_v, soc)
+    vd = interpolate_to_grid(1 - discharge_q / discharge_q.max(), discharge_v, soc)
+    gap = vc - vd
+    gap = gap[np.isfinite(gap)]
+    return float(gap.mean() / 2) if len(gap) else np.nan
+
+
+def analyze_cycle(args):
+    """Compute charge/discharge curves, dQ/dV and overpotential for one cycle"""
+    cycle, step, voltage, step_ah, edges, grid, window = args
+
+    result = {'cycle': cycle}
+    halves = {}
+    for name, charging in (('charge', True), ('discharge', False)):
+        mask, capacity = half_cycle_capacity(step, step_ah, charging)
+        v = voltage[mask]
+        q, dqdv = capacity_curve(v, capacity, edges, grid, window)
+        result[f'{name}_q'] = q
+        result[f'{name}_dqdv'] = dqdv
+        result[f'{name}_capacity'] = float(capacity.max()) if len(capacity) else 0.0
+        halves[name] = (v, capacity)
+
+    result['overpotential'] = overpotential(*halves['charge'], *halves['discharge'])
+    return result
+
+
+def _cache_path(db_path, params):
+    """Cache file keyed by database identity and analysis parameters"""
+    st = os.stat(os.path.join(db_path, 'metadata.json') if os.path.isdir(db_path) else db_path)
+    key = f"{CACHE_VERSION}|{os.path.abspath(db_path)}|{st.st_size}|{st.st_mtime_ns}|{params}"
+    digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+    return f"{os.path.splitext(db_path.rstrip(os.sep))[0]}_dqdv_{digest}.npz"
+
+
+def _save_cache(path, grid, results):
+    arrays = {'grid': grid, 'cycles': np.array([r['cycle'] for r in results])}
+    for r in results:
+        for key, value in r.items():
+            if key != 'cycle':
+                arrays[f"c{r['cycle']}_{key}"] = np.asarray(value)
+    np.savez_compressed(path, **arrays)
+
+
+def _load_cache(path):
+    with np.load(path) as cached:
+        grid = cached['grid']
+        results = []
+        for cycle in cached['cycles']:
+            prefix = f"c{cycle}_"
+            r = {'cycle': int(cycle)}
+            for key in cached.files:
+                if key.startswith(prefix):
+                    value = cached[key]
+                    r[key[len(prefix):]] = value.item() if value.ndim == 0 else value
+            results.append(r)
+    return grid, results
+
+
+def analyze_dqdv(db_path, bin_width=0.005, window=5, workers=None, use_cache=True):
+    """
+    Run dQ/dV analysis over every cycle in a battery test database
+
+    Args:
+        db_path: Path to battery_test_*.db
+        bin_width: Voltage bin width (V) for the common grid
+        window: Moving-average window (grid points) applied before differentiating
+        workers: Process pool size (None = CPU count)
+        use_cache: Reuse/write the on-disk result cache
+
+    Returns:
+        (voltage grid, list of per-cycle result dicts)
+    """
+    params = f"{bin_width}|{window}"
+    cache_file = _cache_path(db_path, params)
+    if use_cache and os.path.exists(cache_file):
+        return _load_cache(cache_file)
+
+    cols = load_columns(db_path)
+    if len(cols['voltage']) == 0:
+        return np.empty(0), []
+
+    v_min = np.floor(cols['voltage'].min() / bin_width) * bin_width
+    v_max = np.ceil(cols['voltage'].max() / bin_width) * bin_width
+    edges = np.arange(v_min, v_max + bin_width, bin_width)
+    grid = (edges[:-1] + edges[1:]) / 2
+
+    # Rows are ordered by id, so each cycle is one contiguous slice
+    starts, ends = step_boundaries(cols['cycle'])
+    jobs = [
+        (int(cols['cycle'][s]), cols['step'][s:e], cols['voltage'][s:e],
+         cols['step_ah'][s:e], edges, grid, window)
+        for s, e in zip(starts, ends)
+    ]
+
+    if workers == 1 or len(jobs) == 1:
+        results = [analyze_cycle(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(analyze_cycle, jobs))
+
+    if use_cache:
+        _save_cache(cache_file, grid, results)
+    return grid, results
+
+
+def print_dqdv_summary(grid, results):
+    """Print per-cycle capacity, dQ/dV peak position and overpotential"""
+    print("📈 DIFFERENTIAL CAPACITY SUMMARY")
+    print("=" * 80)
+    print(f"{'Cycle':<6} {'Charge Ah':<11} {'Disch Ah':<11} {'Chg peak V':<11} {'Dis peak V':<11} {'Overpot. mV':<12}")
+    print("-" * 80)
+
+    for r in results:
+        peaks = []
+        for name in ('charge', 'discharge'):
+            dqdv = r[f'{name}_dqdv']
+            finite = np.isfinite(dqdv)
+            peaks.append(f"{grid[finite][np.argmax(np.abs(dqdv[finite]))]:.3f}" if finite.any() else "N/A")
+        overpot = f"{r['overpotential'] * 1000:.1f}" if np.isfinite(r['overpotential']) else "N/A"
+        print(f"{r['cycle']:<6} {r['charge_capacity']:<11.4f} {r['discharge_capacity']:<11.4f} "
+              f"{peaks[0]:<11} {peaks[1]:<11} {overpot:<12}")
+
+    print()
+
+
+def export_dqdv_csv(grid, results, output_file):
+    """Export dQ/dV curves on the common voltage grid to CSV"""
+    header = ['voltage_v']
+    columns = [grid]
+    for r in results:
+        for name in ('charge', 'discharge'):
+            header += [f"c{r['cycle']}_{name}_ah", f"c{r['cycle']}_{name}_dqdv"]
+            columns += [r[f'{name}_q'], r[f'{name}_dqdv']]
+    np.savetxt(output_file, np.column_stack(columns), delimiter=',',
+               header=','.join(header), comments='', fmt='%.6g')
+    print(f"📊 dQ/dV curves exported to: {output_file}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="dQ/dV analysis for minismush battery tests")
+    parser.add_argument('database', help="battery_test_*.db file")
+    parser.add_argument('--bin-width', type=float, default=0.005, help="Voltage bin width in V")
+    parser.add_argument('--window', type=int, default=5, help="Smoothing window in grid points")
+    parser.add_argument('--workers', type=int, default=None, help="Process pool size")
+    parser.add_argument('--no-cache', action='store_true', help="Ignore and do not write the result cache")
+    parser.add_argument('--csv', help="Export curves to this CSV file")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.database):
+        print(f"❌ Database file not found: {args.database}")
+        sys.exit(1)
+
+    grid, results = analyze_dqdv(args.database, args.bin_width, args.window,
+                                 args.workers, use_cache=not args.no_cache)
+    if not results:
+        print("No voltage data found")
+        sys.exit(1)
+
+    print_dqdv_summary(grid, results)
+    if args.csv:
+        export_dqdv_csv(grid, results, args.csv)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Energy and Efficiency Analysis Tool
+
+Integrates voltage_v/current_a over unix_timestamp with the trapezoidal rule to
+get per-step and per-cycle Ah and Wh, then derives coulombic and energy
+efficiency for every cycle. The file is read once and all integration is
+vectorized with NumPy.
+
+Usage:
+    python energy_analysis.py battery_test_*.db|battery_test_*.columns [--csv out.csv]
+
+Requirements:
+    - numpy
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+
+import numpy as np
+
+
+def load_series(path):
+    """Read time (ms), voltage, current, cycle and step in a single pass"""
+    if os.path.isdir(path):
+        from columnar_archive import ColumnarArchive
+        archive = ColumnarArchive(path)
+        return {
+            'time_ms': np.asarray(archive.column('time_ms')),
+            'voltage': np.asarray(archive.column('voltage_v')),
+            'current': np.asarray(archive.column('current_a')),
+            'cycle': np.asarray(archive.column('cycle'), dtype=np.int64),
+            'step': np.asarray(archive.column('step'), dtype=np.int64),
+        }
+
+    conn = sqlite3.connect(path)
+    try:
+        rows = conn.execute("""
+            SELECT unix_timestamp, voltage_v, current_a, cycle, step
+            FROM data ORDER BY id
+        """).fetchall()
+    finally:
+        conn.close()
+
+    table = np.array(rows, dtype=np.float64).reshape(-1, 5)
+    return {
+        'time_ms': table[:, 0],
+        'voltage': table[:, 1],
+        'current': table[:, 2],
+        'cycle': table[:, 3].astype(np.int64),
+        'step': table[:, 4].astype(np.int64),
+    }
+
+
+def integrate_steps(time_ms, voltage, current, cycle, step):
+    """
+    Trapezoidal Ah and Wh for each contiguous step
+
+    Intervals that straddle a step boundary are dropped, matching the server's
+    integrator which restarts step_ah at every step change. Missing (NaN)
+    samples contribute nothing.
+
+    Returns:
+        Dict of per-step arrays: cycle, step, ah, wh, duration_s, points
+    """
+    n = len(time_ms)
+    if n == 0:
+        empty = np.empty(0)
+        return {'cycle': empty.astype(np.int64), 'step': empty.astype(np.int64),
+                'ah': empty, 'wh': empty, 'duration_s': empty, 'points': empty.astype(np.int64)}
+
+    boundary = (np.diff(step) != 0) | (np.diff(cycle) != 0)
+    starts = np.concatenate(([0], np.flatnonzero(boundary) + 1))
+    ends = np.concatenate((starts[1:], [n]))
+
+    # Each interval i (between samples i and i+1) belongs to the run of sample i+1
+    run_of_sample = np.repeat(np.arange(len(starts)), ends - starts)
+    run_of_interval = run_of_sample[1:]
+
+    dt_h = np.diff(time_ms) / 3.6e6
+    current = np.nan_to_num(current)
+    power = current * np.nan_to_num(voltage)
+    seg_ah = (current[1:] + current[:-1]) / 2 * dt_h
+    seg_wh = (power[1:] + power[:-1]) / 2 * dt_h
+    seg_ah[boundary] = 0
+    seg_wh[boundary] = 0
+
+    runs = len(starts)
+    return {
+        'cycle': cycle[starts],
+        'step': step[starts],
+        'ah': np.bincount(run_of_interval, weights=seg_ah, minlength=runs),
+        'wh': np.bincount(run_of_interval, weights=seg_wh, minlength=runs),
+        'duration_s': (time_ms[ends - 1] - time_ms[starts]) / 1000,
+        'points': ends - starts,
+    }
+
+
+def summarize_cycles(steps):
+    """
+    Per-cycle charge/discharge Ah and Wh with coulombic and energy efficiency
+
+    A step counts as charge or discharge by the sign of its integrated Ah.
+    Efficiencies are discharge/charge and NaN when a cycle has no charge.
+    """
+    cycles, inverse = np.unique(steps['cycle'], return_inverse=True)
+    charging = steps['ah'] > 0
+    discharging = steps['ah'] < 0
+    k = len(cycles)
+
+    charge_ah = np.bincount(inverse, weights=np.where(charging, steps['ah'], 0), minlength=k)
+    discharge_ah = np.bincount(inverse, weights=np.where(discharging, -steps['ah'], 0), minlength=k)
+    charge_wh = np.bincount(inverse, weights=np.where(charging, steps['wh'], 0), minlength=k)
+    discharge_wh = np.bincount(inverse, weights=np.where(discharging, -steps['wh'], 0), minlength=k)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        coulombic = np.where(charge_ah > 0, discharge_ah / charge_ah, np.nan)
+        energy = np.where(charge_wh > 0, discharge_wh / charge_wh, np.nan)
+
+    return {
+        'cycle': cycles,
+        'charge_ah': charge_ah,
+        'discharge_ah': discharge_ah,
+        'charge_wh': charge_wh,
+        'discharge_wh': discharge_wh,
+        'coulombic_efficiency': coulombic,
+        'energy_efficiency': energy,
+    }
+
+
+def analyze_energy(path):
+    """Single-pass energy analysis of a test database or columnar archive"""
+    series = load_series(path)
+    steps = integrate_steps(series['time_ms'], series['voltage'], series['current'],
+                            series['cycle'], series['step'])
+    return steps, summarize_cycles(steps)
+
+
+def _pct(value):
+    return f"{value * 100:.2f}" if np.isfinite(value) else "N/A"
+
+
+def print_efficiency_summary(cycles):
+    """Print per-cycle energy and efficiency table"""
+    print("⚡ ENERGY & EFFICIENCY")
+    print("=" * 80)
+    print(f"{'Cycle':<6} {'Chg Ah':<9} {'Dis Ah':<9} {'Chg Wh':<9} {'Dis Wh':<9} {'CE (%)':<8} {'EE (%)':<8}")
+    print("-" * 80)
+
+    for i, cycle in enumerate(cycles['cycle']):
+        print(f"{cycle:<6} {cycles['charge_ah'][i]:<9.4f} {cycles['discharge_ah'][i]:<9.4f} "
+              f"{cycles['charge_wh'][i]:<9.4f} {cycles['discharge_wh'][i]:<9.4f} "
+              f"{_pct(cycles['coulombic_efficiency'][i]):<8} {_pct(cycles['energy_efficiency'][i]):<8}")
+
+    print()
+
+
+def export_efficiency_csv(cycles, output_file):
+    """Export per-cycle energy and efficiency to CSV"""
+    header = list(cycles.keys())
+    np.savetxt(output_file, np.column_stack([cycles[k] for k in header]), delimiter=',',
+               header=','.join(header), comments='', fmt='%.8g')
+    print(f"📊 Efficiency summary exported to: {output_file}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Energy and efficiency analysis for minismush tests")
+    parser.add_argument('database', help="battery_test_*.db file or *.columns archive")
+    parser.add_argument('--csv', help="Export the per-cycle table to this CSV file")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.database):
+        print(f"❌ Database file not found: {args.database}")
+        sys.exit(1)
+
+    _, cycles = analyze_energy(args.database)
+    if len(cycles['cycle']) == 0:
+        print("No data found")
+        sys.exit(1)
+
+    print_efficiency_summary(cycles)
+    if args.csv:
+        export_efficiency_csv(cycles, args.csv)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+HTTP Load Test for a minismush Server
+
+Runs N concurrent clients against a mix of read endpoints while the SMU is
+streaming, then reports throughput, p50/p95/p99 latency and error rate per
+endpoint. The serial ingest rate (minismush_samples_total from /metrics) is
+sampled before and during the load, so a server that starts dropping or
+delaying samples under HTTP load is flagged.
+
+Usage:
+    python load_test.py --clients 20 --duration 30
+    python load_test.py --clients 50 --rate 2 --mix status=4,ch1=2,analysis=1,smu_state=1
+    python load_test.py --mix "GET:/data/ch2?points=2000=3,status=1"
+
+Endpoint names for --mix (or GET:/path=weight for anything else; a GET: entry
+needs its =weight, since a path ending in a number like ?limit=1000 would
+otherwise be read as path ?limit with weight 1000):
+    status       GET /cycler/status
+    ch1          GET /data/ch1?limit=1000
+    ch2          GET /data/ch2?limit=1000
+    analysis     GET /data/analysis?channel=1
+    smu_state    GET /smu/state
+    temperatures GET /smu/get_temperatures   (sends a command to the SMU)
+    metrics      GET /metrics
+
+Requirements:
+    - minismush_client with aiohttp (pip install aiohttp)
+"""
+
+import argparse
+import asyncio
+import math
+import random
+import sys
+import time
+
+from minismush_client import AsyncClient, MinismuSHError, metric_value
+
+ENDPOINTS = {
+    'status': '/cycler/status',
+    'ch1': '/data/ch1?limit=1000',
+    'ch2': '/data/ch2?limit=1000',
+    'analysis': '/data/analysis?channel=1',
+    'smu_state': '/smu/state',
+    'temperatures': '/smu/get_temperatures',
+    'metrics': '/metrics',
+}
+DEFAULT_MIX = 'status=4,ch1=2,analysis=1,smu_state=1'
+INGEST_INTERVAL_S = 1.0   # Seconds between ingest-rate samples
+
+
+def parse_mix(mix):
+    """'name=weight,GET:/path=weight' -> [(label, path, weight)]; a missing weight is 1"""
+    entries = []
+    for item in mix.split(','):
+        # Only a number after the last '=' is a weight; '?limit=1000' belongs to the path
+        name, _, weight = item.rpartition('=')
+        try:
+            weight = float(weight)
+        except ValueError:
+            name, weight = item, 1.0
+        if name.startswith('GET:'):
+            path = name[4:]
+        elif name in ENDPOINTS:
+            path = ENDPOINTS[name]
+        else:
+            raise ValueError(f"Unknown endpoint '{name}' (use one of {', '.join(ENDPOINTS)} or GET:/path)")
+        entries.append((name, path, weight))
+    return entries
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+async def client_loop(client, mix, rate, deadline, results):
+    """One virtual client: weighted-random requests, paced at `rate` per second (0 = back to back)"""
+    labels = [m[0] for m in mix]
+    paths = {m[0]: m[1] for m in mix}
+    weights = [m[2] for m in mix]
+    # Stagger paced clients so they do not fire in lockstep
+    next_send = time.perf_counter() + (random.random() / rate if rate else 0)
+    while True:
+        if rate:
+            delay = next_send - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            next_send += 1 / rate
+        if time.perf_counter() >= deadline:
+            return
+        label = random.choices(labels, weights)[0]
+        started = time.perf_counter()
+        try:
+            await client.get(paths[label], expect_json=paths[label] != '/metrics')
+            ok = True
+        except MinismuSHError:
+            ok = False
+        results.setdefault(label, []).append((time.perf_counter() - started, ok))
+
+
+async def ingest_rates(client, channel, stop, rates):
+    """Append (elapsed_s, samples_per_s) every INGEST_INTERVAL_S until `stop` is set"""
+    last = None
+    while not stop.is_set():
+        try:
+            samples = metric_value(await client.get_metrics(), 'minismush_samples_total', 0, channel=channel)
+            now = time.perf_counter()
+            if last:
+                rates.append((now, (samples - last[1]) / (now - last[0])))
+            last = (now, samples)
+        except MinismuSHError:
+            pass
+        try:
+            await asyncio.wait_for(stop.wait(), INGEST_INTERVAL_S)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def measure_baseline(client, channel, seconds):
+    """Mean ingest rate over `seconds` with no load"""
+    stop = asyncio.Event()
+    rates = []
+    task = asyncio.create_task(ingest_rates(client, channel, stop, rates))
+    await asyncio.sleep(seconds)
+    stop.set()
+    await task
+    return sum(r for _, r in rates) / len(rates) if rates else 0.0
+
+
+async def run(args, mix):
+    async with AsyncClient(args.url, timeout=args.timeout, max_connections=args.clients + 1) as monitor:
+        try:
+            await monitor.get('/metrics', expect_json=False)
+        except MinismuSHError as e:
+            print(f"❌ Server not reachable: {e}")
+            return 1
+
+        print(f"Measuring ingest rate on channel {args.channel} for {args.baseline:g} s...")
+        baseline = await measure_baseline(monitor, args.channel, args.baseline)
+        if baseline <= 0:
+            print("⚠️  No samples are arriving; start streaming to test ingest under load")
+        else:
+            print(f"✓ Baseline ingest: {baseline:.0f} samples/s")
+
+        print(f"Running {args.clients} clients for {args.duration:g} s "
+              f"({'%g req/s each' % args.rate if args.rate else 'back to back'})...")
+        results = {}
+        stop = asyncio.Event()
+        rates = []
+        rate_task = asyncio.create_task(ingest_rates(monitor, args.channel, stop, rates))
+        started = time.perf_counter()
+        deadline = started + args.duration
+        async with AsyncClient(args.url, timeout=args.timeout, max_connections=args.clients) as client:
+            await asyncio.gather(*(client_loop(client, mix, args.rate, deadline, results)
+                                   for _ in range(args.clients)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await rate_task
+        metrics = await monitor.get_metrics()
+
+    report(results, elapsed)
+    return report_ingest(baseline, [r for _, r in rates], metrics, args.ingest_tolerance)
+
+
+def report(results, elapsed):
+    width = max([14] + [len(label) for label in results])
+    print(f"\n{'endpoint':<{width}} {'requests':>9} {'req/s':>8} {'errors':>7} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    everything = []
+    for label in sorted(results):
+        everything.extend(results[label])
+        print_row(label, results[label], elapsed, width)
+    print_row('total', everything, elapsed, width)
+
+
+def print_row(label, samples, elapsed, width):
+    latencies = sorted(t * 1000 for t, _ in samples)
+    errors = sum(1 for _, ok in samples if not ok)
+    error_pct = 100 * errors / len(samples) if samples else 0
+    print(f"{label:<{width}} {len(samples):>9} {len(samples) / elapsed:>8.1f} {error_pct:>6.1f}% "
+          f"{percentile(latencies, 50):>8.1f} {percentile(latencies, 95):>8.1f} "
+          f"{percentile(latencies, 99):>8.1f} {latencies[-1] if latencies else 0:>8.1f}")
+
+
+def report_ingest(baseline, rates, metrics, tolerance):
+    """Print the ingest comparison; returns the exit status"""
+    lag_p99 = metric_value(metrics, 'minismush_event_loop_lag_seconds', 0, stat='p99') * 1000
+    lag_max = metric_value(metrics, 'minismush_event_loop_lag_seconds', 0, stat='max') * 1000
+    print(f"\nEvent-loop lag (last window): p99 {lag_p99:.1f} ms, max {lag_max:.1f} ms")
+    if baseline <= 0 or not rates:
+        print("Ingest: not measured (no samples arriving)")
+        return 0
+    mean = sum(rates) / len(rates)
+    low = min(rates)
+    change = (mean - baseline) / baseline
+    print(f"Ingest under load: mean {mean:.0f} samples/s ({change:+.1%} vs baseline), lowest 1 s {low:.0f}")
+    if change < -tolerance:
+        print(f"❌ Serial ingest dropped more than {tolerance:.0%} under HTTP load")
+        return 1
+    print("✓ Serial ingest held up under load")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent HTTP load test for a minismush server")
+    parser.add_argument('--url', default='http://localhost:3000', help="Server URL")
+    parser.add_argument('--clients', type=int, default=10, help="Concurrent clients (default: 10)")
+    parser.add_argument('--rate', type=float, default=0,
+                        help="Requests per second per client (default: 0 = back to back)")
+    parser.add_argument('--duration', type=float, default=30, help="Load duration, seconds (default: 30)")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f"Endpoint weights, name=weight or GET:/path=weight (default: {DEFAULT_MIX})")
+    parser.add_argument('--channel', type=int, default=1, help="Channel whose ingest rate is watched")
+    parser.add_argument('--baseline', type=float, default=5, help="Seconds of unloaded ingest measurement")
+    parser.add_argument('--ingest-tolerance', type=float, default=0.05,
+                        help="Allowed fractional drop in ingest rate (default: 0.05)")
+    parser.add_argument('--timeout', type=float, default=10, help="Per-request timeout, seconds")
+    args = parser.parse_args()
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    try:
+        sys.exit(asyncio.run(run(args, mix)))
+    except MinismuSHError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
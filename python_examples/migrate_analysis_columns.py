@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Migrate Battery Test Databases to Typed Analysis Columns
+
+Databases written before data_format_version 1.1 store the cycler's step
+analysis as a JSON object in the `notes` column of every data row, e.g.
+
+    {"voltageTrend":0.0012,"currentStability":0.004,"stepAvgVoltage":3.71,
+     "stepAvgCurrent":0.02,"dataPointsInStep":1520}
+
+This tool moves those values into typed columns (voltage_trend,
+current_stability, step_avg_voltage, step_avg_current, data_points_in_step),
+clears the JSON from `notes`, sets data_format_version to 1.1 and VACUUMs the
+file so the space is returned. Running it again on a migrated database is a
+no-op. Rows whose notes are not analysis JSON keep their notes.
+
+Usage:
+    python migrate_analysis_columns.py battery_test_*.db [--no-vacuum]
+
+Requirements:
+    - Standard Python libraries only
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+
+DATA_FORMAT_VERSION = '1.1'
+BATCH_ROWS = 10000
+
+# Typed column -> key in the legacy notes JSON
+ANALYSIS_COLUMNS = {
+    'voltage_trend': ('REAL', 'voltageTrend'),
+    'current_stability': ('REAL', 'currentStability'),
+    'step_avg_voltage': ('REAL', 'stepAvgVoltage'),
+    'step_avg_current': ('REAL', 'stepAvgCurrent'),
+    'data_points_in_step': ('INTEGER', 'dataPointsInStep'),
+}
+
+
+def parse_analysis(notes):
+    """Analysis values from a legacy notes JSON string, or None if notes is something else"""
+    if not notes or not notes.startswith('{'):
+        return None
+    try:
+        analysis = json.loads(notes)
+    except ValueError:
+        return None
+    if not isinstance(analysis, dict) or 'voltageTrend' not in analysis:
+        return None
+    return tuple(analysis.get(key) for _, key in ANALYSIS_COLUMNS.values())
+
+
+def migrate(db_path, vacuum=True):
+    """
+    Rewrite one database in place
+
+    Returns:
+        Number of rows whose analysis JSON was converted
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(data)")}
+            for name, (sql_type, _) in ANALYSIS_COLUMNS.items():
+                if name not in existing:
+                    conn.execute(f"ALTER TABLE data ADD COLUMN {name} {sql_type}")
+
+        assignments = ', '.join(f"{name} = ?" for name in ANALYSIS_COLUMNS)
+        update = f"UPDATE data SET {assignments}, notes = NULL WHERE id = ?"
+        converted = 0
+        last_id = 0
+        while True:
+            rows = conn.execute(
+                "SELECT id, notes FROM data WHERE id > ? AND notes LIKE '{%' ORDER BY id LIMIT ?",
+                (last_id, BATCH_ROWS)).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            updates = []
+            for row_id, notes in rows:
+                values = parse_analysis(notes)
+                if values is not None:
+                    updates.append(values + (row_id,))
+            with conn:
+                conn.executemany(update, updates)
+            converted += len(updates)
+
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO metadata (key, value) VALUES ('data_format_version', ?)",
+                         (DATA_FORMAT_VERSION,))
+        if vacuum and converted:
+            conn.execute("VACUUM")
+        return converted
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move per-row analysis JSON into typed columns")
+    parser.add_argument('databases', nargs='+', help="battery_test_*.db files")
+    parser.add_argument('--no-vacuum', action='store_true', help="Skip VACUUM after migrating")
+    args = parser.parse_args()
+
+    failed = False
+    for db_path in args.databases:
+        if not os.path.isfile(db_path):
+            print(f"❌ Database file not found: {db_path}")
+            failed = True
+            continue
+        size_before = os.path.getsize(db_path)
+        try:
+            converted = migrate(db_path, vacuum=not args.no_vacuum)
+        except sqlite3.Error as e:
+            print(f"❌ {db_path}: {e}")
+            failed = True
+            continue
+        size_after = os.path.getsize(db_path)
+        print(f"✓ {db_path}: {converted} rows converted, "
+              f"{size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
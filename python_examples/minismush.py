@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+minismush Command-Line Tool
+
+Everyday server operations from a shell, cron job or script:
+
+Usage:
+    minismush status [--channel 1] [--json]
+    minismush watch [--channel 1] [--interval 2]
+    minismush start steps.json --channel 1 --cycles 10 [--sink columnar] [--name "cell A"]
+    minismush stop [--channel 1]
+    minismush tail [--channel 1] [-n 20] [-f]
+    minismush export battery_test_2024-01-15T10-30-45-123Z_ch1 [-o test.csv]
+    minismush analyze battery_test_*.db | battery_test_*.columns | <testId>
+    minismush --version
+
+The server URL is --url or $MINISMUSH_URL (default: http://localhost:3000).
+To install it as a command, link it onto your PATH:
+    ln -s "$(pwd)/minismush.py" ~/.local/bin/minismush
+
+Startup is kept short for cron and shell loops: the BatteryCycler and SMUClient
+calls share one minismush_client.HTTPSession (a keep-alive http.client
+connection that watch and tail reuse for every poll), so requests is never
+imported, and sqlite3 and numpy are only imported by analyze.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from minismush_client import BatteryCycler, HTTPSession, MinismuSHError, SMUClient, __version__
+
+DEFAULT_URL = 'http://localhost:3000'
+DATA_DIR = './data/battery'
+
+
+def format_duration(seconds) -> str:
+    seconds = int(seconds or 0)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def describe_step(step) -> str:
+    if not step:
+        return '-'
+    if 'cycle' in step:
+        return f"cycle {step['cycle']}"
+    mode = step.get('mode', '?')
+    if mode == 'cc':
+        return f"cc {step.get('current', 0) * 1000:g} mA"
+    if mode == 'cv':
+        return f"cv {step.get('voltage', 0):g} V"
+    return mode
+
+
+def status_lines(status, channel=None):
+    """One line per cycler from a /cycler/status response"""
+    channels = status.get('channels', {})
+    if channel is not None:
+        channels = {str(channel): status}
+    if not channels:
+        return ['No cyclers']
+    lines = []
+    for ch, s in sorted(channels.items(), key=lambda kv: int(kv[0])):
+        if not s.get('isRunning'):
+            lines.append(f"ch{ch}  stopped")
+            continue
+        state = 'paused' if s.get('isPaused') else 'running'
+        cycles = s.get('totalCycles') or '∞'
+        lines.append(
+            f"ch{ch}  {state:<7}  cycle {s.get('currentCycle')}/{cycles}  "
+            f"step {s.get('currentStepIndex')}/{s.get('totalSteps')} {describe_step(s.get('currentStep')):<12}  "
+            f"step {format_duration(s.get('stepTime'))}  total {format_duration(s.get('totalTime'))}  "
+            f"{(s.get('totalAh') or 0) * 1000:.3f} mAh  {s.get('testId') or '(not logged)'}")
+    return lines
+
+
+def cmd_status(args):
+    status = args.cycler.get_status(args.channel)
+    if args.json:
+        print(json.dumps(status, indent=2))
+    else:
+        print('\n'.join(status_lines(status, args.channel)))
+    return 0
+
+
+def cmd_watch(args):
+    clear = '\033[H\033[J' if sys.stdout.isatty() else ''
+    while True:
+        try:
+            lines = status_lines(args.cycler.get_status(args.channel), args.channel)
+        except MinismuSHError as e:
+            lines = [f"❌ {e}"]
+        print(f"{clear}{time.strftime('%H:%M:%S')}  {args.url}\n" + '\n'.join(lines), flush=True)
+        time.sleep(args.interval)
+
+
+def load_steps(path):
+    """Step file: a JSON list of steps, or {"steps": [...], "cycles": N, "metadata": {...}}"""
+    with open(path) as f:
+        definition = json.load(f)
+    if isinstance(definition, list):
+        definition = {'steps': definition}
+    if not isinstance(definition.get('steps'), list):
+        raise ValueError(f"{path}: expected a list of steps or an object with 'steps'")
+    return definition
+
+
+def cmd_start(args):
+    try:
+        definition = load_steps(args.steps)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    metadata = dict(definition.get('metadata', {}))
+    if args.name:
+        metadata['testName'] = args.name
+    cycles = args.cycles if args.cycles is not None else definition.get('cycles', 1)
+    result = args.cycler.start_test(args.channel, definition['steps'], cycles=cycles,
+                                    enable_logging=not args.no_log, metadata=metadata, sink=args.sink)
+    print(f"✓ Started {result.get('testId') or 'unlogged test'} on channel {result.get('channel')} "
+          f"({result.get('totalSteps')} steps, {result.get('cycles')} cycles)")
+    return 0
+
+
+def cmd_stop(args):
+    print(f"✓ {args.cycler.stop_test(args.channel).get('message')}")
+    return 0
+
+
+def print_point(p):
+    print(f"{p['seq']:>10}  {p['time_ms']:.0f}  {p['voltage_V']:.6f} V  {p['current_A'] * 1000:+.6f} mA", flush=True)
+
+
+def cmd_tail(args):
+    data = args.smu.get_channel_data(args.channel, limit=args.lines)
+    points = data.get('data', [])
+    for p in points:
+        print_point(p)
+    last = points[-1] if points else None
+    last_seq = last['seq'] if last else data.get('next_seq', 0) - 1
+    server = data.get('server')
+    while args.follow:
+        time.sleep(args.interval)
+        # Everything at or after the last printed time, found by binary search on the server;
+        # with nothing printed yet the buffer was empty at the last poll, so all of it is new
+        if last:
+            data = args.smu.get_channel_data(args.channel, start=last['time_ms'])
+        else:
+            data = args.smu.get_channel_data(args.channel)
+        if data.get('server') != server:
+            # A restarted server numbers samples from 0 again; follow it from its newest samples
+            print("... server restarted, following the new instance", flush=True)
+            server = data.get('server')
+            data = args.smu.get_channel_data(args.channel, limit=args.lines)
+            restarted = data.get('data', [])
+            last = None
+            last_seq = restarted[0]['seq'] - 1 if restarted else data.get('next_seq', 0) - 1
+        points = [p for p in data.get('data', []) if p['seq'] > last_seq]
+        if points and points[0]['seq'] > last_seq + 1:
+            print(f"... {points[0]['seq'] - last_seq - 1} samples overwritten before they were read")
+        for p in points:
+            print_point(p)
+        if points:
+            last = points[-1]
+            last_seq = last['seq']
+
+
+def cmd_export(args):
+    output = args.cycler.export_csv(args.test_id, args.output)
+    print(f"✓ Exported {args.test_id} to {output}")
+    return 0
+
+
+def resolve_test_path(name, data_dir):
+    """A database/archive path, or a testId looked up in data_dir (.db first, then .columns)"""
+    if os.path.exists(name):
+        return name
+    for suffix in ('.db', '.columns'):
+        candidate = os.path.join(data_dir, name + suffix)
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def cmd_analyze(args):
+    path = resolve_test_path(args.test, args.data_dir)
+    if path is None:
+        print(f"❌ No database or archive found for '{args.test}' (looked in {args.data_dir})")
+        return 1
+    from analyze_battery_data import analyze
+    return 0 if analyze(path) else 1
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='minismush', description="minismush server command-line tool")
+    parser.add_argument('--version', action='version', version=f'minismush {__version__}')
+    parser.add_argument('--url', default=os.environ.get('MINISMUSH_URL', DEFAULT_URL),
+                        help="Server URL (default: $MINISMUSH_URL or http://localhost:3000)")
+    parser.add_argument('--timeout', type=float, default=10, help="Request timeout, seconds")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    p = commands.add_parser('status', help="Cycler status of every channel")
+    p.add_argument('--channel', type=int)
+    p.add_argument('--json', action='store_true', help="Print the raw status response")
+    p.set_defaults(func=cmd_status)
+
+    p = commands.add_parser('watch', help="Refresh the status until interrupted")
+    p.add_argument('--channel', type=int)
+    p.add_argument('--interval', type=float, default=2, help="Seconds between refreshes (default: 2)")
+    p.set_defaults(func=cmd_watch)
+
+    p = commands.add_parser('start', help="Start a test from a JSON step file")
+    p.add_argument('steps', help="Step file: list of steps, or {\"steps\", \"cycles\", \"metadata\"}")
+    p.add_argument('--channel', type=int, default=1)
+    p.add_argument('--cycles', type=int, help="Number of cycles, 0 = until stopped (default: file or 1)")
+    p.add_argument('--sink', choices=('sqlite', 'columnar'), default='sqlite')
+    p.add_argument('--name', help="Test name stored in the metadata")
+    p.add_argument('--no-log', action='store_true', help="Do not log the test")
+    p.set_defaults(func=cmd_start)
+
+    p = commands.add_parser('stop', help="Stop a running test")
+    p.add_argument('--channel', type=int)
+    p.set_defaults(func=cmd_stop)
+
+    p = commands.add_parser('tail', help="Print the latest samples of a channel")
+    p.add_argument('--channel', type=int, default=1)
+    p.add_argument('-n', '--lines', type=int, default=20, help="Samples to print first (default: 20)")
+    p.add_argument('-f', '--follow', action='store_true', help="Keep printing new samples")
+    p.add_argument('--interval', type=float, default=0.5, help="Poll interval with --follow (default: 0.5)")
+    p.set_defaults(func=cmd_tail)
+
+    p = commands.add_parser('export', help="Download a logged test as CSV")
+    p.add_argument('test_id')
+    p.add_argument('-o', '--output', help="Output file (default: <test_id>.csv)")
+    p.set_defaults(func=cmd_export)
+
+    p = commands.add_parser('analyze', help="Analyze a test database, archive or testId")
+    p.add_argument('test', help="battery_test_*.db, battery_test_*.columns or a testId")
+    p.add_argument('--data-dir', default=DATA_DIR, help=f"Where testIds are looked up (default: {DATA_DIR})")
+    p.set_defaults(func=cmd_analyze)
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    if '://' not in args.url:
+        args.url = f'http://{args.url}'
+    session = HTTPSession()
+    args.cycler = BatteryCycler(args.url, args.timeout, session=session)
+    args.smu = SMUClient(args.url, args.timeout, session=session)
+    try:
+        sys.exit(args.func(args))
+    except MinismuSHError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        sys.exit(0)
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -9,7 +9,7 @@ Author: minismush team
 License: MIT
 
 Usage:
-    from minismush_client import SMUClient, BatteryCycler
+    from minismush_client import SMUClient, BatteryCycler, StreamSubscriber, AsyncClient, Recorder
     
     # Create client
     smu = SMUClient("http://localhost:3000")
@@ -25,10 +25,18 @@ Usage:
     cycler.start_test(channel=1, steps=steps, cycles=10)
 """
 
-import requests
 import json
+import os
+import re
 import time
-from typing import Optional, Dict, List, Union, Any
+from typing import Optional, Dict, List, Tuple, Union, Any
+
+# requests, asyncio and numpy are imported where they are used, so importing this
+# module (e.g. for the minismush command-line tool) stays fast
+
+__version__ = '0.4.0'
+
+CHANNEL_FIELDS = ('time_ms', 'voltage_V', 'current_A')
 
 
 class MinismuSHError(Exception):
@@ -46,39 +54,199 @@ class CyclerError(MinismuSHError):
     pass
 
 
+class HTTPResponse:
+    """Response of an HTTPSession request (the parts of requests.Response the clients use)"""
+
+    def __init__(self, response, url: str, stream: bool):
+        self._response = response
+        self.url = url
+        self.status_code = response.status
+        self.reason = response.reason
+        self.headers = response.headers  # Case-insensitive, like requests
+        self._content = None if stream else response.read()
+
+    @property
+    def content(self) -> bytes:
+        if self._content is None:
+            self._content = self._response.read()
+        return self._content
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size: int = 64 * 1024):
+        """Yield the body in chunks without holding it in memory (stream=True)"""
+        if self._content is not None:
+            yield self._content
+            return
+        while True:
+            chunk = self._response.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            import http.client
+            raise http.client.HTTPException(f"{self.status_code} {self.reason} for url: {self.url}")
+
+    def close(self):
+        self._response.read()  # Drain, so the connection can carry the next request
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class HTTPSession:
+    """
+    Standard-library stand-in for requests.Session
+
+    Keeps one http.client connection alive across requests (reopened once if
+    the server closed an idle socket) and imports nothing beyond the standard
+    library, so short-lived scripts such as the minismush command start fast.
+    Pass it to a client with SMUClient(url, session=HTTPSession()).
+    """
+
+    def __init__(self):
+        import http.client
+        self.errors = (OSError, http.client.HTTPException)  # What _request reports as request failures
+        self._conn = None
+        self._origin = None
+        self._reused = False
+
+    def request(self, method: str, url: str, json: Optional[Dict] = None, timeout: Optional[float] = None,
+                stream: bool = False) -> HTTPResponse:
+        import http.client
+        import json as json_module  # The json argument shadows the module, as in requests
+        from urllib.parse import urlsplit
+        parts = urlsplit(url)
+        origin = (parts.scheme, parts.hostname, parts.port)
+        path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        body = json_module.dumps(json).encode() if json is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        if origin != self._origin:
+            self.close()
+            self._origin = origin
+        while True:
+            if self._conn is None:
+                cls = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+                self._conn = cls(parts.hostname or 'localhost', parts.port, timeout=timeout)
+                self._reused = False
+            elif self._conn.sock is not None:
+                self._conn.sock.settimeout(timeout)
+            try:
+                self._conn.request(method, path, body, headers)
+                response = self._conn.getresponse()
+                break
+            except (ConnectionResetError, BrokenPipeError, http.client.RemoteDisconnected):
+                # The server closes idle keep-alive sockets; retry once on a fresh one
+                retry = self._reused
+                self.close()
+                if not retry:
+                    raise
+            except (OSError, http.client.HTTPException):
+                self.close()
+                raise
+        self._reused = True
+        return HTTPResponse(response, url, stream)
+
+    def get(self, url: str, **kwargs) -> HTTPResponse:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, json: Optional[Dict] = None, **kwargs) -> HTTPResponse:
+        return self.request('POST', url, json=json, **kwargs)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def _error_message(response) -> str:
+    """The server's JSON 'error' for a failed response, or the HTTP reason"""
+    try:
+        body = response.json()
+    except ValueError:
+        body = None
+    error = body.get('error') if isinstance(body, dict) else None
+    return error or response.reason
+
+
 class BaseClient:
     """Base client with common HTTP functionality"""
     
-    def __init__(self, base_url: str = "http://localhost:3000", timeout: int = 10):
+    def __init__(self, base_url: str = "http://localhost:3000", timeout: int = 10,
+                 session: Optional[Any] = None):
+        """
+        Args:
+            base_url: Server URL
+            timeout: Request timeout in seconds
+            session: requests.Session-like object (default: a new requests.Session;
+                     HTTPSession() avoids importing requests)
+        """
         self.base_url = base_url.rstrip('/')
         self.timeout = timeout
-        self.session = requests.Session()
+        if session is None:
+            import requests
+            session = requests.Session()
+        self.session = session
+        errors = getattr(session, 'errors', None)
+        if errors is None:
+            import requests
+            errors = requests.exceptions.RequestException
+        self._session_errors = errors
     
     def _request(self, method: str, endpoint: str, data: Optional[Dict] = None, 
-                expect_json: bool = True) -> Union[Dict, str, None]:
-        """Make HTTP request with error handling"""
+                expect_json: bool = True, timeout: Optional[float] = None, raw: bool = False,
+                stream: bool = False, error: type = None) -> Any:
+        """
+        Make HTTP request with error handling
+        
+        Args:
+            timeout: Seconds for this request (default: the client's timeout)
+            raw: Return the response object (headers, content, iter_content) instead of its body
+            stream: Do not read the body up front (with raw=True; close the response when done)
+            error: MinismuSHError subclass raised for HTTP error responses
+        """
         url = f"{self.base_url}{endpoint}"
+        timeout = self.timeout if timeout is None else timeout
         
         try:
             if method.upper() == 'GET':
-                response = self.session.get(url, timeout=self.timeout)
+                response = self.session.get(url, timeout=timeout, stream=stream)
             elif method.upper() == 'POST':
-                response = self.session.post(url, json=data, timeout=self.timeout)
+                response = self.session.post(url, json=data, timeout=timeout, stream=stream)
             else:
                 raise ValueError(f"Unsupported method: {method}")
             
-            response.raise_for_status()
+            if response.status_code >= 400:
+                message = f"Request failed: {response.status_code} {_error_message(response)}"
+                response.close()
+                raise (error or MinismuSHError)(message)
             
-            if expect_json:
+            if raw:
+                return response
+            elif expect_json:
                 return response.json()
             else:
                 return response.text
                 
-        except requests.exceptions.RequestException as e:
+        except self._session_errors as e:
             raise MinismuSHError(f"Request failed: {e}")
         except json.JSONDecodeError:
             raise MinismuSHError(f"Invalid JSON response from {url}")
     
+    def close(self):
+        """Close the session's connections"""
+        self.session.close()
+    
     def test_connection(self) -> bool:
         """Test if server is accessible"""
         try:
@@ -96,8 +264,9 @@ class SMUClient(BaseClient):
     result = smu.raw_request('GET', '/your/endpoint', expect_json=False)
     """
     
-    def __init__(self, base_url: str = "http://localhost:3000", timeout: int = 10):
-        super().__init__(base_url, timeout)
+    def __init__(self, base_url: str = "http://localhost:3000", timeout: int = 10,
+                 session: Optional[Any] = None):
+        super().__init__(base_url, timeout, session)
     
     def raw_request(self, method: str, endpoint: str, data: Optional[Dict] = None, 
                    expect_json: bool = True) -> Union[Dict, str, None]:
@@ -181,7 +350,41 @@ class SMUClient(BaseClient):
                 'timestamp': result.get('timestamp')
             }
         raise SMUError(f"Invalid measurement response: {result}")
-    
+
+    def sweep(self, channel: int, start: float, stop: float, points: int,
+              dwell: float = 0.0, mode: str = 'voltage', as_numpy: bool = True) -> Dict[str, Any]:
+        """
+        Sweep the source from start to stop, measuring at each point (IV curve)
+
+        One POST /smu/sweep: the server pipelines the setpoint and measurement
+        commands over serial, so there is no per-point HTTP round trip. The
+        source is left at stop.
+
+        Args:
+            channel: Channel number (1 or 2)
+            start: First setpoint (V for 'voltage', A for 'current')
+            stop: Last setpoint
+            points: Number of evenly spaced setpoints, including start and stop
+            dwell: Settling time in seconds between setting and measuring
+            mode: 'voltage' (FVMI) or 'current' (FIMV)
+            as_numpy: Return NumPy arrays (default); False returns lists
+
+        Returns:
+            Dict with channel, mode, points, dwell, elapsed_ms and the setpoint,
+            time_ms, voltage_V and current_A columns (current in the /data/chN
+            sign convention)
+        """
+        data = {'channel': channel, 'start': start, 'stop': stop, 'points': points,
+                'dwell': dwell, 'mode': mode}
+        # The request lasts the whole sweep: allow the dwell time on top of the usual timeout
+        result = self._request('POST', '/smu/sweep', data, timeout=self.timeout + points * dwell,
+                               error=SMUError)
+        if as_numpy:
+            import numpy as np
+            for name in ('setpoint', 'time_ms', 'voltage_V', 'current_A'):
+                result[name] = np.asarray(result[name], dtype=float)
+        return result
+
     # Data Streaming
     def start_streaming(self, channel: int) -> Dict:
         """Start continuous data streaming"""
@@ -198,6 +401,175 @@ class SMUClient(BaseClient):
             'rate': rate
         })
     
+    # Channel Data Arrays
+    def get_channel_data(self, channel: int, limit: Optional[int] = None,
+                         offset: Optional[int] = None, points: Optional[int] = None,
+                         method: str = 'lttb', field: str = 'voltage_V',
+                         start: Optional[float] = None, end: Optional[float] = None) -> Dict:
+        """
+        Get buffered channel data from /data/chN
+        
+        Args:
+            channel: Channel number (1 or 2)
+            limit: Number of most recent points to select
+            offset: Number of most recent points to skip
+            points: Decimate the selection to about this many points (server-side)
+            method: Decimation method ('lttb' or 'minmax')
+            field: Field the decimation preserves ('voltage_V' or 'current_A')
+            start: Only samples with time_ms >= start
+            end: Only samples with time_ms < end
+        
+        Returns:
+            Response dictionary with 'data' list of samples
+        """
+        params = {'limit': limit, 'offset': offset, 'start': start, 'end': end}
+        if points:
+            params.update({'points': points, 'method': method, 'field': field})
+        query = '&'.join(f"{k}={v}" for k, v in params.items() if v is not None)
+        return self._request('GET', f'/data/ch{channel}' + (f'?{query}' if query else ''))
+    
+    def get_channel_range(self, channel: int, start: Optional[float] = None,
+                          end: Optional[float] = None, points: Optional[int] = None,
+                          method: str = 'lttb', field: str = 'voltage_V') -> List[Dict]:
+        """
+        Get the buffered samples of a channel in a time_ms window
+        
+        time_ms is host time (Unix ms when the server received the sample) unless the
+        server runs with SAMPLE_CLOCK=device.
+        
+        Args:
+            channel: Channel number (1 or 2)
+            start: Window start in time_ms (inclusive, None for the oldest sample)
+            end: Window end in time_ms (exclusive, None for the newest sample)
+            points: Decimate the window to about this many points (server-side)
+            method: Decimation method ('lttb' or 'minmax')
+            field: Field the decimation preserves ('voltage_V' or 'current_A')
+        
+        Returns:
+            List of sample dictionaries (time_ms, voltage_V, current_A, seq)
+        """
+        return self.get_channel_data(channel, points=points, method=method, field=field,
+                                     start=start, end=end)['data']
+    
+    def get_channel_arrays(self, channel: int, start: Optional[float] = None,
+                           end: Optional[float] = None, limit: Optional[int] = None,
+                           points: Optional[int] = None, method: str = 'lttb',
+                           field: str = 'voltage_V', as_numpy: bool = True,
+                           since: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Get buffered channel samples as columns (one array per field)
+        
+        Requests /data/chN?format=binary, so the selection arrives as packed float64
+        columns that are wrapped with numpy.frombuffer, without per-sample dicts. A
+        server without the binary format answers with JSON, which is converted column
+        by column.
+        
+        Args:
+            channel: Channel number (1 or 2)
+            start: Window start in time_ms (inclusive; host Unix ms by default, see get_channel_range)
+            end: Window end in time_ms (exclusive)
+            limit: Number of most recent points to select
+            points: Decimate the selection to about this many points (server-side)
+            method: Decimation method ('lttb' or 'minmax')
+            field: Field the decimation preserves ('voltage_V' or 'current_A')
+            as_numpy: Return NumPy arrays (default); False returns lists and needs no numpy
+            since: Page forward from this seq: the oldest `limit` samples with seq >= since
+        
+        Returns:
+            Dict with channel, count, first_seq (seq of the first sample; None when
+            decimated), next_seq, server (instance id) and the time_ms, voltage_V and
+            current_A columns
+        """
+        params = {'limit': limit, 'start': start, 'end': end, 'since': since, 'format': 'binary'}
+        if points:
+            params.update({'points': points, 'method': method, 'field': field})
+        query = '&'.join(f"{k}={v}" for k, v in params.items() if v is not None)
+        endpoint = f"/data/ch{channel}?{query}"
+        response = self._request('GET', endpoint, raw=True)
+        
+        headers = response.headers
+        if headers.get('X-Minismush-Layout') == 'columnar-f64le':
+            count = int(headers['X-Minismush-Count'])
+            first_seq = headers.get('X-Minismush-First-Seq')
+            out = {'channel': channel, 'count': count,
+                   'first_seq': int(first_seq) if first_seq is not None else None,
+                   'next_seq': int(headers['X-Minismush-Next-Seq']),
+                   'server': headers.get('X-Minismush-Server')}
+            out.update(unpack_columns(response.content, headers['X-Minismush-Fields'].split(','),
+                                      count, as_numpy))
+            return out
+        
+        # Server without ?format=binary: a JSON list of samples
+        try:
+            result = response.json()
+        except json.JSONDecodeError:
+            raise MinismuSHError(f"Invalid JSON response from {self.base_url}{endpoint}")
+        samples = result['data']
+        out = {'channel': channel, 'count': len(samples),
+               'first_seq': samples[0]['seq'] if samples and 'decimation' not in result else None,
+               'next_seq': result.get('next_seq'), 'server': result.get('server')}
+        if as_numpy:
+            import numpy as np
+            for name in CHANNEL_FIELDS:
+                out[name] = np.fromiter((p[name] for p in samples), dtype=float, count=len(samples))
+        else:
+            for name in CHANNEL_FIELDS:
+                out[name] = [p[name] for p in samples]
+        return out
+    
+    def get_channel_dataframe(self, channel: int, start: Optional[float] = None,
+                              end: Optional[float] = None, limit: Optional[int] = None,
+                              points: Optional[int] = None, method: str = 'lttb',
+                              field: str = 'voltage_V'):
+        """
+        Get buffered channel samples as a pandas DataFrame (requires pandas)
+        
+        Same selection arguments as get_channel_arrays. Columns are time_ms, voltage_V
+        and current_A; the index is the sample seq unless the selection was decimated.
+        """
+        try:
+            import pandas as pd
+        except ImportError:
+            raise MinismuSHError('get_channel_dataframe requires pandas: pip install pandas')
+        arrays = self.get_channel_arrays(channel, start=start, end=end, limit=limit,
+                                         points=points, method=method, field=field)
+        index = None
+        if arrays['first_seq'] is not None:
+            index = pd.RangeIndex(arrays['first_seq'], arrays['first_seq'] + arrays['count'], name='seq')
+        return pd.DataFrame({name: arrays[name] for name in CHANNEL_FIELDS}, index=index, copy=False)
+    
+    def get_cycler_points(self, since: int = 0, limit: Optional[int] = None) -> Dict:
+        """
+        Get recent cycler points by sequence number from /data/cycler
+        
+        Args:
+            since: Oldest seq wanted (clipped to the oldest point the server retains)
+            limit: Maximum number of points
+        
+        Returns:
+            Dict with first_seq (seq of points[0]), next_seq, server and points
+        """
+        query = f'since={since}' + (f'&limit={limit}' if limit else '')
+        return self._request('GET', f'/data/cycler?{query}')
+    
+    def get_data_analysis(self, channel: int = 1, start: Optional[float] = None,
+                          end: Optional[float] = None) -> Dict:
+        """
+        Get summary statistics for a channel buffer from /data/analysis
+        
+        Args:
+            channel: Channel number (1 or 2)
+            start: Window start in time_ms (inclusive; host Unix ms by default, see get_channel_range)
+            end: Window end in time_ms (exclusive)
+        
+        Returns:
+            Dictionary with voltage_range/current_range (min, max, mean, count) over the
+            window, plus the running 'analysis' when no window is given
+        """
+        params = {'channel': channel, 'start': start, 'end': end}
+        query = '&'.join(f"{k}={v}" for k, v in params.items() if v is not None)
+        return self._request('GET', f'/data/analysis?{query}')
+    
     # System Management
     def set_led_brightness(self, brightness: int) -> Dict:
         """Set LED brightness (0-100%)"""
@@ -282,6 +654,18 @@ class SMUClient(BaseClient):
         """Get current logging status"""
         return self._request('GET', '/log_status')
 
+    
+    # Server Health
+    def get_metrics(self) -> Dict[str, List[Tuple[Dict[str, str], float]]]:
+        """
+        Scrape the server's Prometheus /metrics endpoint
+        
+        Returns:
+            Dictionary of metric name -> list of (labels, value); summaries appear as
+            their '_sum' and '_count' series. See parse_metrics() and metric_value().
+        """
+        return parse_metrics(self._request('GET', '/metrics', expect_json=False))
+
 
 class BatteryCycler(BaseClient):
     """
@@ -291,8 +675,9 @@ class BatteryCycler(BaseClient):
     result = cycler.raw_request('GET', '/your/endpoint', expect_json=False)
     """
     
-    def __init__(self, base_url: str = "http://localhost:3000", timeout: int = 10):
-        super().__init__(base_url, timeout)
+    def __init__(self, base_url: str = "http://localhost:3000", timeout: int = 10,
+                 session: Optional[Any] = None):
+        super().__init__(base_url, timeout, session)
     
     def raw_request(self, method: str, endpoint: str, data: Optional[Dict] = None, 
                    expect_json: bool = True) -> Union[Dict, str, None]:
@@ -431,7 +816,9 @@ class BatteryCycler(BaseClient):
                    steps: List[Dict],
                    cycles: int = 1,
                    enable_logging: bool = True,
-                   metadata: Optional[Dict] = None) -> Dict:
+                   metadata: Optional[Dict] = None,
+                   sink: str = 'sqlite',
+                   adaptive_rate: Union[bool, Dict, None] = None) -> Dict:
         """
         Start battery cycling test
         
@@ -441,9 +828,13 @@ class BatteryCycler(BaseClient):
             cycles: Number of cycles to run
             enable_logging: Enable automatic data logging
             metadata: Test metadata dictionary
+            sink: Primary log store, 'sqlite' (.db) or 'columnar' (.columns/)
+            adaptive_rate: True to let the server adapt the streaming rate to the step
+                           state, a dict of policy overrides, or False for a fixed rate
+                           (None: the server's CYCLER_ADAPTIVE_RATE default)
         
         Returns:
-            Start response dictionary
+            Start response dictionary (includes testId for export_csv)
         """
         if metadata is None:
             metadata = {}
@@ -456,8 +847,11 @@ class BatteryCycler(BaseClient):
             'cycles': cycles,
             'enableLogging': enable_logging,
             'metadata': metadata,
-            'steps': steps
+            'steps': steps,
+            'sink': sink
         }
+        if adaptive_rate is not None:
+            request_data['adaptiveRate'] = adaptive_rate
         
         result = self._request('POST', '/cycler/start', request_data)
         if not result or not result.get('success'):
@@ -465,39 +859,110 @@ class BatteryCycler(BaseClient):
         
         return result
     
-    def stop_test(self) -> Dict:
-        """Stop running cycling test"""
-        return self._request('POST', '/cycler/stop')
+    @staticmethod
+    def _channel_data(channel: Optional[int]) -> Dict:
+        return {'channel': channel} if channel is not None else {}
+    
+    def stop_test(self, channel: Optional[int] = None) -> Dict:
+        """Stop the cycling test on a channel (may be omitted when only one cycler is running)"""
+        return self._request('POST', '/cycler/stop', self._channel_data(channel))
     
-    def pause_test(self) -> Dict:
-        """Pause running cycling test"""
-        return self._request('POST', '/cycler/pause')
+    def pause_test(self, channel: Optional[int] = None) -> Dict:
+        """Pause the cycling test on a channel"""
+        return self._request('POST', '/cycler/pause', self._channel_data(channel))
+    
+    def resume_test(self, channel: Optional[int] = None) -> Dict:
+        """Resume the paused cycling test on a channel"""
+        return self._request('POST', '/cycler/resume', self._channel_data(channel))
+
+    def list_checkpoints(self) -> List[Dict]:
+        """List checkpointed tests that were left running by a server crash or shutdown"""
+        return self._request('GET', '/cycler/checkpoints').get('checkpoints', [])
+
+    def recover(self, channel: Optional[int] = None, test_id: Optional[str] = None) -> List[Dict]:
+        """
+        Resume tests from their checkpoints after a server restart
+
+        The server checkpoints each running test's cycle, step, step time and Ah
+        integrators every few seconds (CYCLER_CHECKPOINT_MS) and at every step change.
+        Recovery continues the same step with those values and appends to the
+        test's existing store.
+
+        Args:
+            channel: Only recover the test on this channel
+            test_id: Only recover this test (default: every checkpointed test)
+
+        Returns:
+            Status of each recovered cycler
+        """
+        data = self._channel_data(channel)
+        if test_id is not None:
+            data['testId'] = test_id
+        try:
+            return self._request('POST', '/cycler/recover', data).get('recovered', [])
+        except MinismuSHError as e:
+            raise CyclerError(f"Recovery failed: {e}")
+
+    def get_status(self, channel: Optional[int] = None) -> Dict:
+        """
+        Get cycling status
+        
+        Each SMU channel runs its own cycler. With a channel, returns that channel's
+        status; without one, the only (running) cycler's status. Either way the
+        response has a 'channels' dict with the status of every cycler.
+        """
+        endpoint = '/cycler/status' if channel is None else f'/cycler/status?channel={channel}'
+        return self._request('GET', endpoint)
     
-    def resume_test(self) -> Dict:
-        """Resume paused cycling test"""
-        return self._request('POST', '/cycler/resume')
+    def list_tests(self) -> List[Dict]:
+        """List logged tests (testId and which stores exist for each)"""
+        return self._request('GET', '/cycler/tests').get('tests', [])
     
-    def get_status(self) -> Dict:
-        """Get current cycling status"""
-        return self._request('GET', '/cycler/status')
+    def export_csv(self, test_id: str, output_file: Optional[str] = None) -> str:
+        """
+        Export a logged test as CSV, derived on the server from its SQLite or columnar store
+        
+        The response is streamed to disk in chunks, so long tests are never held in memory.
+        
+        Args:
+            test_id: Test id (e.g. 'battery_test_2024-01-15T10-30-45-123Z', see get_status/list_tests)
+            output_file: Destination path (default: '<test_id>.csv')
+        
+        Returns:
+            Path of the written CSV file
+        """
+        if output_file is None:
+            output_file = f"{test_id}.csv"
+        response = self._request('GET', f'/cycler/export/{test_id}', raw=True, stream=True,
+                                 error=CyclerError)
+        try:
+            with response, open(output_file, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    f.write(chunk)
+        except self._session_errors as e:
+            raise MinismuSHError(f"Request failed: {e}")
+        
+        return output_file
     
-    def is_running(self) -> bool:
-        """Check if cycler is currently running"""
+    def is_running(self, channel: Optional[int] = None) -> bool:
+        """Check if a cycler (on the given channel, or any) is currently running"""
         try:
-            status = self.get_status()
+            status = self.get_status(channel)
             return status.get('isRunning', False)
         except MinismuSHError:
             return False
     
     def wait_for_completion(self, 
                            check_interval: int = 30,
-                           progress_callback: Optional[callable] = None) -> Dict:
+                           progress_callback: Optional[callable] = None,
+                           channel: Optional[int] = None) -> Dict:
         """
         Wait for cycling test to complete
         
         Args:
             check_interval: Status check interval (seconds)
             progress_callback: Optional callback for progress updates
+            channel: Channel to wait for (default: the only running cycler)
         
         Returns:
             Final status dictionary
@@ -506,7 +971,7 @@ class BatteryCycler(BaseClient):
         
         try:
             while True:
-                status = self.get_status()
+                status = self.get_status(channel)
                 
                 if not status.get('isRunning'):
                     print("\n✓ Test completed!")
@@ -534,10 +999,762 @@ class BatteryCycler(BaseClient):
         except KeyboardInterrupt:
             print("\n\nMonitoring stopped by user.")
             print("Note: Test continues running on server.")
-            return self.get_status()
+            return self.get_status(channel)
 
 
 # Convenience Functions
+_METRIC_LINE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)')
+_METRIC_LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+
+def parse_metrics(text: str) -> Dict[str, List[Tuple[Dict[str, str], float]]]:
+    """
+    Parse Prometheus text exposition format
+    
+    Args:
+        text: Body of a /metrics response
+    
+    Returns:
+        Dictionary of metric name -> list of (labels, value)
+    """
+    metrics = {}
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        match = _METRIC_LINE.match(line)
+        if not match:
+            continue
+        name, label_text, value = match.groups()
+        labels = {}
+        for key, raw in _METRIC_LABEL.findall(label_text or ''):
+            labels[key] = re.sub(r'\\(.)', lambda m: '\n' if m.group(1) == 'n' else m.group(1), raw)
+        metrics.setdefault(name, []).append((labels, float(value)))
+    return metrics
+
+
+def metric_value(metrics: Dict[str, List[Tuple[Dict[str, str], float]]], name: str,
+                 default: Optional[float] = None, **labels) -> Optional[float]:
+    """
+    Sum of a metric's samples whose labels include the given ones
+    
+    Args:
+        metrics: Result of parse_metrics() / SMUClient.get_metrics()
+        name: Metric name, e.g. 'minismush_samples_total'
+        default: Returned when no sample matches
+        **labels: Label filters, e.g. channel=1
+    
+    Returns:
+        Summed value, or default
+    """
+    wanted = {k: str(v) for k, v in labels.items()}
+    values = [value for sample_labels, value in metrics.get(name, [])
+              if all(sample_labels.get(k) == v for k, v in wanted.items())]
+    return sum(values) if values else default
+
+
+def decode_frame(frame: Dict, as_numpy: bool = False) -> Dict[str, Any]:
+    """
+    Unpack a coalesced sample frame from the server's 'frame' Socket.IO event
+
+    Frames carry `count` samples per field in a columnar little-endian float64
+    payload (time_ms, voltage_V, current_A).
+
+    Args:
+        frame: Event payload (channel, first_seq, count, fields, data)
+        as_numpy: Return NumPy arrays instead of lists (requires numpy)
+
+    Returns:
+        Dict with channel, first_seq, count and one sequence per field
+    """
+    count = frame['count']
+    out = {'channel': frame['channel'], 'first_seq': frame['first_seq'], 'count': count}
+    out.update(unpack_columns(bytes(frame['data']), frame['fields'], count, as_numpy))
+    return out
+
+
+def unpack_columns(data: bytes, fields: List[str], count: int, as_numpy: bool = False) -> Dict[str, Any]:
+    """
+    Split a 'columnar-f64le' payload (count values of each field, one field after
+    another) into {field: column}; NumPy columns are views of `data`, not copies
+    """
+    out = {}
+    if as_numpy:
+        import numpy as np
+        packed = np.frombuffer(data, dtype='<f8')
+        for f, field in enumerate(fields):
+            out[field] = packed[f * count:(f + 1) * count]
+        return out
+
+    import sys
+    from array import array
+    packed = array('d')
+    packed.frombytes(data)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    for f, field in enumerate(fields):
+        out[field] = packed[f * count:(f + 1) * count].tolist()
+    return out
+
+
+class StreamSubscriber:
+    """
+    Live sample subscriber using the server's coalesced Socket.IO frames
+
+    Requires python-socketio (pip install "python-socketio[client]").
+
+    Example:
+        def on_frame(frame):
+            print(frame['channel'], frame['count'], frame['voltage_V'][-1])
+
+        sub = StreamSubscriber("http://localhost:3000", channels=[1], max_rate=5)
+        sub.on_frame = on_frame
+        sub.connect()
+        sub.wait()
+    """
+
+    def __init__(self, base_url: str = "http://localhost:3000", channels: Optional[List[int]] = None,
+                 max_rate: Optional[float] = None, cycler: bool = False, raw: bool = False,
+                 as_numpy: bool = False):
+        """
+        Args:
+            base_url: Server URL
+            channels: Channels to receive frames for (default [1, 2])
+            max_rate: Maximum frames per second per channel (default: every server tick)
+            cycler: Also receive batched cycler points ('cycler_frame')
+            raw: Also receive raw serial text ('data')
+            as_numpy: Decode frames to NumPy arrays
+        """
+        self.base_url = base_url.rstrip('/')
+        self.channels = channels if channels is not None else [1, 2]
+        self.max_rate = max_rate
+        self.cycler = cycler
+        self.raw = raw
+        self.as_numpy = as_numpy
+
+        self.on_frame = None           # callable(decoded_frame)
+        self.on_cycler_points = None   # callable(list_of_points)
+        self.on_cycler_frame = None    # callable(first_seq, list_of_points)
+        self.on_raw = None             # callable(text)
+        self.on_gap = None             # callable(channel, expected_seq, received_seq)
+        self.on_connect = None         # callable(), after every (re)connect and subscribe
+
+        self.frames_received = 0
+        self.samples_received = 0
+        self.gaps = 0
+        self._next_seq = {}
+        self._sio = None
+
+    def _subscription(self) -> Dict:
+        options = {'channels': self.channels, 'cycler': self.cycler, 'raw': self.raw}
+        if self.max_rate:
+            options['maxRate'] = self.max_rate
+        return options
+
+    def _handle_frame(self, frame: Dict):
+        decoded = decode_frame(frame, as_numpy=self.as_numpy)
+        channel, first_seq = decoded['channel'], decoded['first_seq']
+        expected = self._next_seq.get(channel)
+        if expected is not None and first_seq > expected:
+            self.gaps += 1
+            if self.on_gap:
+                self.on_gap(channel, expected, first_seq)
+        self._next_seq[channel] = first_seq + decoded['count']
+        self.frames_received += 1
+        self.samples_received += decoded['count']
+        if self.on_frame:
+            self.on_frame(decoded)
+
+    def _handle_connect(self):
+        self._sio.emit('subscribe', self._subscription())
+        if self.on_connect:
+            self.on_connect()
+
+    def _handle_cycler_frame(self, msg: Dict):
+        if self.on_cycler_points:
+            self.on_cycler_points(msg['points'])
+        if self.on_cycler_frame:
+            self.on_cycler_frame(msg['first_seq'], msg['points'])
+
+    def connect(self):
+        """Connect and subscribe (re-subscribes automatically after reconnects)"""
+        try:
+            import socketio
+        except ImportError:
+            raise MinismuSHError('StreamSubscriber requires python-socketio: pip install "python-socketio[client]"')
+
+        self._sio = socketio.Client()
+        self._sio.on('connect', self._handle_connect)
+        self._sio.on('frame', self._handle_frame)
+        self._sio.on('cycler_frame', self._handle_cycler_frame)
+        self._sio.on('data', lambda text: self.on_raw and self.on_raw(text))
+        self._sio.connect(self.base_url)
+
+    def wait(self):
+        """Block until disconnected"""
+        if self._sio:
+            self._sio.wait()
+
+    def disconnect(self):
+        if self._sio:
+            self._sio.disconnect()
+            self._sio = None
+
+
+class AsyncClient:
+    """
+    asyncio HTTP client for issuing many concurrent requests (dashboards, load tests)
+
+    Requires aiohttp (pip install aiohttp). Errors raise MinismuSHError like the
+    synchronous clients.
+
+    Example:
+        async with AsyncClient("http://localhost:3000") as client:
+            status, ch1 = await asyncio.gather(
+                client.get('/cycler/status'),
+                client.get('/data/ch1?limit=1000'))
+    """
+
+    def __init__(self, base_url: str = "http://localhost:3000", timeout: float = 10,
+                 max_connections: int = 100):
+        """
+        Args:
+            base_url: Server URL
+            timeout: Total timeout per request, seconds
+            max_connections: Connection pool size
+        """
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._session = None
+
+    async def open(self):
+        try:
+            import aiohttp
+        except ImportError:
+            raise MinismuSHError('AsyncClient requires aiohttp: pip install aiohttp')
+        self._aiohttp = aiohttp
+        self._session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            connector=aiohttp.TCPConnector(limit=self.max_connections))
+
+    async def close(self):
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def request(self, method: str, endpoint: str, data: Optional[Dict] = None,
+                      expect_json: bool = True) -> Union[Dict, str, None]:
+        """Make an HTTP request; returns parsed JSON or text"""
+        import asyncio
+        if self._session is None:
+            await self.open()
+        url = f"{self.base_url}{endpoint}"
+        try:
+            async with self._session.request(method.upper(), url, json=data) as response:
+                response.raise_for_status()
+                if expect_json:
+                    return await response.json(content_type=None)
+                return await response.text()
+        except self._aiohttp.ClientError as e:
+            raise MinismuSHError(f"Request failed: {e}")
+        except asyncio.TimeoutError:
+            raise MinismuSHError(f"Request timed out: {url}")
+        except json.JSONDecodeError:
+            raise MinismuSHError(f"Invalid JSON response from {url}")
+
+    async def get(self, endpoint: str, expect_json: bool = True) -> Union[Dict, str, None]:
+        return await self.request('GET', endpoint, expect_json=expect_json)
+
+    async def post(self, endpoint: str, data: Optional[Dict] = None) -> Union[Dict, str, None]:
+        return await self.request('POST', endpoint, data)
+
+    async def get_metrics(self) -> Dict[str, List[Tuple[Dict[str, str], float]]]:
+        """Scrape /metrics (see SMUClient.get_metrics)"""
+        return parse_metrics(await self.get('/metrics', expect_json=False))
+
+
+RECORDER_STEP_TYPES = ['cc', 'cv', 'ocv', 'rest', 'unknown']   # Same codes as columnar archives
+CYCLER_POINT_FIELDS = ('timestamp', 'channel', 'cycle', 'step', 'step_type', 'step_time', 'total_time',
+                       'voltage', 'current', 'step_ah', 'cycle_ah', 'total_ah')
+
+RECORDER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    server TEXT PRIMARY KEY,
+    url TEXT,
+    started_at TEXT
+);
+CREATE TABLE IF NOT EXISTS samples (
+    server TEXT,
+    channel INTEGER,
+    seq INTEGER,
+    time_ms REAL,
+    voltage_v REAL,
+    current_a REAL,
+    PRIMARY KEY (server, channel, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS cycler_points (
+    server TEXT,
+    seq INTEGER,
+    timestamp TEXT,
+    channel INTEGER,
+    cycle INTEGER,
+    step INTEGER,
+    step_type TEXT,
+    step_time_s REAL,
+    total_time_s REAL,
+    voltage_v REAL,
+    current_a REAL,
+    step_ah REAL,
+    cycle_ah REAL,
+    total_ah REAL,
+    PRIMARY KEY (server, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS gaps (
+    server TEXT,
+    stream TEXT,
+    from_seq INTEGER,
+    to_seq INTEGER,
+    detected_at TEXT
+);
+"""
+
+
+def _utc_now() -> str:
+    from datetime import datetime, timezone
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+def _as_list(column) -> list:
+    return column.tolist() if hasattr(column, 'tolist') else list(column)
+
+
+class SqliteRecordStore:
+    """Recorder store in one SQLite database (WAL; one transaction per commit)"""
+
+    def __init__(self, path: str):
+        import sqlite3
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(RECORDER_SCHEMA)
+
+    def open_run(self, server: str, url: str) -> Dict[str, int]:
+        """Register a server instance; returns the next seq to record for each stream"""
+        self.conn.execute('INSERT OR IGNORE INTO runs (server, url, started_at) VALUES (?, ?, ?)',
+                          (server, url, _utc_now()))
+        positions = {f'ch{channel}': seq + 1 for channel, seq in self.conn.execute(
+            'SELECT channel, MAX(seq) FROM samples WHERE server = ? GROUP BY channel', (server,))}
+        last = self.conn.execute('SELECT MAX(seq) FROM cycler_points WHERE server = ?', (server,)).fetchone()[0]
+        if last is not None:
+            positions['cycler'] = last + 1
+        return positions
+
+    def write_samples(self, server: str, channel: int, first_seq: int, columns: Dict[str, Any]):
+        times = _as_list(columns['time_ms'])
+        self.conn.executemany(
+            'INSERT OR IGNORE INTO samples (server, channel, seq, time_ms, voltage_v, current_a) VALUES (?, ?, ?, ?, ?, ?)',
+            zip([server] * len(times), [channel] * len(times), range(first_seq, first_seq + len(times)),
+                times, _as_list(columns['voltage_V']), _as_list(columns['current_A'])))
+
+    def write_cycler(self, server: str, first_seq: int, points: List[Dict]):
+        self.conn.executemany(
+            'INSERT OR IGNORE INTO cycler_points (server, seq, ' +
+            'timestamp, channel, cycle, step, step_type, step_time_s, total_time_s, voltage_v, current_a, '
+            'step_ah, cycle_ah, total_ah) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            ((server, first_seq + i) + tuple(p.get(f) for f in CYCLER_POINT_FIELDS) for i, p in enumerate(points)))
+
+    def write_gap(self, server: str, stream: str, from_seq: int, to_seq: int):
+        self.conn.execute('INSERT INTO gaps (server, stream, from_seq, to_seq, detected_at) VALUES (?, ?, ?, ?, ?)',
+                          (server, stream, from_seq, to_seq, _utc_now()))
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+class ColumnarRecordStore:
+    """
+    Recorder store as append-only little-endian column files (requires numpy)
+
+    Layout:
+        recorder.json             - Runs (server instances), gaps, column dtypes, step type codes
+        <server>/ch1/seq.i8 ...   - seq, time_ms, voltage_V, current_A
+        <server>/cycler/seq.i8 ...- seq, time_ms and the numeric cycler fields; step_type.u1
+
+    Columns are truncated to the shortest one when a stream is reopened, so rows
+    cut short by a crash are dropped.
+    """
+
+    STREAM_COLUMNS = {
+        'channel': [('seq', 'i8'), ('time_ms', 'f8'), ('voltage_V', 'f8'), ('current_A', 'f8')],
+        'cycler': [('seq', 'i8'), ('time_ms', 'f8'), ('channel', 'i4'), ('cycle', 'i4'), ('step', 'i4'),
+                   ('step_type', 'u1'), ('step_time', 'f8'), ('total_time', 'f8'), ('voltage', 'f8'),
+                   ('current', 'f8'), ('step_ah', 'f8'), ('cycle_ah', 'f8'), ('total_ah', 'f8')],
+    }
+
+    def __init__(self, path: str):
+        import numpy as np
+        self.np = np
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.meta_file = os.path.join(path, 'recorder.json')
+        if os.path.exists(self.meta_file):
+            with open(self.meta_file) as f:
+                self.meta = json.load(f)
+        else:
+            self.meta = {
+                'format': 'minismush-recorder',
+                'version': 1,
+                'byte_order': 'little',
+                'streams': self.STREAM_COLUMNS,
+                'step_types': RECORDER_STEP_TYPES,
+                'runs': [],
+                'gaps': [],
+            }
+        self.meta_dirty = True
+        self.files = {}   # (server, stream) -> {column: file}
+
+    def _open_stream(self, server: str, stream: str) -> Dict:
+        key = (server, stream)
+        if key not in self.files:
+            directory = os.path.join(self.path, server, stream)
+            os.makedirs(directory, exist_ok=True)
+            columns = self.STREAM_COLUMNS['cycler' if stream == 'cycler' else 'channel']
+            names = [os.path.join(directory, f'{name}.{dtype}') for name, dtype in columns]
+            rows = min((os.path.getsize(n) // int(d[1:]) if os.path.exists(n) else 0)
+                       for n, (_, d) in zip(names, columns))
+            handles = {}
+            for name, (column, dtype) in zip(names, columns):
+                with open(name, 'ab') as f:
+                    f.truncate(rows * int(dtype[1:]))
+                handles[column] = open(name, 'ab')
+            self.files[key] = handles
+        return self.files[key]
+
+    def _last_seq(self, server: str, stream: str) -> Optional[int]:
+        name = os.path.join(self.path, server, stream, 'seq.i8')
+        self._open_stream(server, stream)
+        size = os.path.getsize(name)
+        if size < 8:
+            return None
+        with open(name, 'rb') as f:
+            f.seek(size - 8)
+            return int(self.np.frombuffer(f.read(8), dtype='<i8')[0])
+
+    def open_run(self, server: str, url: str) -> Dict[str, int]:
+        if not any(run['server'] == server for run in self.meta['runs']):
+            self.meta['runs'].append({'server': server, 'url': url, 'started_at': _utc_now()})
+            self.meta_dirty = True
+        positions = {}
+        run_dir = os.path.join(self.path, server)
+        for stream in (sorted(os.listdir(run_dir)) if os.path.isdir(run_dir) else []):
+            last = self._last_seq(server, stream)
+            if last is not None:
+                positions[stream] = last + 1
+        return positions
+
+    def _append(self, handles: Dict, columns: List[Tuple[str, str]], values: Dict[str, Any]):
+        for name, dtype in columns:
+            handles[name].write(self.np.ascontiguousarray(values[name], dtype='<' + dtype).tobytes())
+
+    def write_samples(self, server: str, channel: int, first_seq: int, columns: Dict[str, Any]):
+        count = len(columns['time_ms'])
+        values = dict(columns, seq=self.np.arange(first_seq, first_seq + count))
+        self._append(self._open_stream(server, f'ch{channel}'), self.STREAM_COLUMNS['channel'], values)
+
+    def write_cycler(self, server: str, first_seq: int, points: List[Dict]):
+        from datetime import datetime
+        values = {name: [p.get(name) for p in points] for name, _ in self.STREAM_COLUMNS['cycler'][2:]}
+        values['seq'] = self.np.arange(first_seq, first_seq + len(points))
+        values['time_ms'] = [datetime.fromisoformat(p['timestamp'].replace('Z', '+00:00')).timestamp() * 1000
+                             for p in points]
+        values['step_type'] = [RECORDER_STEP_TYPES.index(t) if t in RECORDER_STEP_TYPES else len(RECORDER_STEP_TYPES) - 1
+                               for t in values['step_type']]
+        for name, dtype in self.STREAM_COLUMNS['cycler']:
+            if dtype == 'f8':
+                values[name] = [v if v is not None else float('nan') for v in values[name]]
+        self._append(self._open_stream(server, 'cycler'), self.STREAM_COLUMNS['cycler'], values)
+
+    def write_gap(self, server: str, stream: str, from_seq: int, to_seq: int):
+        self.meta['gaps'].append({'server': server, 'stream': stream, 'from_seq': from_seq,
+                                  'to_seq': to_seq, 'detected_at': _utc_now()})
+        self.meta_dirty = True
+
+    def commit(self):
+        for handles in self.files.values():
+            for f in handles.values():
+                f.flush()
+        if self.meta_dirty:
+            tmp = self.meta_file + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(self.meta, f, indent=2)
+            os.replace(tmp, self.meta_file)
+            self.meta_dirty = False
+
+    def close(self):
+        self.commit()
+        for handles in self.files.values():
+            for f in handles.values():
+                f.close()
+        self.files = {}
+
+
+class Recorder:
+    """
+    Durable local copy of a server's channel samples and cycler points
+
+    Writes to a local SQLite database (WAL, one transaction per batch) or a
+    columnar directory (store='columnar', needs numpy), so a workstation keeps
+    its own copy of live data. Samples are tracked by the server's sequence
+    numbers: a jump means samples were missed, and they are backfilled from
+    /data/chN?since= (or /data/cycler?since=) while the server still holds
+    them; anything already overwritten is recorded in the store's gaps. A
+    restarted server (new instance id, seq from 0) starts a new run.
+
+    Memory stays bounded: backfill pages are at most batch_size samples and the
+    live event queue holds at most max_pending frames (the Socket.IO thread
+    waits when it is full; the server's ring buffer covers the delay).
+
+    Example:
+        with Recorder("http://localhost:3000", "bench1.db") as rec:
+            rec.sync()          # one incremental pull, e.g. from cron
+            rec.run_live()      # or follow the live stream until stop()/Ctrl-C
+    """
+
+    def __init__(self, base_url: str = "http://localhost:3000", path: str = "minismush_record.db",
+                 channels: Optional[List[int]] = None, cycler: bool = True, store: str = 'sqlite',
+                 batch_size: int = 20000, flush_interval: float = 1.0, max_pending: int = 1000,
+                 timeout: int = 10):
+        """
+        Args:
+            base_url: Server URL
+            path: SQLite database file, or directory for store='columnar'
+            channels: Channels to record (default [1, 2])
+            cycler: Also record cycler points
+            store: 'sqlite' or 'columnar'
+            batch_size: Rows per transaction / backfill page
+            flush_interval: Maximum seconds between commits while live
+            max_pending: Live frames queued before the receiving thread waits
+            timeout: HTTP timeout, seconds
+        """
+        if store not in ('sqlite', 'columnar'):
+            raise ValueError("store must be 'sqlite' or 'columnar'")
+        self.base_url = base_url.rstrip('/')
+        self.channels = channels if channels is not None else [1, 2]
+        self.cycler = cycler
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.smu = SMUClient(base_url, timeout)
+        self.store = SqliteRecordStore(path) if store == 'sqlite' else ColumnarRecordStore(path)
+        self.as_numpy = store == 'columnar'
+
+        import queue
+        import threading
+        self._events = queue.Queue(maxsize=max_pending)
+        self._stopping = threading.Event()
+        self.server = None      # Instance id of the server being recorded
+        self._next = {}         # stream ('ch1', 'ch2', 'cycler') -> next seq to record
+        self._pending = 0       # Rows written since the last commit
+
+        self.samples_written = 0
+        self.cycler_points_written = 0
+        self.backfilled = 0
+        self.gaps = 0
+        self.errors = 0
+        self.last_error = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stats(self) -> Dict:
+        return {'server': self.server, 'positions': dict(self._next),
+                'samples_written': self.samples_written, 'cycler_points_written': self.cycler_points_written,
+                'backfilled': self.backfilled, 'gaps': self.gaps, 'errors': self.errors,
+                'last_error': self.last_error}
+
+    def _check_server(self, server: str) -> bool:
+        """Switch runs when the server instance changes; True if positions were reset"""
+        if server == self.server:
+            return False
+        self.server = server
+        self._next = self.store.open_run(server, self.base_url)
+        return True
+
+    def _write_samples(self, channel: int, first_seq: int, columns: Dict[str, Any]):
+        count = len(columns['time_ms'])
+        self.store.write_samples(self.server, channel, first_seq, columns)
+        self._next[f'ch{channel}'] = first_seq + count
+        self.samples_written += count
+        self._pending += count
+
+    def _write_cycler(self, first_seq: int, points: List[Dict]):
+        self.store.write_cycler(self.server, first_seq, points)
+        self._next['cycler'] = first_seq + len(points)
+        self.cycler_points_written += len(points)
+        self._pending += len(points)
+
+    def _gap(self, stream: str, from_seq: int, to_seq: int):
+        self.store.write_gap(self.server, stream, from_seq, to_seq)
+        self.gaps += 1
+
+    def _pull_channel(self, channel: int, until: Optional[int] = None) -> int:
+        """Record samples from the stream position up to `until` (default: everything retained)"""
+        stream = f'ch{channel}'
+        pulled = 0
+        while True:
+            since = self._next.get(stream)
+            limit = self.batch_size if until is None or since is None else min(self.batch_size, until - since)
+            if limit <= 0:
+                return pulled
+            page = self.smu.get_channel_arrays(channel, since=since or 0, limit=limit,
+                                               as_numpy=self.as_numpy)
+            if self._check_server(page['server']):
+                continue
+            # Nothing recorded yet in this run: start at the oldest retained sample
+            if since is not None and page['first_seq'] > since:
+                self._gap(stream, since, page['first_seq'])
+            if page['count']:
+                self._write_samples(channel, page['first_seq'], page)
+                pulled += page['count']
+            else:
+                self._next[stream] = page['first_seq']
+            if self._pending >= self.batch_size:
+                self.flush()
+            if page['count'] < limit:
+                return pulled
+
+    def _pull_cycler(self, until: Optional[int] = None) -> int:
+        pulled = 0
+        while True:
+            since = self._next.get('cycler')
+            limit = self.batch_size if until is None or since is None else min(self.batch_size, until - since)
+            if limit <= 0:
+                return pulled
+            page = self.smu.get_cycler_points(since=since or 0, limit=limit)
+            if self._check_server(page['server']):
+                continue
+            if since is not None and page['first_seq'] > since:
+                self._gap('cycler', since, page['first_seq'])
+            if page['points']:
+                self._write_cycler(page['first_seq'], page['points'])
+                pulled += len(page['points'])
+            else:
+                self._next['cycler'] = page['first_seq']
+            if self._pending >= self.batch_size:
+                self.flush()
+            if len(page['points']) < limit:
+                return pulled
+
+    def sync(self) -> int:
+        """Pull everything new from every stream and commit; returns the rows recorded"""
+        pulled = sum(self._pull_channel(ch) for ch in self.channels)
+        if self.cycler:
+            pulled += self._pull_cycler()
+        self.flush()
+        return pulled
+
+    def run_sync(self, interval: float = 1.0):
+        """Call sync() every `interval` seconds until stop(); server errors are retried"""
+        self._stopping.clear()
+        while not self._stopping.is_set():
+            try:
+                self.sync()
+            except MinismuSHError as e:
+                self.errors += 1
+                self.last_error = str(e)
+            self._stopping.wait(interval)
+
+    def _handle_frame(self, frame: Dict):
+        channel, first_seq, count = frame['channel'], frame['first_seq'], frame['count']
+        stream = f'ch{channel}'
+        expected = self._next.get(stream)
+        if expected is None or first_seq > expected:
+            # Missed samples (or not synced yet): backfill up to this frame from the server buffer
+            self.backfilled += self._pull_channel(channel, until=first_seq)
+            expected = self._next.get(stream, first_seq)
+        skip = expected - first_seq
+        if skip >= count:
+            return
+        columns = {name: frame[name][skip:] for name in CHANNEL_FIELDS}
+        self._write_samples(channel, first_seq + skip, columns)
+
+    def _handle_cycler_frame(self, first_seq: int, points: List[Dict]):
+        expected = self._next.get('cycler')
+        if expected is None or first_seq > expected:
+            self.backfilled += self._pull_cycler(until=first_seq)
+            expected = self._next.get('cycler', first_seq)
+        skip = expected - first_seq
+        if skip < len(points):
+            self._write_cycler(first_seq + skip, points[skip:])
+
+    def _handle(self, event: Tuple):
+        kind = event[0]
+        if kind == 'sync':
+            self.sync()
+        elif kind == 'frame':
+            self._handle_frame(event[1])
+        elif kind == 'cycler':
+            self._handle_cycler_frame(event[1], event[2])
+
+    def run_live(self):
+        """
+        Record the live Socket.IO stream until stop() (requires python-socketio)
+
+        Every (re)connect first syncs, so data from while the connection was
+        down is backfilled before new frames are written.
+        """
+        import queue
+        sub = StreamSubscriber(self.base_url, channels=self.channels, cycler=self.cycler,
+                               as_numpy=self.as_numpy)
+        sub.on_frame = lambda frame: self._events.put(('frame', frame))
+        sub.on_cycler_frame = lambda first_seq, points: self._events.put(('cycler', first_seq, points))
+        sub.on_connect = lambda: self._events.put(('sync',))
+        self._stopping.clear()
+        sub.connect()
+        last_flush = time.monotonic()
+        try:
+            while not self._stopping.is_set():
+                try:
+                    self._handle(self._events.get(timeout=self.flush_interval))
+                except queue.Empty:
+                    pass
+                except MinismuSHError as e:
+                    # Backfill failed (server unreachable); the next frame or reconnect retries it
+                    self.errors += 1
+                    self.last_error = str(e)
+                if self._pending >= self.batch_size or time.monotonic() - last_flush >= self.flush_interval:
+                    self.flush()
+                    last_flush = time.monotonic()
+        finally:
+            sub.disconnect()
+            self.flush()
+
+    def stop(self):
+        """Make run_live()/run_sync() return (safe from another thread)"""
+        self._stopping.set()
+
+    def flush(self):
+        """Commit everything written so far"""
+        self.store.commit()
+        self._pending = 0
+
+    def close(self):
+        self.store.close()
+
+
 def create_smu_client(base_url: str = "http://localhost:3000") -> SMUClient:
     """Create and test SMU client connection"""
     client = SMUClient(base_url)
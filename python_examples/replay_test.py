@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Replay a Recorded Battery Test Through the Server
+
+Feeds the voltage/current stream of a battery_test_*.db (or its CSV export)
+into the server's serial ingest path through a pseudo-terminal, at one or more
+speeds, and starts the recorded step sequence on the cycler for each run. For
+every speed it reports whether the cycler made the same step transitions at the
+same test times as the recording, the sample rate achieved, samples the server
+did not parse, and the mean per-sample ingest latency (from /metrics).
+
+The server must run on this machine (it opens the pty) and, for any speed other
+than 1, with SAMPLE_CLOCK=device so sample timestamps come from the replayed
+lines instead of the host clock:
+
+    SAMPLE_CLOCK=device node nodeforwarder.js 3000
+
+Usage:
+    python replay_test.py battery_test_20250101_120000_ch1.db --speeds 1,10,100,1000
+    python replay_test.py export.csv --steps steps.json --cycles 3 --speeds 100
+    python replay_test.py battery_test.db --speeds 1000 --max-samples 50000
+
+The tool points the server at the pty with POST /reconnect; reconnect the real
+device afterwards (or pass --no-connect and open the printed path yourself).
+
+Requirements:
+    - minismush_client (requests)
+    - A POSIX system (pty)
+"""
+
+import argparse
+import csv
+import json
+import os
+import pty
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import tty
+from datetime import datetime
+
+from minismush_client import (MinismuSHError, create_cycler_client, create_smu_client,
+                              metric_value)
+
+STATUS_INTERVAL_S = 0.5   # Wall time between cycler status checks during a run
+SETTLE_S = 0.5            # Wait for the server to ingest the tail of a run
+
+
+def load_recording(path, steps_file=None, cycles=None):
+    """
+    Load the sample stream and step sequence of a recorded test
+
+    Returns:
+        Dictionary with per-sample lists (time_ms, voltage, current, total_time,
+        cycle, step) and the test's steps, cycles and channel
+    """
+    rec = {'time_ms': [], 'voltage': [], 'current': [], 'total_time': [], 'cycle': [], 'step': [],
+           'steps': None, 'cycles': cycles, 'channel': 1}
+
+    if path.endswith('.csv'):
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                if not row['Voltage_V'] or not row['Current_A']:
+                    continue
+                ts = datetime.fromisoformat(row['Timestamp'].replace('Z', '+00:00'))
+                rec['time_ms'].append(ts.timestamp() * 1000)
+                rec['voltage'].append(float(row['Voltage_V']))
+                rec['current'].append(float(row['Current_A']))
+                rec['total_time'].append(float(row['Total_Time_s']))
+                rec['cycle'].append(int(row['Cycle']))
+                rec['step'].append(int(row['Step']))
+    else:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            metadata = dict(conn.execute("SELECT key, value FROM metadata").fetchall())
+            if metadata.get('step_definition'):
+                rec['steps'] = json.loads(metadata['step_definition'])
+            if rec['cycles'] is None and metadata.get('total_cycles'):
+                rec['cycles'] = int(metadata['total_cycles'])
+            if metadata.get('channel'):
+                rec['channel'] = int(metadata['channel'])
+            for row in conn.execute("""
+                SELECT unix_timestamp, voltage_v, current_a, total_time_s, cycle, step
+                FROM data WHERE voltage_v IS NOT NULL AND current_a IS NOT NULL ORDER BY id
+            """):
+                for key, value in zip(('time_ms', 'voltage', 'current', 'total_time', 'cycle', 'step'), row):
+                    rec[key].append(value)
+        finally:
+            conn.close()
+
+    if steps_file:
+        with open(steps_file) as f:
+            rec['steps'] = json.load(f)
+    if not rec['steps']:
+        raise ValueError("No step definition in the recording; pass --steps steps.json")
+    if rec['cycles'] is None:
+        rec['cycles'] = 1
+    if len(rec['time_ms']) < 2:
+        raise ValueError("Recording has fewer than two samples")
+    return rec
+
+
+def step_transitions(cycles, steps, total_times, origin=None):
+    """(cycle, step, total time - origin) at the first row of every step; origin defaults to the first row"""
+    out = []
+    last = None
+    t0 = origin if origin is not None else (total_times[0] if total_times else 0)
+    for cycle, step, total_time in zip(cycles, steps, total_times):
+        if (cycle, step) != last:
+            out.append((cycle, step, total_time - t0))
+            last = (cycle, step)
+    return out
+
+
+def compare_transitions(recorded, replayed, tolerance_s, span_s):
+    """
+    Compare two transition lists over the first span_s seconds
+
+    Returns:
+        List of human-readable differences (empty when they match)
+    """
+    recorded = [t for t in recorded if t[2] <= span_s]
+    replayed = [t for t in replayed if t[2] <= span_s]
+    diffs = []
+    for n, (rec, rep) in enumerate(zip(recorded, replayed)):
+        if rec[:2] != rep[:2]:
+            diffs.append(f"transition {n}: recorded cycle {rec[0]} step {rec[1]}, "
+                         f"replay cycle {rep[0]} step {rep[1]}")
+            break
+        if abs(rec[2] - rep[2]) > tolerance_s:
+            diffs.append(f"transition {n} (cycle {rec[0]} step {rec[1]}): "
+                         f"recorded at {rec[2]:.2f} s, replay at {rep[2]:.2f} s")
+    if len(recorded) != len(replayed):
+        diffs.append(f"{len(recorded)} recorded transitions, {len(replayed)} in replay")
+    return diffs
+
+
+def read_export(path):
+    """Transitions of a /cycler/export CSV, relative to the cycler's start"""
+    cycles, steps, total_times = [], [], []
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            cycles.append(int(row['Cycle']))
+            steps.append(int(row['Step']))
+            total_times.append(float(row['Total_Time_s']))
+    # The replay starts the cycler exactly at the first sample's time, so the origin is 0
+    return step_transitions(cycles, steps, total_times, origin=0), (total_times[-1] if total_times else 0)
+
+
+class PtyLink:
+    """Pseudo-terminal the server opens as its serial port"""
+
+    def __init__(self):
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)  # No echo or newline translation
+        self.path = os.ttyname(self.slave)
+        self.command_bytes = 0
+        self.running = True
+        self.reader = threading.Thread(target=self._drain, daemon=True)
+        self.reader.start()
+
+    # Commands the cycler sends to the "SMU" are read and discarded
+    def _drain(self):
+        while self.running:
+            try:
+                data = os.read(self.master, 65536)
+            except OSError:
+                return
+            self.command_bytes += len(data)
+
+    def write(self, data):
+        view = memoryview(data)
+        while view:
+            written = os.write(self.master, view)
+            view = view[written:]
+
+    def close(self):
+        self.running = False
+        os.close(self.master)
+        os.close(self.slave)
+
+
+def sample_line(channel, time_ms, voltage, current):
+    # The server negates the current field when parsing, so send it negated
+    return f"{channel},{time_ms:.0f},{voltage!r},{-current!r}\n"
+
+
+def ingest_metrics(smu, channel):
+    metrics = smu.get_metrics()
+    return {
+        'samples': metric_value(metrics, 'minismush_samples_total', 0, channel=channel),
+        'ingest_sum': metric_value(metrics, 'minismush_sample_processing_seconds_sum', 0),
+        'ingest_count': metric_value(metrics, 'minismush_sample_processing_seconds_count', 0),
+        'lag_p99': metric_value(metrics, 'minismush_event_loop_lag_seconds', 0, stat='p99'),
+    }
+
+
+def replay_once(link, smu, cycler, rec, speed, args, base_ms):
+    """Replay the recording once at `speed`; returns the result dictionary"""
+    channel = args.channel or rec['channel']
+    n = min(len(rec['time_ms']), args.max_samples or len(rec['time_ms']))
+    t0 = rec['time_ms'][0]
+    shift = base_ms - t0
+    times = rec['time_ms']
+
+    before = ingest_metrics(smu, channel)
+
+    # The first sample primes the buffer so the cycler starts on the recorded clock
+    link.write(sample_line(channel, times[0] + shift, rec['voltage'][0], rec['current'][0]).encode())
+    time.sleep(0.05)
+    started = cycler.start_test(channel=channel, steps=rec['steps'], cycles=rec['cycles'],
+                                metadata={'testName': f"Replay of {os.path.basename(args.recording)} "
+                                                      f"at {speed:g}x"})
+    test_id = started['testId']
+
+    wall_start = time.perf_counter()
+    next_status = wall_start + STATUS_INTERVAL_S
+    max_late = 0.0
+    written = 1
+    i = 1
+    while i < n:
+        now = time.perf_counter()
+        due = wall_start + (times[i] - t0) / 1000 / speed
+        if due > now:
+            time.sleep(min(due - now, 0.05))
+            continue
+        max_late = max(max_late, now - due)
+        # Everything due by now goes out in one write
+        chunk = []
+        while i < n and wall_start + (times[i] - t0) / 1000 / speed <= now:
+            chunk.append(sample_line(channel, times[i] + shift, rec['voltage'][i], rec['current'][i]))
+            i += 1
+        link.write(''.join(chunk).encode())
+        written += len(chunk)
+        if now >= next_status:
+            next_status = now + STATUS_INTERVAL_S
+            if not cycler.is_running(channel):
+                break  # The sequence finished (or the cycler stopped)
+    wall = time.perf_counter() - wall_start
+
+    time.sleep(SETTLE_S)
+    if cycler.is_running(channel):
+        cycler.stop_test(channel)
+    after = ingest_metrics(smu, channel)
+
+    export_path = os.path.join(args.output_dir, f"{test_id}.csv")
+    for attempt in range(10):
+        try:
+            cycler.export_csv(test_id, export_path)
+            break
+        except MinismuSHError:
+            if attempt == 9:
+                raise
+            time.sleep(0.5)  # The store is closed asynchronously after stop
+
+    replayed, replay_span = read_export(export_path)
+    recorded = step_transitions(rec['cycle'][:n], rec['step'][:n], rec['total_time'][:n])
+    ingest_count = after['ingest_count'] - before['ingest_count']
+    return {
+        'speed': speed,
+        'test_id': test_id,
+        'written': written,
+        'parsed': after['samples'] - before['samples'],
+        'wall_s': wall,
+        'rate': written / wall if wall > 0 else float('inf'),
+        'ingest_us': (after['ingest_sum'] - before['ingest_sum']) / ingest_count * 1e6 if ingest_count else 0,
+        'lag_p99_ms': after['lag_p99'] * 1000,
+        'max_late_ms': max_late * 1000,
+        'last_ms': times[n - 1] + shift,
+        'diffs': compare_transitions(recorded, replayed, args.tolerance, replay_span),
+        'transitions': len(replayed),
+        'export': export_path,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded battery test through the server")
+    parser.add_argument('recording', help="battery_test_*.db or its CSV export")
+    parser.add_argument('--speeds', default='10,100,1000', help="Comma-separated replay speeds (default: 10,100,1000)")
+    parser.add_argument('--url', default='http://localhost:3000', help="Server URL")
+    parser.add_argument('--steps', help="Step definition JSON (required for CSV recordings)")
+    parser.add_argument('--cycles', type=int, help="Cycle count (default: from the recording, else 1)")
+    parser.add_argument('--channel', type=int, help="Channel to replay on (default: the recorded channel)")
+    parser.add_argument('--max-samples', type=int, help="Replay only the first N samples")
+    parser.add_argument('--tolerance', type=float, default=1.0,
+                        help="Allowed difference in transition time, seconds (default: 1.0)")
+    parser.add_argument('--output-dir', default=tempfile.gettempdir(), help="Where replay exports are written")
+    parser.add_argument('--no-connect', action='store_true',
+                        help="Do not POST /reconnect; open the printed pty path in the server yourself")
+    args = parser.parse_args()
+
+    try:
+        speeds = [float(s) for s in args.speeds.split(',')]
+    except ValueError:
+        print(f"❌ Invalid --speeds: {args.speeds}")
+        sys.exit(1)
+    if not os.path.exists(args.recording):
+        print(f"❌ Recording not found: {args.recording}")
+        sys.exit(1)
+    try:
+        rec = load_recording(args.recording, args.steps, args.cycles)
+    except (ValueError, KeyError, sqlite3.Error) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    smu = create_smu_client(args.url)
+    cycler = create_cycler_client(args.url)
+    try:
+        clock = smu.raw_request('GET', '/serial/stats').get('sample_clock', 'host')
+    except MinismuSHError as e:
+        print(f"❌ Server not reachable: {e}")
+        sys.exit(1)
+    if clock != 'device' and any(s != 1 for s in speeds):
+        print("❌ The server timestamps samples on arrival; restart it with SAMPLE_CLOCK=device "
+              "to replay faster than real time")
+        sys.exit(1)
+
+    duration_s = (rec['time_ms'][-1] - rec['time_ms'][0]) / 1000
+    print(f"✓ {len(rec['time_ms'])} samples, {duration_s / 3600:.2f} h recorded, "
+          f"{len(rec['steps'])} steps x {rec['cycles']} cycles")
+
+    link = PtyLink()
+    print(f"✓ Replay port: {link.path}")
+    if not args.no_connect:
+        smu.raw_request('POST', '/reconnect', {'sp': link.path, 'baud': '115200'}, expect_json=False)
+        time.sleep(1.0)  # Let the server open the pty
+
+    results = []
+    base_ms = time.time() * 1000
+    try:
+        for speed in speeds:
+            n = min(len(rec['time_ms']), args.max_samples or len(rec['time_ms']))
+            print(f"\n▶ {speed:g}x: about {(rec['time_ms'][n - 1] - rec['time_ms'][0]) / 1000 / speed:.1f} s")
+            result = replay_once(link, smu, cycler, rec, speed, args, base_ms)
+            results.append(result)
+            # Keep sample time non-decreasing across runs
+            base_ms = max(time.time() * 1000, result['last_ms'] + 1000)
+            status = "✓ same transitions" if not result['diffs'] else "❌ transitions differ"
+            print(f"  {status} ({result['transitions']} steps), export {result['export']}")
+            for diff in result['diffs']:
+                print(f"    - {diff}")
+    except (MinismuSHError, KeyboardInterrupt) as e:
+        print(f"❌ Replay aborted: {e}")
+    finally:
+        link.close()
+
+    if results:
+        print(f"\n{'speed':>7} {'samples':>9} {'samples/s':>10} {'dropped':>8} {'ingest us':>10} "
+              f"{'loop p99 ms':>12} {'late ms':>8}  transitions")
+        for r in results:
+            print(f"{r['speed']:>6g}x {r['written']:>9} {r['rate']:>10.0f} {r['written'] - r['parsed']:>8.0f} "
+                  f"{r['ingest_us']:>10.1f} {r['lag_p99_ms']:>12.2f} {r['max_late_ms']:>8.1f}  "
+                  f"{'same' if not r['diffs'] else 'DIFFERENT'}")
+    print(f"\nReconnect the SMU when done: POST /reconnect {{\"sp\": \"<device>\"}}")
+
+    if not results or any(r['diffs'] for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+/*
+Fixed-capacity ring buffers for streamed channel data
+
+ChannelRingBuffer stores time_ms, voltage_V and current_A in preallocated
+Float64Array columns. Every sample gets a monotonically increasing sequence
+number (seq); once the buffer is full the oldest sample is overwritten, so
+push() and indexed reads are O(1) and no per-sample objects are kept.
+Logical index 0 is the oldest retained sample, length - 1 the newest.
+
+voltage_V and current_A also keep per-block min/max/sum summaries over
+BLOCK_SIZE physical slots, so rangeStats() over n samples touches at most
+2 * BLOCK_SIZE samples plus n / BLOCK_SIZE summaries instead of all n.
+
+TextRingBuffer is the same idea for the otm (other) lines.
+*/
+
+const os = require('os');
+const { RunningStats } = require('./step_stats');
+
+const FIELDS = ['time_ms', 'voltage_V', 'current_A'];
+const SUMMARY_FIELDS = ['voltage_V', 'current_A'];
+const BLOCK_SIZE = 256;
+const LITTLE_ENDIAN_HOST = os.endianness() === 'LE';
+
+// min/max/sum of one field per physical block of BLOCK_SIZE slots
+class BlockSummary {
+  constructor(capacity) {
+    const blocks = Math.ceil(capacity / BLOCK_SIZE);
+    this.min = new Float64Array(blocks);
+    this.max = new Float64Array(blocks);
+    this.sum = new Float64Array(blocks);
+  }
+
+  // Slots are written in physical order, so the first slot of a block restarts its summary
+  write(slot, v) {
+    const b = (slot / BLOCK_SIZE) | 0;
+    if (slot % BLOCK_SIZE === 0) {
+      this.min[b] = v;
+      this.max[b] = v;
+      this.sum[b] = v;
+    } else {
+      if (v < this.min[b]) this.min[b] = v;
+      if (v > this.max[b]) this.max[b] = v;
+      this.sum[b] += v;
+    }
+  }
+}
+
+class ChannelRingBuffer {
+  constructor(channel, capacity) {
+    this.channel = channel;
+    this.capacity = capacity;
+    this.columns = {
+      time_ms: new Float64Array(capacity),
+      voltage_V: new Float64Array(capacity),
+      current_A: new Float64Array(capacity)
+    };
+    this.summaries = {
+      voltage_V: new BlockSummary(capacity),
+      current_A: new BlockSummary(capacity)
+    };
+    this.head = 0;      // Physical slot of logical index 0
+    this.length = 0;
+    this.nextSeq = 0;   // seq assigned to the next push
+    this.stats = new RunningStats();  // Running statistics over the retained samples
+  }
+
+  get firstSeq() {
+    return this.nextSeq - this.length;
+  }
+
+  slot(i) {
+    const s = this.head + i;
+    return s >= this.capacity ? s - this.capacity : s;
+  }
+
+  push(timeMs, voltage, current) {
+    let s;
+    if (this.length < this.capacity) {
+      s = this.slot(this.length);
+      this.length++;
+    } else {
+      // Overwrite the oldest sample
+      s = this.head;
+      this.stats.remove(this.columns.voltage_V[s], this.columns.current_A[s]);
+      this.head = this.head + 1 === this.capacity ? 0 : this.head + 1;
+    }
+    this.columns.time_ms[s] = timeMs;
+    this.columns.voltage_V[s] = voltage;
+    this.columns.current_A[s] = current;
+    this.summaries.voltage_V.write(s, voltage);
+    this.summaries.current_A.write(s, current);
+    this.stats.add(timeMs, voltage, current);
+    return this.nextSeq++;
+  }
+
+  clear() {
+    this.head = 0;
+    this.length = 0;
+    this.stats.reset();
+  }
+
+  // Value of a field ('time_ms', 'voltage_V', 'current_A') at logical index i
+  value(field, i) {
+    return this.columns[field][this.slot(i)];
+  }
+
+  // Sample at logical index i in the same shape parseSMUStream produces, plus seq
+  point(i) {
+    const s = this.slot(i);
+    return {
+      channel: this.channel,
+      time_ms: this.columns.time_ms[s],
+      voltage_V: this.columns.voltage_V[s],
+      current_A: this.columns.current_A[s],
+      seq: this.firstSeq + i
+    };
+  }
+
+  latest() {
+    return this.length ? this.point(this.length - 1) : null;
+  }
+
+  // Points for logical indices [start, end)
+  slice(start = 0, end = this.length) {
+    start = Math.max(0, start);
+    end = Math.min(this.length, end);
+    const out = new Array(Math.max(0, end - start));
+    for (let i = start; i < end; i++) out[i - start] = this.point(i);
+    return out;
+  }
+
+  // Fields of logical indices [start, end) packed one column after another into a single
+  // Float64Array (the 'columnar-f64le' layout of socket frames and binary /data/chN
+  // responses). The range is at most two contiguous runs of each column, so it is
+  // copied with typed-array set() rather than per sample
+  packColumns(start = 0, end = this.length, fields = FIELDS) {
+    start = Math.max(0, start);
+    end = Math.min(this.length, end);
+    const count = Math.max(0, end - start);
+    const packed = new Float64Array(count * fields.length);
+    if (count === 0) return packed;
+    const first = this.slot(start);
+    const firstRun = Math.min(count, this.capacity - first);
+    fields.forEach((field, f) => {
+      const column = this.columns[field];
+      packed.set(column.subarray(first, first + firstRun), f * count);
+      if (firstRun < count) packed.set(column.subarray(0, count - firstRun), f * count + firstRun);
+    });
+    return packed;
+  }
+
+  // Same layout for an arbitrary list of logical indices (e.g. a decimated selection)
+  packIndices(indices, fields = FIELDS) {
+    const count = indices.length;
+    const packed = new Float64Array(count * fields.length);
+    fields.forEach((field, f) => {
+      const column = this.columns[field];
+      const base = f * count;
+      for (let k = 0; k < count; k++) packed[base + k] = column[this.slot(indices[k])];
+    });
+    return packed;
+  }
+
+  // Logical index of a sequence number (-1 if it has been overwritten or not yet written)
+  indexOfSeq(seq) {
+    const i = seq - this.firstSeq;
+    return i >= 0 && i < this.length ? i : -1;
+  }
+
+  // First logical index with time_ms >= timeMs (binary search; time is non-decreasing)
+  lowerBound(timeMs) {
+    let lo = 0, hi = this.length;
+    while (lo < hi) {
+      const mid = (lo + hi) >>> 1;
+      if (this.value('time_ms', mid) < timeMs) lo = mid + 1;
+      else hi = mid;
+    }
+    return lo;
+  }
+
+  // [start, end) logical indices for start <= time_ms < end (either bound may be omitted)
+  timeRange(startMs, endMs) {
+    return {
+      start: startMs === undefined ? 0 : this.lowerBound(startMs),
+      end: endMs === undefined ? this.length : this.lowerBound(endMs)
+    };
+  }
+
+  // Min, max, mean and count of a field over logical indices [start, end)
+  // voltage_V and current_A use the block summaries for every whole block in the range
+  rangeStats(field, start = 0, end = this.length) {
+    start = Math.max(0, start);
+    end = Math.min(this.length, end);
+    const column = this.columns[field];
+    const summary = this.summaries[field];
+    let min = Infinity, max = -Infinity, sum = 0;
+    let i = start;
+    while (i < end) {
+      const s = this.slot(i);
+      const blockEnd = Math.min(s - (s % BLOCK_SIZE) + BLOCK_SIZE, this.capacity);
+      if (summary && s % BLOCK_SIZE === 0 && i + (blockEnd - s) <= end) {
+        // A whole physical block inside the range was written in one pass, so its summary is exact
+        const b = s / BLOCK_SIZE;
+        if (summary.min[b] < min) min = summary.min[b];
+        if (summary.max[b] > max) max = summary.max[b];
+        sum += summary.sum[b];
+        i += blockEnd - s;
+        continue;
+      }
+      // Partial block: scan up to the block boundary or the end of the range
+      const stop = Math.min(end, i + (blockEnd - s));
+      for (let k = s; i < stop; i++, k++) {
+        const v = column[k];
+        if (v < min) min = v;
+        if (v > max) max = v;
+        sum += v;
+      }
+    }
+    const count = Math.max(0, end - start);
+    return { min: min, max: max, mean: count ? sum / count : null, count: count };
+  }
+
+  // Min and max of a field over logical indices [start, end)
+  range(field, start = 0, end = this.length) {
+    const stats = this.rangeStats(field, start, end);
+    return { min: stats.min, max: stats.max };
+  }
+
+  // Approximate bytes held by the columns and block summaries
+  memoryBytes() {
+    const blocks = Math.ceil(this.capacity / BLOCK_SIZE);
+    return (FIELDS.length * this.capacity + SUMMARY_FIELDS.length * 3 * blocks) * Float64Array.BYTES_PER_ELEMENT;
+  }
+}
+
+class TextRingBuffer {
+  constructor(capacity) {
+    this.capacity = capacity;
+    this.items = new Array(capacity);
+    this.head = 0;
+    this.length = 0;
+    this.nextSeq = 0;
+  }
+
+  push(line) {
+    if (this.length < this.capacity) {
+      this.items[(this.head + this.length) % this.capacity] = line;
+      this.length++;
+    } else {
+      this.items[this.head] = line;
+      this.head = (this.head + 1) % this.capacity;
+    }
+    return this.nextSeq++;
+  }
+
+  slice(start = 0, end = this.length) {
+    const out = [];
+    for (let i = Math.max(0, start); i < Math.min(this.length, end); i++) {
+      out.push(this.items[(this.head + i) % this.capacity]);
+    }
+    return out;
+  }
+}
+
+// Bytes of a packed Float64Array in the 'columnar-f64le' layout: a view of its
+// memory on little-endian hosts, a byte-swapped copy on big-endian ones
+function float64LE(packed) {
+  const bytes = Buffer.from(packed.buffer, packed.byteOffset, packed.byteLength);
+  return LITTLE_ENDIAN_HOST ? bytes : Buffer.from(bytes).swap64();
+}
+
+module.exports = { ChannelRingBuffer, TextRingBuffer, FIELDS, BLOCK_SIZE, float64LE };
@@ -0,0 +1,142 @@
+/*
+Adaptive streaming rate for the cycler
+
+AdaptiveSampleRate picks the SOUR{n}:DATA:SRATE rate (Hz) of one channel from
+the cycler's step state, so long rests and flat plateaus are not recorded at
+the rate a step transition needs:
+
+- every step mode has a base rate (rates.cc, rates.cv, rates.rest, rates.ocv)
+- for burstSeconds after a step change the rate is burstRate
+- while the signed voltage trend would reach one of the step's voltage cutoffs
+  within approachSeconds, the rate is burstRate: cutoff_V_min and cutoff_V_max
+  in any mode, cutoff_V in cc and cv (where checkStepCutoffs enforces it)
+- once |voltageTrend| has stayed below flatTrend for flatSeconds, the rate
+  drops to flatRate (flatModes only: in CV the voltage is held flat on purpose)
+
+A step's own sample_rate pins the rate for that step. update() runs for every
+sample and returns a rate only when it should change; decreases wait at least
+minChangeSeconds after the previous change, so the rate does not flap.
+*/
+
+const DEFAULT_POLICY = {
+  rates: { cc: 10, cv: 10, rest: 2, ocv: 2 },  // Hz
+  burstRate: 100,
+  burstSeconds: 10,
+  approachSeconds: 30,
+  flatRate: 1,
+  flatTrend: 1e-5,        // V/s
+  flatSeconds: 60,
+  flatModes: ['cc', 'rest', 'ocv'],
+  minChangeSeconds: 2
+};
+
+const RATE_FIELDS = ['burstRate', 'flatRate'];
+const DURATION_FIELDS = ['burstSeconds', 'approachSeconds', 'flatTrend', 'flatSeconds', 'minChangeSeconds'];
+
+// Voltage cutoffs that end a step, with the modes they apply in (null: every mode)
+const VOLTAGE_CUTOFFS = [['cutoff_V', ['cc', 'cv']], ['cutoff_V_min', null], ['cutoff_V_max', null]];
+
+function isPositive(value) {
+  return typeof value === 'number' && Number.isFinite(value) && value > 0;
+}
+
+// Merge overrides into the default policy; throws on invalid values
+function buildPolicy(overrides = {}) {
+  const policy = Object.assign({}, DEFAULT_POLICY, overrides);
+  policy.rates = Object.assign({}, DEFAULT_POLICY.rates, overrides.rates);
+  for (const [mode, rate] of Object.entries(policy.rates)) {
+    if (!isPositive(rate)) throw new Error(`Sample rate for ${mode} must be a positive number of Hz`);
+  }
+  for (const field of RATE_FIELDS) {
+    if (!isPositive(policy[field])) throw new Error(`${field} must be a positive number of Hz`);
+  }
+  for (const field of DURATION_FIELDS) {
+    if (typeof policy[field] !== 'number' || !(policy[field] >= 0)) {
+      throw new Error(`${field} must be a non-negative number`);
+    }
+  }
+  if (!Array.isArray(policy.flatModes)) throw new Error('flatModes must be an array of step modes');
+  return policy;
+}
+
+class AdaptiveSampleRate {
+  constructor(overrides = {}, initialRate = null) {
+    this.policy = buildPolicy(overrides);
+    this.initialRate = initialRate;  // Channel rate before the test, restored when it stops
+    this.rate = null;
+    this.reason = null;
+    this.changes = 0;
+    this.lastChange = -Infinity;
+    this.stepStart = null;
+    this.flatSince = null;
+  }
+
+  // A step started at `now` (ms); returns the rate to apply
+  stepChanged(now, step) {
+    this.stepStart = now;
+    this.flatSince = null;
+    return this._apply(now, this._target(now, step, null, 0), true);
+  }
+
+  // One sample; returns the new rate, or null when it stays the same
+  update(now, step, voltage, voltageTrend) {
+    if (this.stepStart === null) this.stepStart = now;
+    return this._apply(now, this._target(now, step, voltage, voltageTrend), false);
+  }
+
+  _target(now, step, voltage, voltageTrend) {
+    const policy = this.policy;
+    if (isPositive(step.sample_rate)) return [step.sample_rate, 'step'];
+    const base = policy.rates[step.mode] || policy.rates.cc;
+
+    if (now - this.stepStart < policy.burstSeconds * 1000) {
+      return [Math.max(base, policy.burstRate), 'step change'];
+    }
+    if (voltage !== null && this._approachingCutoff(step, voltage, voltageTrend)) {
+      return [Math.max(base, policy.burstRate), 'approaching cutoff'];
+    }
+    if (policy.flatModes.includes(step.mode) && Math.abs(voltageTrend) < policy.flatTrend) {
+      if (this.flatSince === null) this.flatSince = now;
+      if (now - this.flatSince >= policy.flatSeconds * 1000) {
+        return [Math.min(base, policy.flatRate), 'flat'];
+      }
+    } else {
+      this.flatSince = null;
+    }
+    return [base, 'base'];
+  }
+
+  // True when the trend reaches a voltage cutoff within approachSeconds; the time is
+  // negative (or infinite) when the voltage moves away from the cutoff or is flat
+  _approachingCutoff(step, voltage, voltageTrend) {
+    for (const [field, modes] of VOLTAGE_CUTOFFS) {
+      if (step[field] === undefined || (modes && !modes.includes(step.mode))) continue;
+      const seconds = (step[field] - voltage) / voltageTrend;
+      if (seconds > 0 && seconds <= this.policy.approachSeconds) return true;
+    }
+    return false;
+  }
+
+  _apply(now, [rate, reason], force) {
+    if (rate === this.rate) {
+      this.reason = reason;
+      return null;
+    }
+    if (!force && this.rate !== null && rate < this.rate &&
+        now - this.lastChange < this.policy.minChangeSeconds * 1000) {
+      return null;
+    }
+    this.rate = rate;
+    this.reason = reason;
+    this.lastChange = now;
+    this.changes++;
+    return rate;
+  }
+
+  // Status snapshot (the policy is also what checkpoints store)
+  toJSON() {
+    return { rate: this.rate, reason: this.reason, changes: this.changes, policy: this.policy };
+  }
+}
+
+module.exports = { AdaptiveSampleRate, DEFAULT_POLICY, buildPolicy };
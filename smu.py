@@ -2,10 +2,17 @@ import serial
 import socket
 import time
 import json
+from array import array
 from enum import Enum
 from typing import Optional, Tuple, Dict, Union
 from dataclasses import dataclass
 
+RX_BUFFER_SIZE = 4096   # Initial receive buffer; grows if a single line is longer
+DECODE_SAMPLES = 64     # Streaming samples decoded per batch; scratch indices stay <= 256,
+                        # which CPython keeps as cached small ints
+SWEEP_WINDOW = 16       # Sweep points written ahead of their replies
+SWEEP_MODES = {'voltage': ('FVMI', 'VOLT'), 'current': ('FIMV', 'CURR')}
+
 @dataclass
 class WifiStatus:
     connected: bool
@@ -37,6 +44,7 @@ class SMU:
         """
         self.connection_type = connection_type
         self._connection = None
+        self._init_buffers()
         
         if connection_type == ConnectionType.USB:
             try:
@@ -51,6 +59,144 @@ class SMU:
             except socket.error as e:
                 raise SMUException(f"Failed to open network connection: {e}")
 
+    def _init_buffers(self):
+        """Allocate the receive buffer and the decoded-sample scratch, once per connection"""
+        # Reusable receive buffer: bytes arrive in _rx[_rx_start:_rx_end] and
+        # lines are parsed in place, so streaming allocates no per-line objects
+        self._rx = bytearray(RX_BUFFER_SIZE)
+        self._rx_view = memoryview(self._rx)
+        self._rx_start = 0
+        self._rx_end = 0
+        # Streaming samples decoded a batch at a time into a reused float64
+        # scratch, served from _samples[_sample_pos:_sample_end] (4 values per sample)
+        self._samples = array('d', bytes(8 * 4 * DECODE_SAMPLES))
+        self._sample_pos = 0
+        self._sample_end = 0
+
+    def _fill(self) -> int:
+        """
+        Read whatever is waiting (at least one byte) into the free end of the buffer
+
+        Returns:
+            Number of bytes read, 0 on timeout
+        """
+        if self._rx_start == self._rx_end:
+            self._rx_start = self._rx_end = 0
+        elif self._rx_end == len(self._rx):
+            pending = self._rx_end - self._rx_start
+            if self._rx_start:
+                # Move the partial line to the front (memmove, no copy object)
+                self._rx_view[:pending] = self._rx_view[self._rx_start:self._rx_end]
+            else:
+                # A single line fills the buffer: double it
+                self._rx_view.release()
+                self._rx.extend(bytes(len(self._rx)))
+                self._rx_view = memoryview(self._rx)
+            self._rx_start, self._rx_end = 0, pending
+
+        if self.connection_type == ConnectionType.USB:
+            # Only ask for what is waiting (a read blocks until it has count bytes).
+            # pyserial's readinto() is read() plus a copy; doing the copy here with
+            # a memoryview slice assignment allocates nothing beyond the port's bytes
+            count = min(max(1, self._connection.in_waiting), len(self._rx) - self._rx_end)
+            data = self._connection.read(count)
+            received = len(data)
+            self._rx_view[self._rx_end:self._rx_end + received] = data
+        else:
+            try:
+                received = self._connection.recv_into(self._rx_view[self._rx_end:])
+            except socket.timeout:
+                received = 0
+        self._rx_end += received
+        return received
+
+    def _read_line(self) -> Optional[Tuple[int, int]]:
+        """
+        Read the next line into the receive buffer
+
+        Returns:
+            (start, end) of the line in self._rx without the line ending,
+            or None if the connection timed out first
+        """
+        newline = self._wait_for_line()
+        if newline < 0:
+            return None
+        start = self._rx_start
+        self._rx_start = newline + 1
+        if newline > start and self._rx[newline - 1] == 13:  # '\r'
+            newline -= 1
+        return start, newline
+
+    def _wait_for_line(self) -> int:
+        """
+        Read until the receive buffer holds a complete line
+
+        Returns:
+            Index of the line's newline in self._rx, or -1 if the connection timed out first
+        """
+        scanned = 0
+        while True:
+            newline = self._rx.find(b'\n', self._rx_start + scanned, self._rx_end)
+            if newline >= 0:
+                return newline
+            scanned = self._rx_end - self._rx_start
+            if not self._fill():
+                return -1
+
+    def _decode_samples(self, out, offset: int, values: int) -> int:
+        """
+        Decode the complete sample lines in the receive buffer into out
+
+        Each "channel,timestamp,voltage,current" field is converted straight
+        from the receive buffer into the preallocated out, so a batch only
+        creates short-lived objects (one field's bytes at a time), however
+        many samples it holds.
+
+        Args:
+            out: array('d') or float64 NumPy array
+            offset: Index in out of the first sample's channel field
+            values: Room in out (samples decoded are at most values // 4)
+
+        Returns:
+            Number of samples decoded; 0 when the next line is not a streaming sample
+        """
+        rx = self._rx
+        find = rx.find
+        start, stop = self._rx_start, self._rx_end
+        k = offset
+        end = offset + values - 3
+        while k < end:
+            newline = find(b'\n', start, stop)
+            if newline < 0 or rx.count(b',', start, newline) != 3:
+                break
+            try:
+                comma = find(b',', start, newline)
+                out[k] = int(rx[start:comma])
+                field = comma + 1
+                comma = find(b',', field, newline)
+                out[k + 1] = float(rx[field:comma])
+                field = comma + 1
+                comma = find(b',', field, newline)
+                out[k + 2] = float(rx[field:comma])
+                out[k + 3] = float(rx[comma + 1:newline])  # float() skips the '\r'
+            except ValueError:
+                break
+            k += 4
+            start = newline + 1
+        self._rx_start = start
+        return (k - offset) // 4
+
+    def _read_samples(self, out, offset: int, values: int) -> int:
+        """Wait for streaming data and decode what has arrived into out (see _decode_samples)"""
+        if self.connection_type != ConnectionType.USB:
+            raise SMUException("Streaming is only supported over USB connection")
+        if self._wait_for_line() < 0:
+            raise SMUException("Failed to parse streaming data: timed out")
+        count = self._decode_samples(out, offset, values)
+        if not count:
+            self._reject_sample_line()
+        return count
+
     def _send_command(self, command: str) -> str:
         """
         Send command and get response
@@ -64,10 +210,12 @@ class SMU:
         try:
             if self.connection_type == ConnectionType.USB:
                 self._connection.write(f"{command}\n".encode())
-                response = self._connection.readline().decode().strip()
+                line = self._read_line()
+                response = self._rx[line[0]:line[1]].decode().strip() if line else ""
             else:
                 self._connection.send(f"{command}".encode())
-                response = self._connection.recv(1024).decode().strip()
+                received = self._connection.recv_into(self._rx_view[:1024])
+                response = self._rx[:received].decode().strip()
             
             # Check if response is an acknowledgment
             if response == "OK":
@@ -152,6 +300,93 @@ class SMU:
         voltage, current = map(float, response.split(','))
         return voltage, current
 
+    def sweep(self, channel: int, start: float, stop: float, points: int,
+              dwell: float = 0.0, mode: str = 'voltage'):
+        """
+        Step the source from start to stop and measure voltage and current at each point
+        
+        Over USB the setpoint and MEAS commands for up to SWEEP_WINDOW points are
+        written back to back before their replies are read, so a point costs serial
+        time instead of two command round trips. The source is left at stop.
+        
+        Args:
+            channel: Channel number (1 or 2)
+            start: First setpoint (V for 'voltage', A for 'current')
+            stop: Last setpoint
+            points: Number of evenly spaced setpoints, including start and stop
+            dwell: Settling time in seconds between setting and measuring
+            mode: 'voltage' (FVMI) or 'current' (FIMV)
+            
+        Returns:
+            Tuple of (setpoints, voltages, currents) as NumPy arrays
+            (array('d') when NumPy is not installed)
+        """
+        if mode not in SWEEP_MODES:
+            raise ValueError("Mode must be 'voltage' or 'current'")
+        if points < 1:
+            raise ValueError("Points must be at least 1")
+        source_mode, source = SWEEP_MODES[mode]
+        step = (stop - start) / (points - 1) if points > 1 else 0.0
+        setpoints = array('d', (start + step * k for k in range(points)))
+        if points > 1:
+            setpoints[-1] = stop
+        measured = array('d', bytes(16 * points))  # voltage, current pairs
+        
+        self.set_mode(channel, source_mode)
+        if self.connection_type != ConnectionType.USB:
+            # No line framing on the network link: one command round trip at a time
+            for k in range(points):
+                self._send_command(f"SOUR{channel}:{source} {setpoints[k]}")
+                if dwell > 0:
+                    time.sleep(dwell)
+                measured[2 * k], measured[2 * k + 1] = self.measure_voltage_and_current(channel)
+        else:
+            try:
+                for first in range(0, points, SWEEP_WINDOW):
+                    last = min(first + SWEEP_WINDOW, points)
+                    if dwell > 0:
+                        for k in range(first, last):
+                            self._connection.write(f"SOUR{channel}:{source} {setpoints[k]}\n".encode())
+                            time.sleep(dwell)
+                            self._connection.write(f"MEAS{channel}:VOLT:CURR?\n".encode())
+                    else:
+                        self._connection.write(b"".join(
+                            f"SOUR{channel}:{source} {setpoints[k]}\nMEAS{channel}:VOLT:CURR?\n".encode()
+                            for k in range(first, last)))
+                    for k in range(first, last):
+                        self._read_measurement_into(measured, 2 * k)
+            except serial.SerialException as e:
+                raise SMUException(f"Communication error: {e}")
+        
+        try:
+            import numpy as np
+        except ImportError:
+            return setpoints, measured[0::2], measured[1::2]
+        pairs = np.frombuffer(measured, dtype=np.float64).reshape(points, 2)
+        return np.frombuffer(setpoints, dtype=np.float64), pairs[:, 0], pairs[:, 1]
+
+    def _read_measurement_into(self, out, offset: int):
+        """
+        Read lines until a "voltage,current" reply and store it at out[offset:offset + 2]
+        
+        Acknowledgements and streaming samples in between are skipped.
+        """
+        rx = self._rx
+        while True:
+            line = self._read_line()
+            if line is None:
+                raise SMUException("Timed out waiting for a measurement reply")
+            start, end = line
+            comma = rx.find(b',', start, end)
+            if comma < 0 or rx.find(b',', comma + 1, end) >= 0:
+                continue
+            try:
+                out[offset] = float(rx[start:comma])
+                out[offset + 1] = float(rx[comma + 1:end])
+                return
+            except ValueError:
+                continue
+
     # Channel Configuration Methods
     def enable_channel(self, channel: int):
         """Enable specified channel"""
@@ -201,16 +436,74 @@ class SMU:
         Returns:
             Tuple of (channel, timestamp, voltage, current) from the streaming data
         """
-        if self.connection_type == ConnectionType.USB:
-            # Read the data packet
-            data = self._connection.readline().decode().strip()
-            try:
-                channel, timestamp, voltage, current = data.split(',')
-                return int(channel), float(timestamp), float(voltage), float(current)
-            except ValueError as e:
-                raise SMUException(f"Failed to parse streaming data: {data}")
-        else:
-            raise SMUException("Streaming is only supported over USB connection")
+        samples = self._samples
+        i = self._next_sample()
+        return int(samples[i]), samples[i + 1], samples[i + 2], samples[i + 3]
+
+    def read_streaming_into(self, out, offset: int = 0):
+        """
+        Read a single data packet into a preallocated sequence
+
+        Samples are decoded a batch at a time into a reused array('d') scratch,
+        so filling an array('d') or a NumPy row creates no per-sample objects
+        beyond the floats being stored (benchmarks/smu_stream_benchmark.py
+        checks the budget).
+
+        Args:
+            out: Writable sequence; out[offset:offset + 4] receives
+                 channel, timestamp, voltage and current
+            offset: Index of the channel field in out
+        """
+        samples = self._samples
+        i = self._next_sample()
+        out[offset] = int(samples[i])
+        out[offset + 1] = samples[i + 1]
+        out[offset + 2] = samples[i + 2]
+        out[offset + 3] = samples[i + 3]
+
+    def _next_sample(self) -> int:
+        """Index in self._samples of the next decoded sample, decoding a batch when none are left"""
+        if self._sample_pos == self._sample_end:
+            self._sample_end = 4 * self._read_samples(self._samples, 0, len(self._samples))
+            self._sample_pos = 0
+        i = self._sample_pos
+        self._sample_pos = i + 4
+        return i
+
+    def read_streaming_block(self, out, offset: int = 0) -> int:
+        """
+        Read every streaming sample already received into a preallocated array
+
+        Waits for at least one sample, then decodes all complete samples in
+        the receive buffer (up to the space left in out) straight into out.
+
+        Args:
+            out: array('d') or float64 NumPy array; each sample fills four
+                 values (channel, timestamp, voltage, current) from out[offset]
+            offset: Index in out of the first sample's channel field
+
+        Returns:
+            Number of samples written
+        """
+        values = (len(out) - offset) // 4 * 4
+        if values <= 0:
+            raise ValueError("out has no room for a sample")
+        if self._sample_pos == self._sample_end:
+            return self._read_samples(out, offset, values)
+        # Samples already decoded by read_streaming_into come first
+        count = min(self._sample_end - self._sample_pos, values)
+        samples = self._samples
+        i = self._sample_pos
+        for k in range(count):
+            out[offset + k] = samples[i + k]
+        self._sample_pos = i + count
+        return count // 4
+
+    def _reject_sample_line(self):
+        """Consume the next buffered line, which is not a streaming sample, and raise"""
+        start, end = self._read_line()
+        data = self._rx[start:end].decode(errors='replace').strip()
+        raise SMUException(f"Failed to parse streaming data: {data}")
 
     def set_sample_rate(self, channel: int, rate: float):
         """
@@ -308,6 +601,8 @@ class SMU:
         """Close the connection"""
         if self._connection:
             self._connection.close()
+        self._rx_start = self._rx_end = 0
+        self._sample_pos = self._sample_end = 0
 
     def __enter__(self):
         return self
@@ -0,0 +1,139 @@
+/*
+Write-behind queue for SQLite inserts
+
+Rows are buffered in memory and written by a prepared statement inside a single
+BEGIN/COMMIT every `maxRows` rows or `intervalMs` milliseconds, whichever comes
+first, instead of one implicit (fsync'd) transaction per insert. Databases
+opened with openDatabase() use WAL journaling and synchronous=NORMAL.
+
+Every open queue is tracked so the server can flush them all on shutdown or an
+uncaught exception (flushAll).
+*/
+
+const DEFAULT_MAX_ROWS = 500;
+const DEFAULT_INTERVAL_MS = 1000;
+
+const activeQueues = new Set();
+
+// Open (or create) a database configured for batched writes
+function openDatabase(sqlite3, filename, callback) {
+  const db = new sqlite3.Database(filename, callback);
+  db.serialize();  // All statements on this connection run in issue order
+  db.run('PRAGMA journal_mode=WAL');
+  db.run('PRAGMA synchronous=NORMAL');
+  return db;
+}
+
+class SqliteWriteQueue {
+  constructor(db, insertSql, { maxRows = DEFAULT_MAX_ROWS, intervalMs = DEFAULT_INTERVAL_MS, name = 'sqlite' } = {}) {
+    this.db = db;
+    this.name = name;
+    this.maxRows = maxRows;
+    this.intervalMs = intervalMs;
+    this.stmt = db.prepare(insertSql);
+    this.pending = [];
+    this.inFlight = 0;
+    this.closed = false;
+
+    this.rowsWritten = 0;
+    this.flushes = 0;
+    this.errors = 0;
+    this.lastFlushMs = 0;
+    this.maxFlushMs = 0;
+    this.totalFlushMs = 0;
+    this.lastFlushRows = 0;
+
+    this.timer = setInterval(() => this.flush(), intervalMs);
+    if (this.timer.unref) this.timer.unref();
+    activeQueues.add(this);
+  }
+
+  // Queue one row (array of values in statement order)
+  push(values) {
+    if (this.closed) return;
+    this.pending.push(values);
+    if (this.pending.length >= this.maxRows) this.flush();
+  }
+
+  // Write everything queued so far in one transaction
+  flush(callback) {
+    const rows = this.pending;
+    if (rows.length === 0) {
+      // Still wait for any earlier transaction so callers can rely on ordering
+      if (callback) this.db.run('SELECT 1', () => callback(null));
+      return;
+    }
+    this.pending = [];
+    this.inFlight += rows.length;
+    const started = process.hrtime.bigint();
+
+    this.db.run('BEGIN');
+    for (const values of rows) {
+      this.stmt.run(values, (err) => {
+        if (err) {
+          this.errors++;
+          console.error(`${this.name} insert error:`, err.message);
+        }
+      });
+    }
+    this.db.run('COMMIT', (err) => {
+      const elapsedMs = Number(process.hrtime.bigint() - started) / 1e6;
+      this.inFlight -= rows.length;
+      this.flushes++;
+      this.lastFlushMs = elapsedMs;
+      this.lastFlushRows = rows.length;
+      this.totalFlushMs += elapsedMs;
+      if (elapsedMs > this.maxFlushMs) this.maxFlushMs = elapsedMs;
+      if (err) {
+        this.errors++;
+        console.error(`${this.name} commit error:`, err.message);
+      } else {
+        this.rowsWritten += rows.length;
+      }
+      if (callback) callback(err);
+    });
+  }
+
+  // Flush remaining rows, finalize the statement and stop the timer
+  close(callback = () => {}) {
+    if (this.closed) return callback(null);
+    this.closed = true;
+    clearInterval(this.timer);
+    activeQueues.delete(this);
+    this.flush((err) => {
+      this.stmt.finalize(() => callback(err));
+    });
+  }
+
+  stats() {
+    return {
+      queueDepth: this.pending.length,
+      inFlight: this.inFlight,
+      rowsWritten: this.rowsWritten,
+      flushes: this.flushes,
+      errors: this.errors,
+      lastFlushMs: this.lastFlushMs,
+      lastFlushRows: this.lastFlushRows,
+      maxFlushMs: this.maxFlushMs,
+      totalFlushMs: this.totalFlushMs,
+      maxRows: this.maxRows,
+      intervalMs: this.intervalMs
+    };
+  }
+}
+
+// Flush and close every open queue (shutdown / crash path)
+function flushAll(callback = () => {}) {
+  const queues = [...activeQueues];
+  let remaining = queues.length;
+  if (remaining === 0) return callback();
+  for (const queue of queues) {
+    queue.close(() => {
+      queue.db.close(() => {
+        if (--remaining === 0) callback();
+      });
+    });
+  }
+}
+
+module.exports = { SqliteWriteQueue, openDatabase, flushAll, DEFAULT_MAX_ROWS, DEFAULT_INTERVAL_MS };
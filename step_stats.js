@@ -0,0 +1,158 @@
+/*
+Running step statistics for the cycler and the channel buffers
+
+RunningStats keeps Welford mean/variance for voltage and current plus a fixed
+window of the most recent points for the voltage trend, so every add() and
+remove() is O(1) regardless of how many points are in the step or buffer.
+analysis() returns the same object performArrayAnalysis() computes by scanning.
+*/
+
+const TREND_POINTS = 10;
+
+class RunningStats {
+  constructor(trendPoints = TREND_POINTS) {
+    this.trendPoints = trendPoints;
+    this.trendTime = new Float64Array(trendPoints);
+    this.trendVoltage = new Float64Array(trendPoints);
+    this.reset();
+  }
+
+  reset() {
+    this.count = 0;
+    this.meanVoltage = 0;
+    this.meanCurrent = 0;
+    this.m2Current = 0;
+    this.trendNext = 0;    // Next slot in the trend window
+    this.trendCount = 0;   // Valid entries in the trend window
+    this.firstCurrent = undefined;
+    this.positiveCurrentSeen = false;
+  }
+
+  add(timeMs, voltage, current) {
+    this.count++;
+    this.meanVoltage += (voltage - this.meanVoltage) / this.count;
+    const delta = current - this.meanCurrent;
+    this.meanCurrent += delta / this.count;
+    this.m2Current += delta * (current - this.meanCurrent);
+
+    this.trendTime[this.trendNext] = timeMs;
+    this.trendVoltage[this.trendNext] = voltage;
+    this.trendNext = (this.trendNext + 1) % this.trendPoints;
+    if (this.trendCount < this.trendPoints) this.trendCount++;
+
+    if (this.firstCurrent === undefined) this.firstCurrent = current;
+    if (current > 0) this.positiveCurrentSeen = true;
+  }
+
+  // Remove the oldest point (FIFO buffers); inverse Welford update
+  remove(voltage, current) {
+    if (this.count <= 1) {
+      this.reset();
+      return;
+    }
+    const n = this.count - 1;
+    this.meanVoltage -= (voltage - this.meanVoltage) / n;
+    const delta = current - this.meanCurrent;
+    this.meanCurrent -= delta / n;
+    this.m2Current = Math.max(0, this.m2Current - delta * (current - this.meanCurrent));
+    this.count = n;
+    if (this.trendCount > n) this.trendCount = n;
+  }
+
+  voltageTrend() {
+    const points = this.trendCount;
+    if (points < 2) return 0;
+    const last = (this.trendNext - 1 + this.trendPoints) % this.trendPoints;
+    const first = (this.trendNext - points + this.trendPoints) % this.trendPoints;
+    const deltaTime = (this.trendTime[last] - this.trendTime[first]) / 1000;
+    return deltaTime > 0 ? (this.trendVoltage[last] - this.trendVoltage[first]) / deltaTime : 0;
+  }
+
+  currentStability() {
+    if (this.count < 2 || Math.abs(this.meanCurrent) <= 1e-9) return 0;
+    return Math.sqrt(this.m2Current / this.count) / Math.abs(this.meanCurrent);
+  }
+
+  analysis() {
+    return {
+      voltageTrend: this.voltageTrend(),
+      currentStability: this.currentStability(),
+      stepAvgVoltage: this.count ? this.meanVoltage : 0,
+      stepAvgCurrent: this.count ? this.meanCurrent : 0,
+      dataPointsInStep: this.count
+    };
+  }
+
+  // Plain-object snapshot (cycler checkpoints); restore with RunningStats.fromJSON()
+  toJSON() {
+    return {
+      trendPoints: this.trendPoints,
+      count: this.count,
+      meanVoltage: this.meanVoltage,
+      meanCurrent: this.meanCurrent,
+      m2Current: this.m2Current,
+      trendTime: Array.from(this.trendTime),
+      trendVoltage: Array.from(this.trendVoltage),
+      trendNext: this.trendNext,
+      trendCount: this.trendCount,
+      firstCurrent: this.firstCurrent === undefined ? null : this.firstCurrent,
+      positiveCurrentSeen: this.positiveCurrentSeen
+    };
+  }
+
+  static fromJSON(snapshot) {
+    const stats = new RunningStats(snapshot.trendPoints);
+    for (const key of ['count', 'meanVoltage', 'meanCurrent', 'm2Current', 'trendNext', 'trendCount', 'positiveCurrentSeen']) {
+      stats[key] = snapshot[key];
+    }
+    stats.trendTime.set(snapshot.trendTime);
+    stats.trendVoltage.set(snapshot.trendVoltage);
+    stats.firstCurrent = snapshot.firstCurrent === null ? undefined : snapshot.firstCurrent;
+    return stats;
+  }
+}
+
+// Full-scan reference implementation (the original per-sample analysis)
+function performArrayAnalysis(dataArray, stepStartTime) {
+  const stepData = dataArray.filter(point => point.time_ms >= stepStartTime);
+
+  if (stepData.length === 0) {
+    return {
+      voltageTrend: 0,
+      currentStability: 0,
+      stepAvgVoltage: 0,
+      stepAvgCurrent: 0,
+      dataPointsInStep: 0
+    };
+  }
+
+  const avgVoltage = stepData.reduce((sum, point) => sum + point.voltage_V, 0) / stepData.length;
+  const avgCurrent = stepData.reduce((sum, point) => sum + point.current_A, 0) / stepData.length;
+
+  const trendPoints = stepData.slice(-Math.min(TREND_POINTS, stepData.length));
+  let voltageTrend = 0;
+  if (trendPoints.length >= 2) {
+    const firstPoint = trendPoints[0];
+    const lastPoint = trendPoints[trendPoints.length - 1];
+    const deltaTime = (lastPoint.time_ms - firstPoint.time_ms) / 1000;
+    voltageTrend = deltaTime > 0 ? (lastPoint.voltage_V - firstPoint.voltage_V) / deltaTime : 0;
+  }
+
+  let currentStability = 0;
+  if (stepData.length >= 2) {
+    const currentStdDev = Math.sqrt(
+      stepData.reduce((sum, point) => sum + Math.pow(point.current_A - avgCurrent, 2), 0) / stepData.length
+    );
+    currentStability = Math.abs(avgCurrent) > 1e-9 ? currentStdDev / Math.abs(avgCurrent) : 0;
+  }
+
+  return {
+    voltageTrend: voltageTrend,
+    currentStability: currentStability,
+    stepAvgVoltage: avgVoltage,
+    stepAvgCurrent: avgCurrent,
+    dataPointsInStep: stepData.length
+  };
+}
+
+module.exports = { RunningStats, performArrayAnalysis, TREND_POINTS };